@@ -0,0 +1,196 @@
+"""
+Append-only history of adjustment changes.
+
+The adjustments and hijri_adjustments documents are the compacted current
+state of each date. Every write increments the document's `version` in the
+same update, and appends the resulting value with that version to
+adjustment_events. Rule creations and deletions are appended too. Events
+are numbered per location (`seq`), so a reader can ask for everything since
+the last number it saw. The values in effect at any past moment come from
+replaying the events recorded up to then.
+
+Events are never updated or deleted. A write and its event are two
+operations, so reads tolerate both a number whose event is not yet visible
+and an event logged twice. Values the history is missing (saved before it
+existed, or whose append failed) are added by backfill_once, a one-off
+startup migration that request_backfill schedules again.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from mongo import as_utc, pymongo_module
+
+# Value field of each state collection, also the `field` of its events
+PRAYERS = 'adjustments'
+HIJRI = 'day_adjustment'
+RULE = 'rule'
+
+# A sequence number still missing after this long was taken by a writer
+# that died before appending; readers step over it
+GAP_TIMEOUT = timedelta(seconds=60)
+
+# Recorded time of values saved before the history existed
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def state_event(field, doc):
+    """Event of a state document after a write (or as found, for the backfill)"""
+    return {
+        'date': doc['date'],
+        'day': doc.get('day'),
+        'field': field,
+        'value': doc.get(field, [] if field == PRAYERS else 0),
+        'version': doc.get('version', 0),
+        'recorded_at': doc.get('updated_at') or EPOCH
+    }
+
+
+def rule_event(rule_id, rule, recorded_at):
+    """Event of a rule being created (`rule` is its document) or deleted (None)"""
+    return {'field': RULE, 'rule_id': rule_id, 'value': rule, 'recorded_at': recorded_at}
+
+
+def latest_values(events):
+    """{(date, field): event} of the highest version of each date's fields"""
+    latest = {}
+    for event in events:
+        key = (event['date'], event['field'])
+        if key not in latest or event['version'] > latest[key]['version']:
+            latest[key] = event
+    return latest
+
+
+class AdjustmentHistory:
+    COUNTER_PREFIX = 'adjustment_events/'
+    # Marker document in the counters collection while no backfill is due
+    BACKFILLED = 'adjustment_events_backfilled'
+
+    def __init__(self, events, counters):
+        self.events = events
+        self.counters = counters
+
+    async def ensure_indexes(self):
+        await self.events.create_index([('location', 1), ('seq', 1)], unique=True)
+        await self.events.create_index([('location', 1), ('day', 1), ('recorded_at', 1)])
+
+    async def current_seq(self, location):
+        doc = await self.counters.find_one({'_id': self.COUNTER_PREFIX + location})
+        return doc['version'] if doc else 0
+
+    async def record(self, location, events):
+        """Append events of one location in order; returns the last sequence number"""
+        if not events:
+            return None
+        doc = await self.counters.find_one_and_update(
+            {'_id': self.COUNTER_PREFIX + location},
+            {'$inc': {'version': len(events)}},
+            upsert=True,
+            return_document=pymongo_module().ReturnDocument.AFTER
+        )
+        first = doc['version'] - len(events) + 1
+        logged_at = datetime.now(timezone.utc)
+        await self.events.insert_many([
+            {**event, 'location': location, 'seq': first + i, 'logged_at': logged_at}
+            for i, event in enumerate(events)
+        ])
+        return doc['version']
+
+    async def for_date(self, location, date):
+        """Every event of one date, oldest first"""
+        cursor = self.events.find({'location': location, 'date': date}, {'_id': 0, 'location': 0, 'day': 0})
+        return await cursor.sort('seq', 1).to_list(length=None)
+
+    async def changes(self, location, since):
+        """
+        (seq, events) of a location after `since`: the latest value of each
+        changed date field, and every rule event. `seq` is where to continue
+        from; it stops before a number whose event is not visible yet.
+        """
+        until = await self.current_seq(location)
+        if since > until:
+            raise ValueError(f"Unknown version: {since}")
+        events = await self.events.find(
+            {'location': location, 'seq': {'$gt': since, '$lte': until}}, {'_id': 0, 'location': 0, 'day': 0}
+        ).sort('seq', 1).to_list(length=None)
+        abandoned = datetime.now(timezone.utc) - GAP_TIMEOUT
+        seq = since
+        visible = []
+        for event in events:
+            if event['seq'] > seq + 1 and as_utc(event['logged_at']) > abandoned:
+                break
+            seq = event['seq']
+            del event['logged_at']
+            visible.append(event)
+        rules = [event for event in visible if event['field'] == RULE]
+        dates = latest_values(event for event in visible if event['field'] != RULE)
+        return seq, sorted(dates.values(), key=lambda event: event['seq']) + rules
+
+    async def state_at(self, location, first_day, last_day, at):
+        """
+        ({date: adjustments}, {date: day_adjustment}) of a location's ISO
+        days first_day..last_day as they were at `at`
+        """
+        events = await self.events.find(
+            {'location': location, 'day': {'$gte': first_day, '$lte': last_day}, 'recorded_at': {'$lte': at}},
+            {'_id': 0, 'date': 1, 'field': 1, 'value': 1, 'version': 1}
+        ).to_list(length=None)
+        by_field = {PRAYERS: {}, HIJRI: {}}
+        for (date, field), event in latest_values(events).items():
+            by_field[field][date] = event['value']
+        return by_field[PRAYERS], by_field[HIJRI]
+
+    async def rules_at(self, location, at):
+        """A location's rule documents as they were at `at`, in creation order"""
+        rules = {}
+        async for event in self.events.find(
+            {'location': location, 'field': RULE, 'recorded_at': {'$lte': at}}, {'_id': 0, 'rule_id': 1, 'value': 1}
+        ).sort('seq', 1):
+            rules[event['rule_id']] = event['value']
+        return sorted((rule for rule in rules.values() if rule), key=lambda rule: rule['created_at'])
+
+    async def backfill_once(self, states, rules):
+        """
+        backfill, unless it has already run since the last request_backfill;
+        returns how many events it logged. The marker is set before the scan,
+        so a write whose append fails during it asks for another run.
+        """
+        pymongo = pymongo_module()
+        try:
+            await self.counters.insert_one({'_id': self.BACKFILLED, 'at': datetime.now(timezone.utc)})
+        except pymongo.errors.DuplicateKeyError:
+            return 0
+        try:
+            return await self.backfill(states, rules)
+        except Exception:
+            await self.request_backfill()
+            raise
+
+    async def request_backfill(self):
+        """Have the next backfill_once run, after an append failed"""
+        await self.counters.delete_one({'_id': self.BACKFILLED})
+
+    async def backfill(self, states, rules):
+        """
+        Log state documents and rules the history does not have: values saved
+        before it existed, or by a writer that died before appending.
+        `states` maps each state field to its collection. Returns how many.
+        """
+        logged = set()
+        async for group in self.events.aggregate([{'$group': {'_id': {
+            'location': '$location', 'date': '$date', 'field': '$field', 'version': '$version', 'rule_id': '$rule_id'
+        }}}]):
+            key = group['_id']
+            logged.add(key.get('rule_id') or (key.get('location'), key.get('date'), key.get('field'), key.get('version')))
+
+        missing = {}
+        for field, collection in states.items():
+            async for doc in collection.find({}, {'_id': 0, 'location': 1, 'date': 1, 'day': 1, field: 1, 'version': 1, 'updated_at': 1}):
+                if (doc['location'], doc['date'], field, doc.get('version', 0)) not in logged:
+                    missing.setdefault(doc['location'], []).append(state_event(field, doc))
+        async for rule in rules.find({}, {'_id': 0}):
+            if rule['id'] not in logged:
+                missing.setdefault(rule['location'], []).append(rule_event(rule['id'], rule, rule['created_at']))
+        for location, events in missing.items():
+            events.sort(key=lambda event: as_utc(event['recorded_at']))
+            await self.record(location, events)
+        return sum(len(events) for events in missing.values())
@@ -0,0 +1,74 @@
+"""
+Recurring and ranged prayer adjustment rules.
+
+A rule applies per-prayer start/end adjustments either to an inclusive
+Gregorian date range or to a Hijri month (optionally of a single Hijri year).
+RuleIndex precompiles all rules so that resolving the effective adjustments
+for a day is a binary search over the date-range segments plus a dict lookup
+for the Hijri month, with no database access. Where rules overlap, the most
+recently created rule wins for each prayer.
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+
+
+def _prayer_values(rule, seq):
+    values = {}
+    for adj in rule.get('adjustments', []):
+        values[adj['prayer_name']] = (
+            seq,
+            adj.get('start_adjustment', adj.get('adjustment', 0)),
+            adj.get('end_adjustment', 0)
+        )
+    return values
+
+
+def _merge(target, values):
+    for prayer, value in values.items():
+        current = target.get(prayer)
+        if current is None or value[0] > current[0]:
+            target[prayer] = value
+
+
+def _day_number(date_str):
+    return datetime.strptime(date_str, '%d-%b-%Y').toordinal()
+
+
+class RuleIndex:
+    def __init__(self, rules=()):
+        """`rules` are rule documents in creation order"""
+        ranges = []
+        self._hijri = {}
+        for seq, rule in enumerate(rules):
+            values = _prayer_values(rule, seq)
+            if rule.get('hijri_month'):
+                key = (rule['hijri_month'], rule.get('hijri_year'))
+                _merge(self._hijri.setdefault(key, {}), values)
+            else:
+                ranges.append((_day_number(rule['start_date']), _day_number(rule['end_date']) + 1, values))
+
+        # Split the day axis at every range boundary; each segment has one
+        # precomputed effective value
+        boundaries = sorted({point for start, end, _ in ranges for point in (start, end)})
+        self._starts = boundaries
+        self._segments = []
+        for segment_start in boundaries:
+            effective = {}
+            for start, end, values in ranges:
+                if start <= segment_start < end:
+                    _merge(effective, values)
+            self._segments.append(effective)
+        self.size = len(ranges) + len(self._hijri)
+
+    def resolve(self, day_number, hijri_month=None, hijri_year=None):
+        """Effective {prayer: (start_adjustment, end_adjustment)} from rules for one day"""
+        effective = {}
+        i = bisect_right(self._starts, day_number) - 1
+        if i >= 0:
+            _merge(effective, self._segments[i])
+        if self._hijri and hijri_month is not None:
+            _merge(effective, self._hijri.get((hijri_month, None), {}))
+            if hijri_year is not None:
+                _merge(effective, self._hijri.get((hijri_month, int(hijri_year)), {}))
+        return {prayer: (start, end) for prayer, (_, start, end) in effective.items()}
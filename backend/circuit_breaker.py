@@ -0,0 +1,109 @@
+"""
+Circuit breaker for the upstream Aladhan dependency.
+
+Closed, calls go through and consecutive failures are counted. After
+`failure_threshold` of them the breaker opens and calls fail immediately
+with CircuitOpenError, so callers fall back to cached or locally computed
+times instead of waiting on a dead upstream. Once the reset timeout has
+passed the breaker is half-open and lets a single trial call through:
+success closes it, failure opens it again with the timeout doubled, up to
+`max_reset_timeout`.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=600.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+        self._trial = False
+        self.stats = {'calls': 0, 'failures': 0, 'short_circuited': 0, 'opened': 0}
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning(f"Circuit {self.name}: {self.state} -> {state}")
+            self.state = state
+
+    def _acquire(self):
+        """Whether a call may go through now; a half-open breaker admits one trial at a time"""
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def _record_success(self):
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self._trial = False
+        self._set_state(CLOSED)
+
+    def _record_failure(self):
+        self.failures += 1
+        self.stats['failures'] += 1
+        if self.state == HALF_OPEN:
+            # The trial failed: back off before the next one
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+        self._trial = False
+
+    def _open(self):
+        self.opened_at = self.clock()
+        self.stats['opened'] += 1
+        self._set_state(OPEN)
+
+    async def call(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) through the breaker; raises CircuitOpenError while open"""
+        if not self._acquire():
+            self.stats['short_circuited'] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        self.stats['calls'] += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        except BaseException:
+            # Cancelled: says nothing about the upstream, but frees the trial slot
+            self._trial = False
+            raise
+        self._record_success()
+        return result
+
+    def snapshot(self):
+        """State for monitoring"""
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+        return {
+            'name': self.name,
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'reset_timeout': self.reset_timeout,
+            'retry_in': retry_in,
+            **self.stats
+        }
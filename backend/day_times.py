@@ -0,0 +1,102 @@
+"""
+Prayer times of one day as integer minutes since local midnight.
+
+A day is a timeline: its five start minutes in PRAYER_NAMES order followed
+by the next day's Fajr, all counted from the day's own midnight, so Isha
+ends at the next Fajr (1440 + Fajr) or at Islamic midnight rather than at
+23:59. Adjusted times may roll over midnight in either direction; they are
+only wrapped to a clock time when formatted. End times and adjustments are
+integer arithmetic, adjustments are indexed by prayer slot once per day
+instead of scanned per prayer, and strings are only produced at the
+response boundary by a table lookup.
+"""
+
+from prayer_calc import PRAYER_NAMES
+
+MINUTES_PER_DAY = 1440
+
+PRAYER_INDEX = {name: i for i, name in enumerate(PRAYER_NAMES)}
+
+# Position of the next day's Fajr in a timeline
+NEXT_FAJR = len(PRAYER_NAMES)
+
+# Isha ends at the next day's Fajr, or at Islamic midnight: halfway from
+# Maghrib to the next Fajr
+ISHA_ENDS = ('fajr', 'midnight')
+
+NO_ADJUSTMENTS = ((0, 0),) * len(PRAYER_NAMES)
+
+# 12h clock without AM/PM ("12:05", "5:07") for every minute of the day
+_LABELS = tuple(f"{(m // 60 - 1) % 12 + 1}:{m % 60:02d}" for m in range(MINUTES_PER_DAY))
+
+
+def parse_minutes(hhmm):
+    """Minutes since midnight of an HH:MM time"""
+    hours, _, minutes = hhmm.partition(':')
+    return int(hours) * 60 + int(minutes[:2])
+
+
+def format_12h(minutes):
+    """Clock time of minutes from midnight, wrapping into the previous or next day"""
+    return _LABELS[minutes % MINUTES_PER_DAY]
+
+
+def timeline(starts, next_starts):
+    """Timeline of a day from its start minutes and the next day's"""
+    return [*starts[:NEXT_FAJR], next_starts[0] + MINUTES_PER_DAY]
+
+
+def end_minutes(timeline, isha_end='fajr'):
+    """Each prayer ends when the next starts; Isha at the next Fajr or at Islamic midnight"""
+    next_fajr = timeline[NEXT_FAJR]
+    if isha_end == 'midnight':
+        isha = (timeline[PRAYER_INDEX['Maghrib']] + next_fajr) // 2
+    else:
+        isha = next_fajr
+    return (*timeline[1:NEXT_FAJR], isha)
+
+
+def index_adjustments(adjustments, rule_adjustments=None):
+    """
+    (start_adjustment, end_adjustment) per prayer slot.
+
+    `adjustments` are stored per-date adjustment dicts and win over
+    `rule_adjustments` ({prayer: (start, end)}); the first entry for a prayer
+    wins, and unknown prayer names are ignored.
+    """
+    slots = list(NO_ADJUSTMENTS)
+    if rule_adjustments:
+        for name, value in rule_adjustments.items():
+            i = PRAYER_INDEX.get(name)
+            if i is not None:
+                slots[i] = value
+    for adj in reversed(adjustments):
+        i = PRAYER_INDEX.get(adj["prayer_name"])
+        if i is not None:
+            # Support both old and new format
+            slots[i] = (adj.get("start_adjustment", adj.get("adjustment", 0)), adj.get("end_adjustment", 0))
+    return slots
+
+
+def adjustment_sources(adjustments, rule_adjustments=None):
+    """Where each prayer slot's adjustment comes from: 'date', 'rule' or None, as index_adjustments resolves it"""
+    sources = [None] * len(PRAYER_NAMES)
+    if rule_adjustments:
+        for name in rule_adjustments:
+            i = PRAYER_INDEX.get(name)
+            if i is not None:
+                sources[i] = 'rule'
+    for adj in adjustments:
+        i = PRAYER_INDEX.get(adj["prayer_name"])
+        if i is not None:
+            sources[i] = 'date'
+    return sources
+
+
+def apply_adjustments(timeline, slots, isha_end='fajr'):
+    """Adjusted (start, end) minutes per prayer; not clamped, so they may leave the day"""
+    return [
+        (start + start_adjustment, end + end_adjustment)
+        for start, end, (start_adjustment, end_adjustment)
+        in zip(timeline, end_minutes(timeline, isha_end), slots)
+    ]
@@ -0,0 +1,41 @@
+"""
+Write a city's packed timetable (see timetable_pack) to a file, e.g. for a
+display box that has no connection to the API:
+
+    cd backend && python export_timetable.py --city hyderabad --year 2026 --years 2
+
+With --since VERSION only the dates changed after that version are written,
+as a delta, unless a rule changed since then.
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+import server
+from timetable_pack import FULL, unpack
+
+
+async def main(args):
+    location = server.CITIES[args.city]
+    start, end = date(args.year, 1, 1), date(args.year + args.years - 1, 12, 31)
+    try:
+        body = await server.build_timetable_export(start, end, location, args.since)
+    finally:
+        server.mongo.close()
+    output = args.output or f"{args.city}-{args.year}{f'-{args.year + args.years - 1}' if args.years > 1 else ''}.bin"
+    with open(output, 'wb') as f:
+        f.write(body)
+    header = unpack(body)
+    kind = 'full' if header['kind'] == FULL else 'delta'
+    print(f"{output}: {kind}, {len(header['records'])} dates at version {header['version']}, {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--city", default=server.DEFAULT_CITY, choices=sorted(server.CITIES))
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--since", type=int, help="adjustment version of a timetable the client already has")
+    parser.add_argument("--output", "-o", help="default <city>-<year>.bin")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""
+Umm al-Qura Hijri calendar.
+
+Month starts for 1400-1500 AH come from the official Umm al-Qura table,
+stored as one bit per month (1 = 30 days, 0 = 29 days) and expanded at
+import into an array of month-start day numbers (proleptic Gregorian
+ordinals, as returned by date.toordinal()). Gregorian -> Hijri is a binary
+search over that array and Hijri -> Gregorian is a direct index, so day
+offsets are exact day arithmetic with the real month lengths.
+
+Dates outside the table fall back to the arithmetic (tabular) Islamic
+calendar.
+"""
+
+from array import array
+from bisect import bisect_right
+
+HIJRI_MONTHS = [
+    'Muharram', 'Safar', 'Rabi al-awwal', 'Rabi al-thani',
+    'Jumada al-awwal', 'Jumada al-thani', 'Rajab', 'Sha\'ban',
+    'Ramadan', 'Shawwal', 'Dhu al-Qi\'dah', 'Dhu al-Hijjah'
+]
+
+FIRST_YEAR = 1400
+LAST_YEAR = 1500
+
+# date(1979, 11, 20).toordinal(), 1 Muharram 1400
+_FIRST_MONTH_START = 722773
+
+# Month lengths from Muharram 1400 to Dhu al-Hijjah 1500, 4 months per hex digit
+_MONTH_LENGTH_BITS = (
+    'd2b54aea57526e936aaad555aa5b52ba95b49ba4db25d52daa5ad4aea56d4bd2'
+    '3d91da95b4ab5a56d2b693b49b6556a9754b6a56caad555b29b92ba95d4ada55'
+    'aaab595749764baa5b52b6a56d2ae9572a75535a95d49ba4dd26d535aaaad4b6'
+    'a57527a95b4ab5536c9ae4b6a96b4ada55d25d92dc96d4ad6556d2b693749b64'
+    'd72ab54b6a5752b6956b2ad94dc95d4aea56caad5556c97'
+)
+
+# Day number of 1 Muharram 1 AH in the tabular calendar (16 July 622 Julian)
+_TABULAR_EPOCH = 227015
+
+
+def _build_month_starts():
+    months = (LAST_YEAR - FIRST_YEAR + 1) * 12
+    bits = bin(int(_MONTH_LENGTH_BITS, 16))[2:].zfill(len(_MONTH_LENGTH_BITS) * 4)
+    starts = array('l', [_FIRST_MONTH_START])
+    for bit in bits[:months]:
+        starts.append(starts[-1] + (30 if bit == '1' else 29))
+    return starts
+
+
+# MONTH_STARTS[i] is the first day of month i % 12 + 1 of FIRST_YEAR + i // 12;
+# the last entry is the day after the table ends
+MONTH_STARTS = _build_month_starts()
+
+
+def _tabular_to_day_number(year, month, day):
+    return (day + -(-59 * (month - 1) // 2) + (year - 1) * 354
+            + (3 + 11 * year) // 30 + _TABULAR_EPOCH - 1)
+
+
+def _tabular_to_hijri(day_number):
+    year = (30 * (day_number - _TABULAR_EPOCH) + 10646) // 10631
+    month = min(12, -(-2 * (day_number - 29 - _tabular_to_day_number(year, 1, 1)) // 59) + 1)
+    day = day_number - _tabular_to_day_number(year, month, 1) + 1
+    return year, month, day
+
+
+# Shift the tabular calendar on each side so it meets the table without a gap
+# or an overlap at 1 Muharram 1400 and 1 Muharram 1501
+_OFFSET_BEFORE = MONTH_STARTS[0] - _tabular_to_day_number(FIRST_YEAR, 1, 1)
+_OFFSET_AFTER = MONTH_STARTS[-1] - _tabular_to_day_number(LAST_YEAR + 1, 1, 1)
+
+
+def to_hijri(day_number):
+    """Convert a day number (date.toordinal()) to (year, month, day) in AH"""
+    if MONTH_STARTS[0] <= day_number < MONTH_STARTS[-1]:
+        i = bisect_right(MONTH_STARTS, day_number) - 1
+        return FIRST_YEAR + i // 12, i % 12 + 1, day_number - MONTH_STARTS[i] + 1
+    offset = _OFFSET_BEFORE if day_number < MONTH_STARTS[0] else _OFFSET_AFTER
+    return _tabular_to_hijri(day_number - offset)
+
+
+def to_day_number(year, month, day):
+    """Convert a Hijri date to a day number; days past the month end carry over"""
+    i = (year - FIRST_YEAR) * 12 + month - 1
+    if 0 <= i < len(MONTH_STARTS) - 1:
+        return MONTH_STARTS[i] + day - 1
+    offset = _OFFSET_BEFORE if i < 0 else _OFFSET_AFTER
+    return _tabular_to_day_number(year, month, day) + offset
+
+
+def month_length(year, month):
+    """Number of days in a Hijri month"""
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return to_day_number(next_year, next_month, 1) - to_day_number(year, month, 1)
@@ -0,0 +1,88 @@
+"""
+HTTP validators and lifetimes for per-date responses.
+
+An ETag is the ISO date plus the adjustment version of that date (see
+InvalidationLog.version_of), with a marker when adjustments apply to it, so a
+conditional request can be answered from memory before any upstream or
+database work. The marker lets a 304 carry the same Cache-Control as the
+response it revalidates.
+
+Stored adjustments are edited against their own document version instead:
+version_etag tags them, and an If-Match header naming a version makes a
+write conditional on the document still being at it.
+"""
+
+
+def make_etag(day, version, adjusted):
+    return f'"{day}.{version}{".a" if adjusted else ""}"'
+
+
+def match_etag(if_none_match, day, version):
+    """
+    Check an If-None-Match header against the current version of `day`.
+
+    Returns None if it does not match, otherwise whether the matched
+    representation had adjustments.
+    """
+    if not if_none_match:
+        return None
+    current = f'"{day}.{version}'
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == current + '"':
+            return False
+        if tag == current + '.a"':
+            return True
+    return None
+
+
+# Every version, for If-Match: *
+ANY = '*'
+
+
+def version_etag(day, version):
+    """ETag of a date's stored adjustment document at its version (0 before the first versioned write)"""
+    return f'"{day}.v{version}"'
+
+
+def listed_versions(header, day, weak=False):
+    """
+    Document versions of `day` an If-Match (or, with `weak`, If-None-Match)
+    header lists: None without the header, ANY for *, else a set that is
+    empty when no tag is one of this date's.
+    """
+    if not header:
+        return None
+    versions = set()
+    prefix = f'"{day}.v'
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return ANY
+        if tag.startswith('W/'):
+            # If-Match compares strongly, so a weak tag never matches it
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.add(int(tag[len(prefix):-1]))
+    return versions
+
+
+def cache_control(day, today, adjusted, past_max_age, future_max_age):
+    """
+    Cache-Control for a date's response.
+
+    Past dates without adjustments never change and future ones only when
+    someone adjusts them, so both may be cached at the edge. Today and any
+    adjusted date are revalidated on every use, which the ETag makes cheap.
+    """
+    if adjusted or day == today:
+        return 'no-cache'
+    if day < today:
+        return f'public, max-age={past_max_age}, immutable'
+    return f'public, max-age={future_max_age}'
@@ -0,0 +1,107 @@
+"""
+Locations prayer times are served for.
+
+A location is either a configured city (a masjid's coordinates, time zone
+and calculation settings, looked up by id) or arbitrary coordinates. The
+time zone is an IANA name, whose UTC offset is resolved per date so
+daylight saving time is followed, or a fixed UTC offset in hours.
+Coordinates are quantized to LOCATION_PRECISION decimal places, about a
+kilometre, before anything is computed, so nearby requests share one cache
+key and one result; the rounding moves prayer times by a few seconds at most.
+Location.key identifies the location in caches, adjustments and rules.
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Union
+from zoneinfo import ZoneInfo
+
+from prayer_calc import ASR_FACTORS, MAX_LATITUDE, METHODS
+
+LOCATION_PRECISION = 2
+
+DEFAULT_CITY = 'hyderabad'
+
+
+@dataclass(frozen=True)
+class Location:
+    key: str
+    lat: float
+    lng: float
+    tz: Union[str, float]
+    method: int = 2
+    school: int = 1
+    name: str = ''
+
+    def as_dict(self):
+        return asdict(self)
+
+    @property
+    def tzinfo(self):
+        if isinstance(self.tz, str):
+            return ZoneInfo(self.tz)
+        return timezone(timedelta(hours=self.tz))
+
+    def utc_offset(self, day):
+        """UTC offset in hours on a date, as at local noon"""
+        if not isinstance(self.tz, str):
+            return self.tz
+        return datetime.combine(day, time(12), self.tzinfo).utcoffset() / timedelta(hours=1)
+
+
+HYDERABAD = Location(DEFAULT_CITY, 17.3850, 78.4867, 5.5, method=2, school=1, name='Hyderabad')
+
+
+def _validate(lat, lng, tz, method, school):
+    if not -MAX_LATITUDE <= lat <= MAX_LATITUDE or not -180 <= lng <= 180:
+        raise ValueError(f"lat must be within [-{MAX_LATITUDE:g}, {MAX_LATITUDE:g}] and lng within [-180, 180]")
+    if isinstance(tz, str):
+        try:
+            ZoneInfo(tz)
+        except (KeyError, ValueError):
+            raise ValueError(f"Unknown time zone: {tz}")
+    elif not -12 <= tz <= 14:
+        raise ValueError("tz must be a time zone name or a UTC offset in hours within [-12, 14]")
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}; supported: {sorted(METHODS)}")
+    if school not in ASR_FACTORS:
+        raise ValueError(f"Unknown school {school}; supported: {sorted(ASR_FACTORS)}")
+
+
+def parse_tz(value):
+    """A `tz` query value: a UTC offset in hours if it is a number, else a time zone name"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def load_cities(path=None):
+    """
+    Configured cities by id: Hyderabad plus those in the JSON list at `path`,
+    whose time zone is `tz` (a name or offset) or, as before, `tz_offset`
+    """
+    cities = {DEFAULT_CITY: HYDERABAD}
+    if path:
+        with open(path) as f:
+            for entry in json.load(f):
+                tz = entry['tz'] if 'tz' in entry else entry['tz_offset']
+                _validate(entry['lat'], entry['lng'], tz, entry.get('method', 2), entry.get('school', 1))
+                if ',' in entry['id']:
+                    raise ValueError(f"City id must not contain ',': {entry['id']}")
+                cities[entry['id']] = Location(
+                    entry['id'], entry['lat'], entry['lng'], tz,
+                    method=entry.get('method', 2), school=entry.get('school', 1), name=entry.get('name', '')
+                )
+    return cities
+
+
+def coordinate_location(lat, lng, tz, method=2, school=1):
+    """The quantized Location for arbitrary coordinates"""
+    _validate(lat, lng, tz, method, school)
+    lat = round(lat, LOCATION_PRECISION) + 0.0
+    lng = round(lng, LOCATION_PRECISION) + 0.0
+    zone = tz if isinstance(tz, str) else f"{tz:g}"
+    key = f"{lat:.{LOCATION_PRECISION}f},{lng:.{LOCATION_PRECISION}f},{zone},{method},{school}"
+    return Location(key, lat, lng, tz, method=method, school=school)
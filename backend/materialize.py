@@ -0,0 +1,30 @@
+"""
+Materialize every city's timetable window once, outside the app (e.g. from cron):
+
+    cd backend && python materialize.py
+
+The app already does this at startup and every MATERIALIZE_INTERVAL.
+"""
+
+import asyncio
+
+import server
+
+
+async def main():
+    if server.PRAYER_TIMES_SOURCE == 'aladhan':
+        server.http_session = server.create_http_session()
+    try:
+        await server.ensure_indexes()
+        await server.invalidation_log.start()
+        for location in server.CITIES.values():
+            written, pruned = await server.materialize_window(location)
+            print(f"{location.key}: {written} dates written, {pruned} pruned")
+    finally:
+        if server.http_session is not None:
+            await server.http_session.close()
+        server.mongo.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
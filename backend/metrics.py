@@ -0,0 +1,299 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are plain lists updated in the request
+path, with no locks (the event loop is single-threaded). Hot paths bind a
+series once with `labels()` so an observation is a bisect and two list
+updates. Timing a block costs about two empty `with` blocks; measured with
+benchmarks/metrics_overhead.py on a machine where an empty `with` takes
+0.45 us, a /prayer-times/{date} response from the response cache records
+about 1 us of metrics and one that computes its timings (eight stages)
+about 9 us, next to the milliseconds the computation takes. Values other
+code already counts (cache and breaker stats) are copied in by
+collectors when a snapshot is taken rather than counted twice.
+
+With several workers, each one writes a snapshot of its metrics to a shared
+directory every few seconds and a scrape of any worker merges all of them:
+counters and histograms are summed, gauges keep a `worker` label. Snapshots
+of workers that stopped writing keep counting towards the totals, so
+counters stay monotonic across restarts, but their gauges are dropped.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+from time import perf_counter
+
+# Seconds; requests and stages are mostly sub-millisecond to tens of milliseconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterSeries:
+    __slots__ = ('cell',)
+
+    def __init__(self, cell):
+        self.cell = cell
+
+    def inc(self, amount=1):
+        self.cell[0] += amount
+
+    def set(self, value):
+        self.cell[0] = value
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # labels -> [value]
+        self.values = {}
+
+    def _cell(self, labels):
+        cell = self.values.get(labels)
+        if cell is None:
+            cell = self.values[labels] = [0]
+        return cell
+
+    def labels(self, *labels):
+        """The series for `labels`, to update without looking it up again"""
+        return _CounterSeries(self._cell(labels))
+
+    def inc(self, *labels, amount=1):
+        cell = self.values.get(labels)
+        if cell is None:
+            cell = self._cell(labels)
+        cell[0] += amount
+
+    def set(self, value, *labels):
+        """Set a total that is counted elsewhere (collectors only)"""
+        self._cell(labels)[0] = value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+
+class _Timer:
+    __slots__ = ('series', 'start')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # _HistogramSeries.observe, inlined
+        elapsed = perf_counter() - self.start
+        series = self.series
+        counts = series.counts
+        counts[bisect_left(series.buckets, elapsed)] += 1
+        counts[-1] += elapsed
+
+
+class _HistogramSeries:
+    __slots__ = ('buckets', 'counts')
+
+    def __init__(self, buckets, counts):
+        self.buckets = buckets
+        self.counts = counts
+
+    def observe(self, value):
+        counts = self.counts
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def time(self):
+        """Context manager observing the duration of its block"""
+        return _Timer(self)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> per-bucket counts (not cumulative), the +Inf count, then the sum
+        self.values = {}
+        self._series = {}
+
+    def labels(self, *labels):
+        """The series for `labels`, to observe without looking it up again"""
+        series = self._series.get(labels)
+        if series is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series = self._series[labels] = _HistogramSeries(self.buckets, counts)
+        return series
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self.labels(*labels)
+        counts = series.counts
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self.labels(*labels))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """`collect()` is called before every snapshot to copy in values counted elsewhere"""
+        self.collectors.append(collect)
+
+    def snapshot(self):
+        for collect in self.collectors:
+            collect()
+        return {
+            'written_at': time.time(),
+            'metrics': {
+                name: [
+                    [list(labels), value if metric.kind == 'histogram' else value[0]]
+                    for labels, value in metric.values.items()
+                ]
+                for name, metric in self.metrics.items()
+            }
+        }
+
+    def write(self, directory, worker=None):
+        """Atomically replace this worker's snapshot file in `directory`"""
+        worker = worker or str(os.getpid())
+        path = os.path.join(directory, f'{worker}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def _read(self, directory, worker):
+        snapshots = {}
+        for filename in os.listdir(directory):
+            name, ext = os.path.splitext(filename)
+            if ext != '.json' or name == worker:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    snapshots[name] = json.load(f)
+            except (OSError, ValueError):
+                # Being replaced, or left half-written by a crash
+                continue
+        return snapshots
+
+    def render(self, directory=None, worker=None, stale_after=60.0):
+        """Prometheus text format of this worker, merged with the snapshots in `directory`"""
+        worker = worker or str(os.getpid())
+        snapshots = {worker: self.snapshot()}
+        if directory:
+            snapshots.update(self._read(directory, worker))
+        now = time.time()
+
+        lines = []
+        for name, metric in self.metrics.items():
+            merged = {}
+            for snapshot_worker, snapshot in snapshots.items():
+                live = now - snapshot.get('written_at', 0) <= stale_after
+                for labels, value in snapshot['metrics'].get(name, ()):
+                    labels = tuple(labels)
+                    if metric.kind == 'gauge':
+                        if live:
+                            merged[labels + (snapshot_worker,)] = value
+                    elif metric.kind == 'histogram':
+                        total = merged.get(labels)
+                        merged[labels] = value if total is None else [a + b for a, b in zip(total, value)]
+                    else:
+                        merged[labels] = merged.get(labels, 0) + value
+
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(merged.items()):
+                if metric.kind == 'gauge':
+                    lines.append(f'{name}{_labels(metric.labelnames + ("worker",), labels)} {_number(value)}')
+                elif metric.kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip((*metric.buckets, '+Inf'), value):
+                        cumulative += count
+                        le = (('le', bound if bound == '+Inf' else repr(float(bound))),)
+                        lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {_number(value[-1])}')
+                    lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {cumulative}')
+                else:
+                    lines.append(f'{name}{_labels(metric.labelnames, labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and observing their latency per route.
+
+    Latency is measured to the start of the response, so long-lived streams
+    count once with their time to first byte. Requests that match no route
+    share one label to keep cardinality bounded.
+    """
+
+    def __init__(self, app, requests, latency):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = perf_counter()
+        status = [500]
+
+        async def send_and_observe(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                route = scope.get('route')
+                self.latency.observe(perf_counter() - start, route.path if route else 'unmatched')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        finally:
+            route = scope.get('route')
+            self.requests.inc(scope['method'], route.path if route else 'unmatched', str(status[0]))
@@ -0,0 +1,87 @@
+"""
+MongoDB client created on first use.
+
+Importing motor (with pymongo and dnspython) is a large part of the app's
+import time, and creating the client needs MONGO_URL. Both wait until the
+first query instead, so that importing the app needs neither, and a cold
+worker can finish importing while nothing has asked for the database yet.
+`db.<collection>` can be taken at import time; the collection is resolved
+when it is first used, and modules that need pymongo's types call
+pymongo_module() inside the functions that use them.
+"""
+
+import os
+from datetime import timezone
+
+
+def as_utc(moment):
+    """A datetime read back from Mongo, which returns naive UTC unless the client is tz_aware"""
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def pymongo_module():
+    """pymongo (with its errors), imported when the database is first used like motor is"""
+    import pymongo.errors
+    return pymongo
+
+
+class LazyMongo:
+    def __init__(self):
+        self._client = None
+        self._db = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if 'MONGO_URL' not in os.environ or 'DB_NAME' not in os.environ:
+                raise RuntimeError("MONGO_URL and DB_NAME must be set")
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self._client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        return self._client
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self.client[os.environ['DB_NAME']]
+        return self._db
+
+    def close(self):
+        """Close the client if it was created; it reopens on next use"""
+        if self._client is not None:
+            self._client.close()
+
+
+class LazyCollection:
+    __slots__ = ('_mongo', '_name', '_collection')
+
+    def __init__(self, mongo, name):
+        self._mongo = mongo
+        self._name = name
+        self._collection = None
+
+    def __getattr__(self, attr):
+        if self._collection is None:
+            self._collection = self._mongo.db[self._name]
+        return getattr(self._collection, attr)
+
+
+class LazyDatabase:
+    """Stands in for the Motor database: collections resolve on first use"""
+
+    def __init__(self, mongo):
+        self._mongo = mongo
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        # Kept as an attribute, so later lookups do not come here
+        collection = LazyCollection(self._mongo, name)
+        setattr(self, name, collection)
+        return collection
+
+    @property
+    def name(self):
+        return os.environ['DB_NAME']
+
+    def command(self, *args, **kwargs):
+        return self._mongo.db.command(*args, **kwargs)
@@ -0,0 +1,241 @@
+"""
+Local prayer time calculation.
+
+Implements the PrayTimes.org solar-position formulas that the Aladhan API is
+built on, so that timings are computed in-process instead of fetched:
+
+- sun declination and equation of time from the Julian day
+- Dhuhr at solar noon
+- Fajr / Isha at the method's twilight depression angles
+- Asr at the shadow factor of the madhab (1 = Shafi, 2 = Hanafi)
+- Maghrib at sunset, using the 0.833 degree refraction + semi-diameter angle
+
+Times are returned as minutes since local midnight, rounded to the nearest
+minute the same way Aladhan does. compute_prayer_minutes_range is the same
+computation vectorized over an array of Julian days for whole timetables;
+it imports numpy on first use, so single dates never load it.
+
+Beyond MAX_LATITUDE the sun stays up (or down) all day on some dates, so
+there is no sunrise or sunset to anchor the night to; locations there are
+rejected, and a date without one raises ValueError.
+"""
+
+import math
+
+# Calculation methods, keyed by Aladhan method id.
+# 'isha' is an angle in degrees unless 'isha_minutes' is set.
+METHODS = {
+    1: {'name': 'University of Islamic Sciences, Karachi', 'fajr': 18.0, 'isha': 18.0},
+    2: {'name': 'Islamic Society of North America', 'fajr': 15.0, 'isha': 15.0},
+    3: {'name': 'Muslim World League', 'fajr': 18.0, 'isha': 17.0},
+    4: {'name': 'Umm Al-Qura University, Makkah', 'fajr': 18.5, 'isha': None, 'isha_minutes': 90},
+    5: {'name': 'Egyptian General Authority of Survey', 'fajr': 19.5, 'isha': 17.5},
+}
+
+# Asr shadow factor per Aladhan school id (0 = Shafi, 1 = Hanafi)
+ASR_FACTORS = {0: 1, 1: 2}
+
+# Sun altitude at sunrise/sunset: refraction plus the sun's semi-diameter
+RISE_SET_ANGLE = 0.833
+
+PRAYER_NAMES = ('Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+
+# The sun rises and sets every day up to about 65.7 degrees north or south
+MAX_LATITUDE = 65.0
+
+NO_SUNRISE = "The sun does not rise or set on this date at this latitude"
+
+_RAD = math.pi / 180.0
+_DEG = 180.0 / math.pi
+
+
+def julian_day(year, month, day):
+    """Julian day number at 0h UT of a Gregorian date"""
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1)) + day + b - 1524.5
+
+
+def sun_position(jd):
+    """Return (declination in degrees, equation of time in hours) for a Julian day"""
+    d = jd - 2451545.0
+    g = (357.529 + 0.98560028 * d) % 360.0
+    q = (280.459 + 0.98564736 * d) % 360.0
+    sin_g = math.sin(g * _RAD)
+    cos_g = math.cos(g * _RAD)
+    # sin(2g) = 2 sin(g) cos(g)
+    ecliptic_lng = (q + 1.915 * sin_g + 0.040 * sin_g * cos_g) % 360.0
+    obliquity = (23.439 - 0.00000036 * d) * _RAD
+
+    sin_l = math.sin(ecliptic_lng * _RAD)
+    right_ascension = (math.atan2(math.cos(obliquity) * sin_l, math.cos(ecliptic_lng * _RAD)) * _DEG / 15.0) % 24.0
+    equation_of_time = q / 15.0 - right_ascension
+    declination = math.asin(math.sin(obliquity) * sin_l) * _DEG
+    return declination, equation_of_time
+
+
+class _Day:
+    """Per-day solar state shared by the individual prayer computations"""
+
+    __slots__ = ('jd', 'sin_lat', 'cos_lat', 'lat')
+
+    def __init__(self, jd, lat):
+        self.jd = jd
+        self.lat = lat
+        self.sin_lat = math.sin(lat * _RAD)
+        self.cos_lat = math.cos(lat * _RAD)
+
+    def mid_day(self, portion):
+        _, eqt = sun_position(self.jd + portion)
+        return (12.0 - eqt) % 24.0
+
+    def sun_angle_time(self, angle, portion, before_noon=False):
+        """Time (hours, local solar) when the sun is `angle` degrees below the horizon"""
+        decl, eqt = sun_position(self.jd + portion)
+        noon = (12.0 - eqt) % 24.0
+        sin_decl = math.sin(decl * _RAD)
+        cos_decl = math.cos(decl * _RAD)
+        cos_h = (-math.sin(angle * _RAD) - sin_decl * self.sin_lat) / (cos_decl * self.cos_lat)
+        if cos_h < -1.0 or cos_h > 1.0:
+            return math.nan
+        t = math.acos(cos_h) * _DEG / 15.0
+        return noon - t if before_noon else noon + t
+
+    def asr_time(self, factor, portion):
+        decl, _ = sun_position(self.jd + portion)
+        # Sun altitude at which an object's shadow is `factor` times its length
+        # plus its noon shadow
+        angle = -math.atan(1.0 / (factor + math.tan(abs(self.lat - decl) * _RAD))) * _DEG
+        return self.sun_angle_time(angle, portion)
+
+
+def _round_minutes(hours):
+    if math.isnan(hours):
+        raise ValueError(NO_SUNRISE)
+    return int(math.floor(hours * 60.0 + 0.5)) % 1440
+
+
+def compute_prayer_minutes(day, lat, lng, tz_offset, method=2, school=1):
+    """
+    Compute the five daily prayers for a date.
+
+    `day` is a datetime.date, `tz_offset` its UTC offset in hours. Returns a
+    dict of prayer name -> minutes since local midnight.
+    """
+    params = METHODS[method]
+    jd = julian_day(day.year, day.month, day.day) - lng / (15.0 * 24.0)
+    state = _Day(jd, lat)
+
+    # One refinement pass from the PrayTimes default guesses (hours / 24)
+    fajr = state.sun_angle_time(params['fajr'], 5 / 24.0, before_noon=True)
+    sunrise = state.sun_angle_time(RISE_SET_ANGLE, 6 / 24.0, before_noon=True)
+    dhuhr = state.mid_day(12 / 24.0)
+    asr = state.asr_time(ASR_FACTORS[school], 13 / 24.0)
+    sunset = state.sun_angle_time(RISE_SET_ANGLE, 18 / 24.0)
+    if params['isha'] is not None:
+        isha = state.sun_angle_time(params['isha'], 18 / 24.0)
+    else:
+        isha = math.nan
+
+    # High latitude adjustment (angle-based, Aladhan's default): Fajr and Isha
+    # may not be further from sunrise/sunset than angle/60 of the night
+    night = (sunrise - sunset) % 24.0
+    fajr_portion = params['fajr'] / 60.0 * night
+    if math.isnan(fajr) or (sunrise - fajr) % 24.0 > fajr_portion:
+        fajr = sunrise - fajr_portion
+    if params['isha'] is not None:
+        isha_portion = params['isha'] / 60.0 * night
+        if math.isnan(isha) or (isha - sunset) % 24.0 > isha_portion:
+            isha = sunset + isha_portion
+    else:
+        isha = sunset + params['isha_minutes'] / 60.0
+
+    tz_adjust = tz_offset - lng / 15.0
+    return {
+        'Fajr': _round_minutes(fajr + tz_adjust),
+        'Dhuhr': _round_minutes(dhuhr + tz_adjust),
+        'Asr': _round_minutes(asr + tz_adjust),
+        'Maghrib': _round_minutes(sunset + tz_adjust),
+        'Isha': _round_minutes(isha + tz_adjust),
+    }
+
+
+def format_minutes(minutes):
+    """Format minutes since midnight as HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def compute_prayer_times(day, lat, lng, tz_offset, method=2, school=1):
+    """Same as compute_prayer_minutes, formatted as HH:MM strings like Aladhan"""
+    minutes = compute_prayer_minutes(day, lat, lng, tz_offset, method, school)
+    return {name: format_minutes(value) for name, value in minutes.items()}
+
+
+def _sun_position_np(jd):
+    """Vectorized sun_position over an array of Julian days"""
+    import numpy as np
+    d = jd - 2451545.0
+    g = np.radians((357.529 + 0.98560028 * d) % 360.0)
+    q = (280.459 + 0.98564736 * d) % 360.0
+    ecliptic_lng = np.radians((q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360.0)
+    obliquity = np.radians(23.439 - 0.00000036 * d)
+
+    sin_l = np.sin(ecliptic_lng)
+    right_ascension = (np.degrees(np.arctan2(np.cos(obliquity) * sin_l, np.cos(ecliptic_lng))) / 15.0) % 24.0
+    equation_of_time = q / 15.0 - right_ascension
+    declination = np.degrees(np.arcsin(np.sin(obliquity) * sin_l))
+    return declination, equation_of_time
+
+
+def _sun_angle_time_np(jd, lat, angle, portion, before_noon=False):
+    import numpy as np
+    decl, eqt = _sun_position_np(jd + portion)
+    noon = (12.0 - eqt) % 24.0
+    decl = np.radians(decl)
+    lat = math.radians(lat)
+    cos_h = (-np.sin(np.radians(angle)) - np.sin(decl) * math.sin(lat)) / (np.cos(decl) * math.cos(lat))
+    # Out of range where the sun never reaches the angle; those become NaN
+    with np.errstate(invalid='ignore'):
+        t = np.degrees(np.arccos(cos_h)) / 15.0
+    return noon - t if before_noon else noon + t
+
+
+def compute_prayer_minutes_range(start, days, lat, lng, tz_offset, method=2, school=1):
+    """
+    Compute the five daily prayers for `days` consecutive dates from `start`.
+
+    `tz_offset` is the UTC offset in hours, or a sequence of one offset per
+    date. Returns an int array of shape (days, 5) of minutes since local
+    midnight, columns in PRAYER_NAMES order.
+    """
+    import numpy as np
+    params = METHODS[method]
+    jd = julian_day(start.year, start.month, start.day) - lng / (15.0 * 24.0) + np.arange(days, dtype=np.float64)
+
+    fajr = _sun_angle_time_np(jd, lat, params['fajr'], 5 / 24.0, before_noon=True)
+    sunrise = _sun_angle_time_np(jd, lat, RISE_SET_ANGLE, 6 / 24.0, before_noon=True)
+    _, eqt = _sun_position_np(jd + 12 / 24.0)
+    dhuhr = (12.0 - eqt) % 24.0
+    decl, _ = _sun_position_np(jd + 13 / 24.0)
+    asr_angle = -np.degrees(np.arctan(1.0 / (ASR_FACTORS[school] + np.tan(np.radians(np.abs(lat - decl))))))
+    asr = _sun_angle_time_np(jd, lat, asr_angle, 13 / 24.0)
+    sunset = _sun_angle_time_np(jd, lat, RISE_SET_ANGLE, 18 / 24.0)
+
+    night = (sunrise - sunset) % 24.0
+    fajr_portion = params['fajr'] / 60.0 * night
+    fajr = np.where(np.isnan(fajr) | ((sunrise - fajr) % 24.0 > fajr_portion), sunrise - fajr_portion, fajr)
+    if params['isha'] is not None:
+        isha = _sun_angle_time_np(jd, lat, params['isha'], 18 / 24.0)
+        isha_portion = params['isha'] / 60.0 * night
+        isha = np.where(np.isnan(isha) | ((isha - sunset) % 24.0 > isha_portion), sunset + isha_portion, isha)
+    else:
+        isha = sunset + params['isha_minutes'] / 60.0
+
+    tz_offset = np.asarray(tz_offset, dtype=np.float64).reshape(-1, 1)
+    hours = np.stack([fajr, dhuhr, asr, sunset, isha], axis=1) + (tz_offset - lng / 15.0)
+    if np.isnan(hours).any():
+        raise ValueError(NO_SUNRISE)
+    return np.floor(hours * 60.0 + 0.5).astype(np.int64) % 1440
@@ -0,0 +1,156 @@
+"""
+Server-sent event push of today's timings and the current / next prayer.
+
+One Broadcaster per worker holds the latest message of each event type and a
+short history of recent messages, all pre-encoded once. Subscribers only keep
+the version they have sent up to, so an idle connection costs a suspended
+generator and nothing per message. A subscriber that falls further behind
+than the history is resynchronized from the latest snapshot.
+
+PrayerStream drives the broadcaster: it publishes `timings` when the day's
+timings change (an adjustment was saved, or midnight rolled over) and
+`prayer` when a new prayer starts, sleeping until the next such moment in
+between. Saved adjustments wake it early through notify(). Prayer starts
+are the integer minutes of the day's timeline (day_times), which may fall
+before midnight or after it once adjusted, not the 12h times shown.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Sent to idle connections so proxies do not time them out
+HEARTBEAT = b': keep-alive\n\n'
+
+
+def format_event(event, data, version):
+    return f"event: {event}\nid: {version}\ndata: {data}\n\n".encode()
+
+
+class Broadcaster:
+    def __init__(self, history=64):
+        self.version = 0
+        self._history = deque(maxlen=history)
+        self._latest = {}
+        self._waiter = None
+
+    def publish(self, event, data):
+        """Send `data` (a single-line string) to every subscriber as `event`"""
+        self.version += 1
+        message = format_event(event, data, self.version)
+        self._history.append(message)
+        self._latest[event] = message
+        self.wake()
+
+    def wake(self):
+        """Wake every subscriber; those with nothing new send a heartbeat"""
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        self._waiter = None
+
+    def snapshot(self):
+        return b''.join(self._latest.values())
+
+    async def _wait(self):
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        # Shielded: a disconnecting subscriber must not cancel the shared future
+        await asyncio.shield(self._waiter)
+
+    async def subscribe(self):
+        """Yield the current state, then every message published after it"""
+        seen = self.version
+        yield self.snapshot()
+        while True:
+            if self.version == seen:
+                await self._wait()
+                if self.version == seen:
+                    yield HEARTBEAT
+                    continue
+            missed = self.version - seen
+            seen = self.version
+            if missed > len(self._history):
+                yield self.snapshot()
+            else:
+                yield b''.join(list(self._history)[-missed:])
+
+
+def current_and_next(starts, minute):
+    """(current prayer, next prayer) at `minute`; current is None before Fajr"""
+    current = next_prayer = None
+    for name, start in starts.items():
+        if start <= minute:
+            current = name
+        elif next_prayer is None:
+            next_prayer = name
+    return current, next_prayer
+
+
+class PrayerStream:
+    def __init__(self, load_day, tz, heartbeat=15.0):
+        """
+        `load_day(date)` returns the serialized PrayerTimings of a DD-MMM-YYYY
+        date and {prayer: adjusted start in minutes from its midnight}; `tz`
+        is the location's tzinfo
+        """
+        self.load_day = load_day
+        self.tz = tz
+        self.heartbeat = heartbeat
+        self.broadcaster = Broadcaster()
+        self.date = None
+        self._fingerprint = None
+        self._prayer = None
+        self._changed = asyncio.Event()
+
+    def notify(self, date=None):
+        """Recheck today's timings now if `date` (None for any date) is today"""
+        if date is None or date == self.date:
+            self._changed.set()
+
+    async def refresh(self, now=None):
+        """Publish whatever changed since the last refresh; return seconds until the next prayer or midnight"""
+        now = now or datetime.now(self.tz)
+        date = now.strftime('%d-%b-%Y')
+        body, starts = await self.load_day(date)
+        timings = json.loads(body)
+        # Ids and created_at differ per build; only the content matters
+        fingerprint = (
+            timings['hijri_date'], timings['hijri_month'], timings['hijri_year'],
+            tuple((p['name'], p['start_time'], p['end_time']) for p in timings['prayers'])
+        )
+        if date != self.date or fingerprint != self._fingerprint:
+            self.date = date
+            self._fingerprint = fingerprint
+            self.broadcaster.publish('timings', body.decode())
+
+        minute = now.hour * 60 + now.minute
+        current, next_prayer = current_and_next(starts, minute)
+        prayer = {
+            'date': date,
+            'current': current,
+            'next': next_prayer,
+            'next_start': next(p['start_time'] for p in timings['prayers'] if p['name'] == next_prayer) if next_prayer else None
+        }
+        if prayer != self._prayer:
+            self._prayer = prayer
+            self.broadcaster.publish('prayer', json.dumps(prayer))
+
+        next_minute = starts[next_prayer] if next_prayer else 24 * 60
+        return (next_minute - minute) * 60 - now.second - now.microsecond / 1e6
+
+    async def run(self):
+        while True:
+            self._changed.clear()
+            try:
+                delay = await self.refresh()
+            except Exception as e:
+                logger.warning(f"Prayer stream refresh failed: {e}")
+                delay = self.heartbeat
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=max(0.0, min(delay, self.heartbeat)))
+            except asyncio.TimeoutError:
+                self.broadcaster.wake()
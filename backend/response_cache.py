@@ -0,0 +1,171 @@
+"""
+In-process cache of fully assembled, pre-serialized responses.
+
+ResponseCache is a bounded LRU of JSON bytes keyed by date. Writes that
+change a date invalidate it locally right away and are published through
+InvalidationLog, a version counter plus an append-only log of changed dates
+in Mongo. Every worker polls the counter and drops the dates written since
+the version it last saw, so caches across workers converge within one poll
+interval. Publishing None instead of a date invalidates everything, for
+changes such as adjustment rules that affect many dates at once; bulk writes
+publish their dates together as one entry.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from mongo import pymongo_module
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[1]
+
+    def put(self, key, body):
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class InvalidationLog:
+    COUNTER_ID = 'adjustments'
+
+    def __init__(self, counters, log, cache):
+        self.counters = counters
+        self.log = log
+        self.cache = cache
+        self.seen_version = 0
+        # Version of the last change to each date seen since `baseline`;
+        # dates not listed last changed at or before it
+        self.baseline = 0
+        self.date_versions = {}
+        # Optional coroutine function called after a global invalidation
+        self.on_reset = None
+        # Optional callback called with each invalidated date, None for all
+        self.on_invalidate = None
+
+    async def ensure_indexes(self):
+        await self.log.create_index('version', unique=True)
+        # The log only needs to outlive the poll interval; keep a day of it
+        await self.log.create_index('created_at', expireAfterSeconds=24 * 3600)
+
+    async def current_version(self):
+        doc = await self.counters.find_one({'_id': self.COUNTER_ID})
+        return doc['version'] if doc else 0
+
+    async def start(self):
+        """Start from the current version; nothing is cached yet"""
+        self.seen_version = await self.current_version()
+        self._reset(self.seen_version)
+
+    def _reset(self, version):
+        self.baseline = version
+        self.date_versions.clear()
+
+    def version_of(self, date):
+        """A version that changes whenever the adjustments of `date` do, as far as this worker has seen"""
+        return self.date_versions.get(date, self.baseline)
+
+    async def _append(self, entry):
+        doc = await self.counters.find_one_and_update(
+            {'_id': self.COUNTER_ID},
+            {'$inc': {'version': 1}},
+            upsert=True,
+            return_document=pymongo_module().ReturnDocument.AFTER
+        )
+        await self.log.insert_one({
+            'version': doc['version'],
+            **entry,
+            'created_at': datetime.now(timezone.utc)
+        })
+        return doc['version']
+
+    async def publish(self, date=None):
+        """Record that `date` (or, for None, everything) changed so other workers drop it too"""
+        version = await self._append({'date': date})
+        if date is None:
+            self._reset(version)
+        else:
+            self.date_versions[date] = version
+        return version
+
+    async def publish_dates(self, dates):
+        """Record that all of `dates` changed, as a single log entry"""
+        # 'date' is None so that a worker that predates 'dates' treats it as global
+        version = await self._append({'date': None, 'dates': list(dates)})
+        for date in dates:
+            self.date_versions[date] = version
+        return version
+
+    async def changes(self, since, until):
+        """
+        {date: version of its last change} for the versions after `since` up
+        to `until`, or None if everything may have changed in between
+        """
+        entries = [doc async for doc in self.log.find({'version': {'$gt': since, '$lte': until}})]
+        if len(entries) != until - since or any(doc['date'] is None and 'dates' not in doc for doc in entries):
+            # A global change, or entries expired / not yet visible
+            return None
+        changed = {}
+        for doc in entries:
+            for date in doc.get('dates') or [doc['date']]:
+                changed[date] = max(doc['version'], changed.get(date, 0))
+        return changed
+
+    async def poll(self):
+        version = await self.current_version()
+        if version == self.seen_version:
+            return
+        changed = await self.changes(self.seen_version, version)
+        if changed is not None:
+            for date, date_version in changed.items():
+                self.date_versions[date] = max(date_version, self.date_versions.get(date, 0))
+                self.cache.invalidate(date)
+                if self.on_invalidate is not None:
+                    self.on_invalidate(date)
+        else:
+            # A global change, or entries expired / not yet visible: drop
+            # everything to be safe
+            self._reset(version)
+            self.cache.clear()
+            if self.on_reset is not None:
+                await self.on_reset()
+            if self.on_invalidate is not None:
+                self.on_invalidate(None)
+        self.seen_version = version
+
+    async def run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Cache invalidation poll failed: {e}")
@@ -1,36 +1,355 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import hashlib
 import logging
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
 import uuid
-from datetime import datetime, timezone
-import requests
-import json
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache, partial
+from mongo import LazyDatabase, LazyMongo
+from timings_cache import TimingsCache
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, Registry
+from response_cache import ResponseCache, InvalidationLog
+from adjustment_rules import RuleIndex
+from adjustment_history import HIJRI, PRAYERS, RULE, AdjustmentHistory, rule_event, state_event
+from prayer_stream import PrayerStream
+from timetable_store import DUPLICATE_KEY, TimetableStore
+from http_cache import ANY, cache_control, listed_versions, make_etag, match_etag, version_etag
+from hijri_calendar import HIJRI_MONTHS, to_day_number, to_hijri
+from locations import DEFAULT_CITY, Location, coordinate_location, load_cities, parse_tz
+from prayer_calc import PRAYER_NAMES, compute_prayer_minutes, compute_prayer_minutes_range, format_minutes
+from day_times import (
+    ISHA_ENDS, adjustment_sources, apply_adjustments, format_12h, index_adjustments, parse_minutes, timeline
+)
+from timetable_pack import CONTENT_TYPE as TIMETABLE_PACK_CONTENT_TYPE, pack_delta, pack_full
+from timings_json import dump_json, timestamp, timings_ids
+
+if TYPE_CHECKING:
+    # Imported when the Aladhan session is created
+    import aiohttp
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection (MONGO_URL, DB_NAME), opened on first use; motor and
+# pymongo are only imported then
+mongo = LazyMongo()
+db = LazyDatabase(mongo)
+
+# Where prayer times come from, for single dates, ranges and exports alike:
+# 'aladhan' fetches them upstream and falls back to the local engine per
+# date, 'local' computes them in-process. Aladhan stays
+# the default until the engine is shown to match recorded Aladhan responses
+# (tests/record_aladhan_fixtures.py)
+PRAYER_TIMES_SOURCE = os.environ.get('PRAYER_TIMES_SOURCE', 'aladhan')
+
+# When Isha ends: 'fajr' (the next day's Fajr) or 'midnight' (halfway from Maghrib to the next Fajr)
+ISHA_END = os.environ.get('ISHA_END', 'fajr')
+if ISHA_END not in ISHA_ENDS:
+    raise ValueError(f"ISHA_END must be one of {ISHA_ENDS}, not {ISHA_END!r}")
+
+# Upstream Aladhan API client settings
+ALADHAN_API_URL = os.environ.get('ALADHAN_API_URL', 'http://api.aladhan.com/v1')
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', '5'))
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get('UPSTREAM_MAX_CONNECTIONS', '100'))
+
+# Stop calling Aladhan after this many consecutive failures; retry after
+# UPSTREAM_BREAKER_RESET seconds, doubling up to UPSTREAM_BREAKER_MAX_RESET
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', '5'))
+UPSTREAM_BREAKER_RESET = float(os.environ.get('UPSTREAM_BREAKER_RESET', '30'))
+UPSTREAM_BREAKER_MAX_RESET = float(os.environ.get('UPSTREAM_BREAKER_MAX_RESET', '600'))
+
+# Upstream timings are cached in Mongo: fresh for TIMINGS_CACHE_FRESH_TTL,
+# then served stale while revalidating until TIMINGS_CACHE_STALE_TTL
+TIMINGS_CACHE_FRESH_TTL = int(os.environ.get('TIMINGS_CACHE_FRESH_TTL', str(7 * 24 * 3600)))
+TIMINGS_CACHE_STALE_TTL = int(os.environ.get('TIMINGS_CACHE_STALE_TTL', str(90 * 24 * 3600)))
+
+# In-process cache of serialized /prayer-times/{date} responses
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '1024'))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '3600'))
+CACHE_INVALIDATION_POLL_INTERVAL = float(os.environ.get('CACHE_INVALIDATION_POLL_INTERVAL', '2'))
+
+# Edge / browser lifetimes of per-date responses without adjustments
+PAST_DATE_MAX_AGE = int(os.environ.get('PAST_DATE_MAX_AGE', str(30 * 24 * 3600)))
+FUTURE_DATE_MAX_AGE = int(os.environ.get('FUTURE_DATE_MAX_AGE', '3600'))
+
+# Window of dates kept materialized around today, and how often the window job runs
+MATERIALIZE_DAYS_BEFORE = int(os.environ.get('MATERIALIZE_DAYS_BEFORE', '30'))
+MATERIALIZE_DAYS_AFTER = int(os.environ.get('MATERIALIZE_DAYS_AFTER', '400'))
+MATERIALIZE_INTERVAL = float(os.environ.get('MATERIALIZE_INTERVAL', str(6 * 3600)))
+# Seconds after startup before the first window job, so that it does not
+# compete with the first requests of a cold worker
+MATERIALIZE_DELAY = float(os.environ.get('MATERIALIZE_DELAY', '15'))
+# Dates fetched at once with the 'aladhan' source, when materializing (each
+# up to two upstream calls) or building a range
+MATERIALIZE_CONCURRENCY = int(os.environ.get('MATERIALIZE_CONCURRENCY', '8'))
+
+# Keep-alive interval of /prayer-times/stream connections
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('STREAM_HEARTBEAT_INTERVAL', '15'))
+
+# Warm-up at startup: open the Mongo and upstream pools and fill the caches
+# for today ± WARMUP_DAYS and the month view of every city. 'block' holds
+# startup (and so the listening socket) for up to WARMUP_TIMEOUT seconds,
+# 'background' serves right away while it runs, 'off' skips it
+WARMUP = os.environ.get('WARMUP', 'block')
+if WARMUP not in ('block', 'background', 'off'):
+    raise ValueError(f"WARMUP must be 'block', 'background' or 'off', not {WARMUP!r}")
+WARMUP_DAYS = int(os.environ.get('WARMUP_DAYS', '3'))
+WARMUP_TIMEOUT = float(os.environ.get('WARMUP_TIMEOUT', '20'))
+
+# Shared directory where each worker writes its metrics every
+# METRICS_FLUSH_INTERVAL seconds so /metrics covers all workers; unset with one worker
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+
+metrics = Registry()
+HTTP_REQUESTS = metrics.counter('http_requests_total', 'HTTP requests by method, route and status', ('method', 'route', 'status'))
+HTTP_LATENCY = metrics.histogram('http_request_duration_seconds', 'Time to the start of the response by route', ('route',))
+STAGE_SECONDS = metrics.histogram('stage_duration_seconds', 'Time spent in each stage of building prayer timings', ('stage',))
+STAGES = {
+    stage: STAGE_SECONDS.labels(stage)
+    for stage in (
+        'upstream_fetch', 'timings_cache', 'local_compute', 'mongo_timetable', 'mongo_adjustments',
+        'mongo_hijri_adjustments', 'hijri_adjustment', 'prayer_assembly', 'range_assembly', 'serialization'
+    )
+}
+TIMINGS_SOURCE = metrics.counter(
+    'prayer_timings_source_total',
+    'Per-date timings by where they came from: response_cache, timetable, computed or degraded',
+    ('source',)
+)
+FALLBACKS = metrics.counter('upstream_fallbacks_total', 'Aladhan lookups answered by the local engine, by reason', ('reason',))
+# Copied from the components' own stats on every snapshot
+RESPONSE_CACHE_EVENTS = metrics.counter('response_cache_events_total', 'Response cache hits, misses and invalidations', ('event',))
+RESPONSE_CACHE_ENTRIES = metrics.gauge('response_cache_entries', 'Entries in the response cache')
+TIMINGS_CACHE_EVENTS = metrics.counter('timings_cache_events_total', 'Upstream timings cache lookups, fetches and errors', ('event',))
+BREAKER_EVENTS = metrics.counter('upstream_breaker_events_total', 'Aladhan circuit breaker calls, failures, short circuits and openings', ('event',))
+BREAKER_STATE = metrics.gauge('upstream_breaker_state', '1 for the current state of the Aladhan circuit breaker', ('state',))
+WARMUP_SECONDS = metrics.gauge('warmup_duration_seconds', 'Time the startup warm-up of this worker took')
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+invalidation_log = InvalidationLog(db.cache_versions, db.cache_invalidations, response_cache)
+
+def observed(stage, awaitable):
+    """Await `awaitable`, recording its duration as `stage`"""
+    async def run():
+        with STAGES[stage].time():
+            return await awaitable
+    return run()
+
+# Bump when materialized bodies change for the same inputs without a
+# PrayerTimings / PrayerTime field changing
+TIMETABLE_FORMAT = 1
+
+@lru_cache(maxsize=None)
+def timetable_fingerprint(location_key):
+    """
+    Everything a materialized body depends on besides the adjustments: its
+    format, ISHA_END, the source and the city's settings; all fixed at startup
+    """
+    settings = (
+        TIMETABLE_FORMAT, sorted(PrayerTimings.model_fields), sorted(PrayerTime.model_fields),
+        ISHA_END, PRAYER_TIMES_SOURCE, CITIES[location_key].as_dict()
+    )
+    return hashlib.sha1(repr(settings).encode()).hexdigest()[:16]
+
+# Final adjusted timings for the dates around today
+timetable_store = TimetableStore(db.timetable, db.cache_versions, timetable_fingerprint)
+
+# Every adjustment and rule change, for deltas and point-in-time timetables
+adjustment_history = AdjustmentHistory(db.adjustment_events, db.cache_versions)
+
+# Precompiled ranged / Hijri month adjustment rules per location key, reloaded on change
+adjustment_rules: Dict[str, RuleIndex] = {}
+NO_RULES = RuleIndex()
+
+# Shared async HTTP session, opened and closed in the app lifespan
+http_session: Optional["aiohttp.ClientSession"] = None
+
+# Startup warm-up, None when it is off; /api/ready waits for it
+warmup_task: Optional[asyncio.Task] = None
+
+def create_http_session():
+    """Create the pooled keep-alive session used for upstream calls"""
+    # Only the 'aladhan' source needs aiohttp, so it is not imported before
+    import aiohttp
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=UPSTREAM_MAX_CONNECTIONS,
+            keepalive_timeout=30,
+            ttl_dns_cache=300
+        ),
+        timeout=aiohttp.ClientTimeout(
+            total=None,
+            connect=UPSTREAM_CONNECT_TIMEOUT,
+            sock_read=UPSTREAM_READ_TIMEOUT
+        )
+    )
+
+MONTH_ABBREVIATIONS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def format_date(day):
+    """DD-MMM-YYYY of a date, for the per-date loops of ranges where strftime adds up"""
+    return f"{day.day:02d}-{MONTH_ABBREVIATIONS[day.month - 1]}-{day.year}"
+
+def iso_date_key(date_str):
+    """Convert a DD-MMM-YYYY date to its sortable YYYY-MM-DD key"""
+    return datetime.strptime(date_str, '%d-%b-%Y').strftime('%Y-%m-%d')
+
+async def migrate_date_keys():
+    """Backfill the ISO day key on adjustment documents that only have the legacy date"""
+    migrated = 0
+    from pymongo import UpdateOne
+    for collection in (db.adjustments, db.hijri_adjustments):
+        operations = []
+        async for doc in collection.find({"day": {"$exists": False}}, {"_id": 1, "date": 1}):
+            try:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"day": iso_date_key(doc["date"])}}))
+            except (KeyError, ValueError):
+                logger.warning(f"Skipping {collection.name} document with unparseable date: {doc.get('date')}")
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            migrated += result.modified_count
+    return migrated
+
+async def migrate_locations():
+    """Scope adjustments and rules saved before locations existed to the default city"""
+    migrated = 0
+    for collection in (db.adjustments, db.hijri_adjustments, db.adjustment_rules):
+        result = await collection.update_many({"location": {"$exists": False}}, {"$set": {"location": DEFAULT_CITY}})
+        migrated += result.modified_count
+    await timetable_store.drop_unscoped()
+    return migrated
+
+async def load_adjustment_rules():
+    """Rebuild the in-memory rule indexes from the adjustment_rules collection"""
+    global adjustment_rules
+    rules = await db.adjustment_rules.find({}, {"_id": 0}).sort("created_at", 1).to_list(length=None)
+    by_location = {}
+    for rule in rules:
+        by_location.setdefault(rule.get("location", DEFAULT_CITY), []).append(rule)
+    adjustment_rules = {key: RuleIndex(location_rules) for key, location_rules in by_location.items()}
+
+def rules_for(location):
+    return adjustment_rules.get(location.key, NO_RULES)
+
+async def ensure_indexes():
+    """Create the indexes every per-date lookup relies on"""
+    from pymongo.errors import OperationFailure
+    for collection in (db.adjustments, db.hijri_adjustments):
+        await collection.create_index([("location", 1), ("date", 1)], unique=True)
+        # Sortable ISO key for range scans; legacy documents may not have it yet
+        await collection.create_index(
+            [("location", 1), ("day", 1)], unique=True, partialFilterExpression={"day": {"$exists": True}}
+        )
+        # Dates were unique on their own before adjustments had a location;
+        # dropped only once the indexes above enforce uniqueness instead
+        for legacy_index in ("date_1", "day_1"):
+            try:
+                await collection.drop_index(legacy_index)
+            except OperationFailure:
+                pass
+    await invalidation_log.ensure_indexes()
+    await timetable_store.ensure_indexes()
+    await adjustment_history.ensure_indexes()
+    if PRAYER_TIMES_SOURCE == 'aladhan':
+        await timings_cache.ensure_indexes()
+
+async def startup_step(description, step):
+    """Await `step()`, logging a failure instead of raising; None if it failed"""
+    try:
+        return await step()
+    except Exception as e:
+        logger.warning(f"Could not {description} at startup: {e}")
+        return None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup and close them on shutdown"""
+    global http_session, warmup_task
+    # Writes rely on the unique indexes to keep one document per date, so
+    # without them startup fails
+    await ensure_indexes()
+    if PRAYER_TIMES_SOURCE == 'aladhan':
+        http_session = create_http_session()
+    # Each step on its own, so one failing does not skip the others; they
+    # are all retried at the next startup
+    migrated = await startup_step("add ISO day keys to adjustments", migrate_date_keys)
+    if migrated:
+        logger.info(f"Added ISO day keys to {migrated} adjustment documents")
+    migrated = await startup_step("scope adjustments to locations", migrate_locations)
+    if migrated:
+        logger.info(f"Scoped {migrated} adjustment documents to {DEFAULT_CITY}")
+    logged = await startup_step("backfill the adjustment history", partial(
+        adjustment_history.backfill_once, {PRAYERS: db.adjustments, HIJRI: db.hijri_adjustments}, db.adjustment_rules
+    ))
+    if logged:
+        logger.info(f"Added {logged} adjustment documents and rules to the history")
+    await startup_step("read the cache invalidation version", invalidation_log.start)
+    # Without its rules a worker would serve wrong timings, so that fails startup
+    await load_adjustment_rules()
+    # Other workers' rule changes arrive as global invalidations
+    invalidation_log.on_reset = load_adjustment_rules
+    invalidation_log.on_invalidate = notify_streams
+    invalidation_task = asyncio.create_task(invalidation_log.run(CACHE_INVALIDATION_POLL_INTERVAL))
+    warmup_task = asyncio.create_task(warm_up()) if WARMUP != 'off' else None
+    if WARMUP == 'block':
+        done, _ = await asyncio.wait({warmup_task}, timeout=WARMUP_TIMEOUT)
+        if not done:
+            logger.warning(f"Warm-up still running after {WARMUP_TIMEOUT}s, serving while it finishes")
+    stream_tasks = [asyncio.create_task(stream.run()) for stream in prayer_streams.values()]
+    materialize_task = asyncio.create_task(run_materialization())
+    metrics_task = asyncio.create_task(run_metrics_flush()) if METRICS_DIR else None
+    try:
+        yield
+    finally:
+        if metrics_task is not None:
+            metrics_task.cancel()
+        materialize_task.cancel()
+        # Their dates stay invalidated until the next window job rebuilds them
+        for task in list(rematerialize_tasks):
+            task.cancel()
+        if warmup_task is not None:
+            warmup_task.cancel()
+        for task in stream_tasks:
+            task.cancel()
+        invalidation_task.cancel()
+        if http_session is not None:
+            await http_session.close()
+            http_session = None
+        mongo.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Create a router with the /api prefix; its routes are added to the app as
+# they are (see below), so dependency overrides are looked up on the app
+api_router = APIRouter(prefix="/api", dependency_overrides_provider=app)
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Configured cities (Hyderabad plus any in CITIES_FILE); Hyderabad is the
+# default location: ISNA angles, Hanafi Asr, IST without daylight saving
+CITIES = load_cities(os.environ.get('CITIES_FILE'))
+DEFAULT_LOCATION = CITIES[DEFAULT_CITY]
 
-# Hyderabad coordinates
-HYDERABAD_LAT = 17.3850
-HYDERABAD_LNG = 78.4867
+# Longest range served by /prayer-times/range and /adjustments, and most dates per bulk adjustment write
+MAX_RANGE_DAYS = 732
+
+# Longest range of a packed timetable export
+MAX_EXPORT_DAYS = 5 * 366
 
 # Define Models
+# PrayerTime and PrayerTimings document the response schema; responses are
+# built as dicts of the same shape (build_prayer_timings, timings_json)
 class PrayerTime(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -39,14 +358,18 @@ class PrayerTime(BaseModel):
     start_adjustment: int = 0  # Manual adjustment for start time in minutes
     end_adjustment: int = 0    # Manual adjustment for end time in minutes
     adjustment: int = 0  # Deprecated: kept for backward compatibility
+    # Where the adjustments come from: 'date' (saved for this date), 'rule' or None
+    adjustment_source: Optional[str] = None
 
 class PrayerTimings(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     date: str  # DD-MMM-YYYY format
+    location: str = DEFAULT_CITY  # City id or quantized coordinates key
     hijri_date: str
     hijri_month: str
     hijri_year: str
     prayers: List[PrayerTime]
+    degraded: bool = False  # Computed locally because the configured upstream failed
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class PrayerAdjustment(BaseModel):
@@ -58,336 +381,1316 @@ class PrayerAdjustment(BaseModel):
 class ManualAdjustments(BaseModel):
     adjustments: List[PrayerAdjustment]
 
+class PrayerAdjustmentChange(BaseModel):
+    prayer_name: str
+    # Only the given fields change
+    start_adjustment: Optional[int] = None
+    end_adjustment: Optional[int] = None
+
+class AdjustmentChanges(BaseModel):
+    adjustments: List[PrayerAdjustmentChange]
+
 class HijriAdjustment(BaseModel):
     day_adjustment: int = 0  # +/- days to adjust Hijri date
 
+class BulkAdjustmentItem(BaseModel):
+    date: str  # DD-MMM-YYYY format
+    # Either or both; omitted fields leave the stored value unchanged
+    adjustments: Optional[List[PrayerAdjustment]] = None
+    day_adjustment: Optional[int] = None
+
+class BulkAdjustments(BaseModel):
+    items: List[BulkAdjustmentItem]
+
+class AdjustmentRule(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str = ""
+    location: str = DEFAULT_CITY  # City id
+    # Scope: either an inclusive Gregorian range (DD-MMM-YYYY) ...
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    # ... or a Hijri month, every year unless hijri_year is set
+    hijri_month: Optional[str] = None
+    hijri_year: Optional[int] = None
+    adjustments: List[PrayerAdjustment]
+
+# Map API month names to our month list
+HIJRI_MONTH_NAME_MAP = {
+    'Muḥarram': 'Muharram',
+    'Ṣafar': 'Safar',
+    'Rabīʿ al-awwal': 'Rabi al-awwal',
+    'Rabīʿ al-thānī': 'Rabi al-thani',
+    'Jumādá al-ūlá': 'Jumada al-awwal',
+    'Jumādá al-ākhirah': 'Jumada al-thani',
+    'Rajab': 'Rajab',
+    'Shaʿbān': 'Sha\'ban',
+    'Ramaḍān': 'Ramadan',
+    'Shawwāl': 'Shawwal',
+    'Dhū al-Qaʿdah': 'Dhu al-Qi\'dah',
+    'Dhū al-Ḥijjah': 'Dhu al-Hijjah'
+}
+
 def get_hijri_date(gregorian_date):
-    """Convert Gregorian date to Hijri date using simple calculation"""
-    # This is a simplified conversion - in production, use proper Hijri conversion library
-    from datetime import datetime
-    
-    # Simple approximation - Islamic calendar started on July 16, 622 CE
-    islamic_epoch = datetime(622, 7, 16)
-    
+    """Convert a Gregorian date (DD-Mon-YYYY string or date) to the Umm al-Qura Hijri date"""
     if isinstance(gregorian_date, str):
         gregorian_date = datetime.strptime(gregorian_date, '%d-%b-%Y')
+    year, month, day = to_hijri(gregorian_date.toordinal())
+    return {
+        'day': day,
+        'month': HIJRI_MONTHS[month - 1],
+        'year': year
+    }
+
+def compute_day_locally(date_str, location=DEFAULT_LOCATION):
+    """Start minutes per prayer and Hijri date of a date from the in-process solar position engine"""
+    day = datetime.strptime(date_str, '%d-%b-%Y').date()
+    minutes = compute_prayer_minutes(day, location.lat, location.lng, location.utc_offset(day), location.method, location.school)
+    return [minutes[name] for name in PRAYER_NAMES], get_hijri_date(day)
+
+async def fetch_prayer_times_from_aladhan(date_str, location=DEFAULT_LOCATION):
+    """Fetch prayer times from Aladhan API"""
+    # Convert DD-MMM-YYYY to DD-MM-YYYY for API
+    date_obj = datetime.strptime(date_str, '%d-%b-%Y')
+    api_date = date_obj.strftime('%d-%m-%Y')
     
-    days_diff = (gregorian_date - islamic_epoch).days
-    # Islamic year is approximately 354.367 days
-    hijri_year = int(days_diff / 354.367) + 1
+    params = {
+        "latitude": location.lat,
+        "longitude": location.lng,
+        "method": location.method,
+        "school": location.school,
+        # Aladhan only takes zone names; a fixed offset is applied to its UTC times below
+        "timezonestring": location.tz if isinstance(location.tz, str) else "UTC"
+    }
     
-    remaining_days = days_diff % 354.367
-    hijri_month = int(remaining_days / 29.53) + 1
-    hijri_day = int(remaining_days % 29.53) + 1
+    with STAGES['upstream_fetch'].time():
+        async with http_session.get(f"{ALADHAN_API_URL}/timings/{api_date}", params=params) as response:
+            if response.status != 200:
+                raise Exception(f"API error: {response.status}")
+            data = await response.json()
     
-    # Hijri month names
-    hijri_months = [
-        'Muharram', 'Safar', 'Rabi al-awwal', 'Rabi al-thani',
-        'Jumada al-awwal', 'Jumada al-thani', 'Rajab', 'Sha\'ban',
-        'Ramadan', 'Shawwal', 'Dhu al-Qi\'dah', 'Dhu al-Hijjah'
-    ]
+    timings = data['data']['timings']
+    hijri_data = data['data']['date']['hijri']
     
-    if hijri_month > 12:
-        hijri_month = 12
+    # Extract 5 main prayers
+    prayer_times = {
+        'Fajr': timings['Fajr'],
+        'Dhuhr': timings['Dhuhr'], 
+        'Asr': timings['Asr'],
+        'Maghrib': timings['Maghrib'],
+        'Isha': timings['Isha']
+    }
+    if not isinstance(location.tz, str):
+        shift = round(location.tz * 60)
+        prayer_times = {name: format_minutes((parse_minutes(value) + shift) % 1440) for name, value in prayer_times.items()}
     
-    return {
-        'day': hijri_day,
-        'month': hijri_months[hijri_month - 1] if hijri_month <= 12 else hijri_months[11],
-        'year': hijri_year
+    # Return prayer times and Hijri date from API
+    hijri_date_info = {
+        'day': hijri_data['day'],
+        'month': hijri_data['month']['en'],
+        'year': hijri_data['year']
     }
+    
+    return prayer_times, hijri_date_info
+
+upstream_breaker = CircuitBreaker(
+    'aladhan',
+    failure_threshold=UPSTREAM_BREAKER_FAILURES,
+    reset_timeout=UPSTREAM_BREAKER_RESET,
+    max_reset_timeout=UPSTREAM_BREAKER_MAX_RESET
+)
+
+async def fetch_cacheable_timings(key):
+    """Upstream fetch in the shape stored by timings_cache"""
+    location = Location('', key['lat'], key['lng'], key['tz'], method=key['method'], school=key['school'])
+    prayer_times, hijri_date_info = await upstream_breaker.call(fetch_prayer_times_from_aladhan, key['date'], location)
+    return {'prayer_times': prayer_times, 'hijri': hijri_date_info}
+
+timings_cache = TimingsCache(
+    db.timings_cache,
+    fetch_cacheable_timings,
+    fresh_ttl=TIMINGS_CACHE_FRESH_TTL,
+    stale_ttl=TIMINGS_CACHE_STALE_TTL
+)
+
+async def fetch_source_day(date_str, location=DEFAULT_LOCATION):
+    """
+    Start minutes per prayer, Hijri date and whether the result is degraded,
+    for a date at a location from the configured source
+    """
+    if PRAYER_TIMES_SOURCE == 'aladhan':
+        try:
+            payload = await observed('timings_cache', timings_cache.get({
+                "date": date_str,
+                "lat": location.lat,
+                "lng": location.lng,
+                "tz": location.tz,
+                "method": location.method,
+                "school": location.school
+            }))
+            return [parse_minutes(payload['prayer_times'][name]) for name in PRAYER_NAMES], payload['hijri'], False
+        except CircuitOpenError:
+            # Not cached and Aladhan is known to be down: no request was made
+            FALLBACKS.inc('circuit_open')
+        except Exception as e:
+            FALLBACKS.inc('upstream_error')
+            # Once the breaker has opened its own log line covers the outage
+            if upstream_breaker.state == CLOSED:
+                logger.warning(f"Aladhan fetch failed for {date_str}, computing locally: {e}")
+        with STAGES['local_compute'].time():
+            return (*compute_day_locally(date_str, location), True)
+    with STAGES['local_compute'].time():
+        return (*compute_day_locally(date_str, location), False)
+
+async def get_prayer_times_from_api(date_str, location=DEFAULT_LOCATION):
+    """
+    Timeline (day_times), Hijri date and whether the result is degraded, for
+    a date at a location from the configured source
+    """
+    next_date = (datetime.strptime(date_str, '%d-%b-%Y') + timedelta(days=1)).strftime('%d-%b-%Y')
+    # The next day's Fajr comes from the same source; adjacent dates are usually cached
+    (starts, hijri, degraded), (next_starts, _, next_degraded) = await asyncio.gather(
+        fetch_source_day(date_str, location), fetch_source_day(next_date, location)
+    )
+    return timeline(starts, next_starts), hijri, degraded or next_degraded
 
-def calculate_end_times(prayer_times):
-    """Calculate end times for each prayer"""
-    prayers = ['Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha']
-    end_times = {}
+async def load_source_range(start, days, location=DEFAULT_LOCATION):
+    """
+    Start minutes, Hijri dates and degraded flags of `days` consecutive
+    dates from `start`, from the configured source; the local engine
+    computes them all in one vectorized pass
+    """
+    if PRAYER_TIMES_SOURCE == 'local':
+        offsets = [location.utc_offset(start + timedelta(days=i)) for i in range(days)]
+        rows = compute_prayer_minutes_range(
+            start, days, location.lat, location.lng, offsets, location.method, location.school
+        ).tolist()
+        return rows, [get_hijri_date(start + timedelta(days=i)) for i in range(days)], [False] * days
     
-    for i, prayer in enumerate(prayers):
-        if i < len(prayers) - 1:
-            # End time is the start of next prayer
-            end_times[prayer] = prayer_times[prayers[i + 1]]
-        else:
-            # Isha ends at Fajr next day (we'll show until midnight for simplicity)
-            end_times[prayer] = "23:59"
+    limit = asyncio.Semaphore(MATERIALIZE_CONCURRENCY)
+    
+    async def fetch(day):
+        async with limit:
+            return await fetch_source_day(day.strftime('%d-%b-%Y'), location)
     
-    return end_times
+    results = await asyncio.gather(*(fetch(start + timedelta(days=i)) for i in range(days)))
+    rows, hijris, degraded = (list(column) for column in zip(*results))
+    return rows, hijris, degraded
 
-def format_time_12h_no_ampm(time_24h):
-    """Convert 24h to 12h format without AM/PM"""
+def shift_hijri(hijri, hijri_day_adjustment):
+    """Hijri (year, month number, day) of a date after its stored day adjustment"""
+    # Normalize the month name
+    normalized_month = HIJRI_MONTH_NAME_MAP.get(hijri['month'], hijri['month'])
+    if normalized_month is None:
+        normalized_month = 'Muharram'  # Fallback
+    
+    # Find current month index
     try:
-        hour, minute = map(int, time_24h.split(':'))
-        if hour == 0:
-            return f"12:{minute:02d}"
-        elif hour <= 12:
-            return f"{hour}:{minute:02d}"
-        else:
-            return f"{hour-12}:{minute:02d}"
-    except:
-        return time_24h
+        current_month_index = HIJRI_MONTHS.index(normalized_month)
+    except ValueError:
+        # Fallback: try to find partial match
+        current_month_index = 0
+        for idx, month in enumerate(HIJRI_MONTHS):
+            if month.lower() in normalized_month.lower() or normalized_month.lower() in month.lower():
+                current_month_index = idx
+                break
+    
+    if not hijri_day_adjustment:
+        return int(hijri['year']), current_month_index + 1, int(hijri['day'])
+    # Shift by whole days through the calendar so month lengths are exact
+    return to_hijri(
+        to_day_number(int(hijri['year']), current_month_index + 1, int(hijri['day'])) + hijri_day_adjustment
+    )
 
-async def get_prayer_times_from_api(date_str):
-    """Fetch prayer times from Aladhan API"""
-    try:
-        # Convert DD-MMM-YYYY to DD-MM-YYYY for API
-        date_obj = datetime.strptime(date_str, '%d-%b-%Y')
-        api_date = date_obj.strftime('%d-%m-%Y')
-        
-        url = "http://api.aladhan.com/v1/timings"
-        params = {
-            "latitude": HYDERABAD_LAT,
-            "longitude": HYDERABAD_LNG,
-            "method": 2,  # Islamic Society of North America
-            "school": 1   # Hanafi madhab (0=Shafi, 1=Hanafi)
+def adjust_hijri(hijri, hijri_day_adjustment):
+    """shift_hijri, recorded as the hijri_adjustment stage"""
+    with STAGES['hijri_adjustment'].time():
+        return shift_hijri(hijri, hijri_day_adjustment)
+
+def adjust_times(date, day_timeline, adjustments, adjusted_hijri, location=DEFAULT_LOCATION, rules=None, day_number=None):
+    """
+    (adjustment slots, their sources, adjusted (start, end) minutes per
+    prayer) of one date; `rules` is a RuleIndex other than the location's
+    current one, `day_number` the date's ordinal if the caller has it
+    """
+    adjusted_hijri_year, adjusted_month_number, _ = adjusted_hijri
+    if rules is None:
+        rules = rules_for(location)
+    if day_number is None:
+        day_number = datetime.strptime(date, '%d-%b-%Y').toordinal()
+    # Adjustments from ranged / Hijri month rules; per-date adjustments win
+    rule_adjustments = rules.resolve(
+        day_number,
+        HIJRI_MONTHS[adjusted_month_number - 1],
+        adjusted_hijri_year
+    )
+    slots = index_adjustments(adjustments, rule_adjustments)
+    return slots, adjustment_sources(adjustments, rule_adjustments), apply_adjustments(day_timeline, slots, ISHA_END)
+
+def assemble_timings(date, day_timeline, adjusted_hijri, adjustments, location, rules, created_at, day_number=None):
+    """PrayerTimings-shaped dict of one date from its timeline and adjusted Hijri date"""
+    # Integer minutes until here; strings only for the response
+    slots, sources, minutes = adjust_times(date, day_timeline, adjustments, adjusted_hijri, location, rules, day_number)
+    timings_id, *prayer_ids = timings_ids(location.key, date, len(PRAYER_NAMES))
+    prayers = [
+        {
+            "id": prayer_id,
+            "name": prayer_name,
+            "start_time": format_12h(start),
+            "end_time": format_12h(end),
+            "start_adjustment": start_adjustment,
+            "end_adjustment": end_adjustment,
+            "adjustment": start_adjustment,  # For backward compatibility
+            "adjustment_source": source
+        }
+        for prayer_id, prayer_name, (start, end), (start_adjustment, end_adjustment), source
+        in zip(prayer_ids, PRAYER_NAMES, minutes, slots, sources)
+    ]
+    
+    adjusted_hijri_year, adjusted_month_number, adjusted_hijri_day = adjusted_hijri
+    return {
+        "id": timings_id,
+        "date": date,
+        "location": location.key,
+        "hijri_date": f"{adjusted_hijri_day}",
+        "hijri_month": HIJRI_MONTHS[adjusted_month_number - 1],
+        "hijri_year": str(adjusted_hijri_year),
+        "prayers": prayers,
+        "degraded": False,
+        "created_at": created_at
+    }
+
+def build_prayer_timings(
+    date, day_timeline, hijri, adjustments, hijri_day_adjustment, location=DEFAULT_LOCATION, rules=None
+):
+    """
+    Apply stored prayer and Hijri adjustments to the timeline (day_times) of
+    one date; returns a PrayerTimings-shaped dict
+    """
+    adjusted_hijri = adjust_hijri(hijri, hijri_day_adjustment)
+    with STAGES['prayer_assembly'].time():
+        return assemble_timings(
+            date, day_timeline, adjusted_hijri, adjustments, location, rules, timestamp(datetime.now(timezone.utc))
+        )
+
+async def load_adjustments(date, location=DEFAULT_LOCATION):
+    """Get stored prayer and Hijri adjustments for a date at a location, both lookups in parallel"""
+    if location.key not in CITIES:
+        # Only configured cities have adjustments
+        return [], 0
+    query = {"location": location.key, "date": date}
+    stored_adjustments, hijri_adjustment_doc = await asyncio.gather(
+        observed('mongo_adjustments', db.adjustments.find_one(query, {"_id": 0, "adjustments": 1})),
+        observed('mongo_hijri_adjustments', db.hijri_adjustments.find_one(query, {"_id": 0, "day_adjustment": 1}))
+    )
+    adjustments = stored_adjustments.get("adjustments", []) if stored_adjustments else []
+    hijri_day_adjustment = hijri_adjustment_doc.get("day_adjustment", 0) if hijri_adjustment_doc else 0
+    return adjustments, hijri_day_adjustment
+
+async def load_adjustments_for_range(start, end, location=DEFAULT_LOCATION):
+    """Get stored adjustments for an inclusive date range with one range scan per collection"""
+    if location.key not in CITIES:
+        return {}, {}
+    day_range = {"$gte": start.strftime('%Y-%m-%d'), "$lte": end.strftime('%Y-%m-%d')}
+    legacy_dates = [(start + timedelta(days=i)).strftime('%d-%b-%Y') for i in range((end - start).days + 1)]
+    # Dual read: ISO-keyed documents by range, not yet migrated ones by legacy date
+    query = {"location": location.key, "$or": [
+        {"day": day_range},
+        {"day": {"$exists": False}, "date": {"$in": legacy_dates}}
+    ]}
+    stored_adjustments, hijri_adjustment_docs = await asyncio.gather(
+        db.adjustments.find(query, {"_id": 0, "date": 1, "adjustments": 1}).to_list(length=None),
+        db.hijri_adjustments.find(query, {"_id": 0, "date": 1, "day_adjustment": 1}).to_list(length=None)
+    )
+    adjustments_by_date = {doc["date"]: doc.get("adjustments", []) for doc in stored_adjustments}
+    hijri_adjustments_by_date = {doc["date"]: doc.get("day_adjustment", 0) for doc in hijri_adjustment_docs}
+    return adjustments_by_date, hijri_adjustments_by_date
+
+def is_adjusted(timings, hijri_day_adjustment):
+    """Whether stored adjustments or rules change a date's timings"""
+    return bool(hijri_day_adjustment) or any(p["start_adjustment"] or p["end_adjustment"] for p in timings["prayers"])
+
+async def load_range_inputs(start, end, location=DEFAULT_LOCATION, at=None):
+    """
+    Start minutes (one extra day), Hijri dates and degraded flags from the
+    configured source, and stored adjustments, for an inclusive date range;
+    with `at`, the adjustments as they were then
+    """
+    days = (end - start).days + 1
+    if days < 1:
+        raise ValueError("'from' must not be after 'to'")
+    if days > MAX_RANGE_DAYS:
+        raise ValueError(f"Range is limited to {MAX_RANGE_DAYS} days")
+    
+    # One extra day for the last date's next Fajr
+    rows, hijris, degraded = await load_source_range(start, days + 1, location)
+    if at is None:
+        adjustments_by_date, hijri_adjustments_by_date = await load_adjustments_for_range(start, end, location)
+    else:
+        adjustments_by_date, hijri_adjustments_by_date = await adjustment_history.state_at(
+            location.key, start.isoformat(), end.isoformat(), at
+        )
+    return rows, hijris, degraded, adjustments_by_date, hijri_adjustments_by_date
+
+async def build_timetable_entries(start, end, location=DEFAULT_LOCATION, at=None):
+    """(timings, adjusted) for every date from start to end inclusive; with `at`, as they were at that moment"""
+    rows, hijris, degraded, adjustments_by_date, hijri_adjustments_by_date = await load_range_inputs(start, end, location, at)
+    rules = rules_for(location) if at is None else RuleIndex(await adjustment_history.rules_at(location.key, at))
+    # One timestamp and one stage observation for the whole range
+    created_at = timestamp(datetime.now(timezone.utc))
+    started = time.perf_counter()
+    first = start.toordinal()
+    timetable = []
+    for i in range(len(rows) - 1):
+        date = format_date(start + timedelta(days=i))
+        hijri_day_adjustment = hijri_adjustments_by_date.get(date, 0)
+        timings = assemble_timings(
+            date,
+            timeline(rows[i], rows[i + 1]),
+            shift_hijri(hijris[i], hijri_day_adjustment),
+            adjustments_by_date.get(date, []),
+            location,
+            rules,
+            created_at,
+            first + i
+        )
+        timings["degraded"] = degraded[i]
+        timetable.append((timings, is_adjusted(timings, hijri_day_adjustment)))
+    STAGES['range_assembly'].observe(time.perf_counter() - started)
+    return timetable
+
+async def build_timetable(start, end, location=DEFAULT_LOCATION, at=None):
+    """Adjusted timings for every date from start to end inclusive"""
+    return [timings for timings, _ in await build_timetable_entries(start, end, location, at)]
+
+async def build_export_days(start, end, location=DEFAULT_LOCATION):
+    """(date, adjusted minutes, adjusted Hijri date) for every date from start to end inclusive"""
+    days = []
+    rules = rules_for(location)
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=MAX_RANGE_DAYS - 1))
+        rows, hijris, _, adjustments_by_date, hijri_adjustments_by_date = await load_range_inputs(start, chunk_end, location)
+        started = time.perf_counter()
+        for i in range(len(rows) - 1):
+            day = start + timedelta(days=i)
+            date = format_date(day)
+            hijri = shift_hijri(hijris[i], hijri_adjustments_by_date.get(date, 0))
+            _, _, minutes = adjust_times(
+                date, timeline(rows[i], rows[i + 1]), adjustments_by_date.get(date, []), hijri, location, rules,
+                day.toordinal()
+            )
+            days.append((day, minutes, hijri))
+        STAGES['range_assembly'].observe(time.perf_counter() - started)
+        start = chunk_end + timedelta(days=1)
+    return days
+
+async def build_timetable_export(start, end, location=DEFAULT_LOCATION, since=None):
+    """
+    Packed timetable (timetable_pack) of the dates from start to end inclusive,
+    stamped with the location's adjustment history sequence number.
+
+    With `since`, the number of a timetable the client already has, only the
+    dates changed after it are packed, as a delta; if a rule changed since
+    then, the whole range is.
+    """
+    span = (end - start).days + 1
+    if span < 1:
+        raise ValueError("'from' must not be after 'to'")
+    if span > MAX_EXPORT_DAYS:
+        raise ValueError(f"Exports are limited to {MAX_EXPORT_DAYS} days")
+    # Read the number first so a concurrent write can only make it too old,
+    # and rules after it, since other workers' rule changes may not have
+    # reached this one yet
+    if since is None:
+        version = await adjustment_history.current_seq(location.key)
+    else:
+        version, changes = await adjustment_history.changes(location.key, since)
+    await load_adjustment_rules()
+    
+    if since is not None and not any(event['field'] == RULE for event in changes):
+        wanted = {
+            day for day in (datetime.strptime(event['date'], '%d-%b-%Y').date() for event in changes)
+            if start <= day <= end
         }
+        days = []
+        if wanted:
+            days = [
+                entry for entry in await build_export_days(min(wanted), max(wanted), location)
+                if entry[0] in wanted
+            ]
+        return pack_delta(location.key, version, start, span, days)
+    
+    days = await build_export_days(start, end, location)
+    return pack_full(location.key, version, start, [(minutes, hijri) for _, minutes, hijri in days])
+
+async def build_date_entry(date, location=DEFAULT_LOCATION):
+    """(timings, adjusted) for one date from the configured source"""
+    # Get prayer times, Hijri date and stored adjustments concurrently
+    (day_timeline, hijri, degraded), (adjustments, hijri_day_adjustment) = await asyncio.gather(
+        get_prayer_times_from_api(date, location),
+        load_adjustments(date, location)
+    )
+    timings = build_prayer_timings(date, day_timeline, hijri, adjustments, hijri_day_adjustment, location)
+    timings["degraded"] = degraded
+    return timings, is_adjusted(timings, hijri_day_adjustment)
+
+def local_today(location):
+    return datetime.now(location.tzinfo).date()
+
+def materialized_window(location=DEFAULT_LOCATION):
+    """First and last date kept in the timetable store"""
+    today = local_today(location)
+    return today - timedelta(days=MATERIALIZE_DAYS_BEFORE), today + timedelta(days=MATERIALIZE_DAYS_AFTER)
+
+async def materialize(days, location=DEFAULT_LOCATION):
+    """Build and store the final timings of the given dates (date objects) inside a city's window"""
+    if location.key not in CITIES:
+        return 0
+    first, last = materialized_window(location)
+    days = sorted(day for day in set(days) if first <= day <= last)
+    if not days:
+        return 0
+    stamp = await timetable_store.next_stamp()
+    # Rules of other workers may not have reached this one yet; the stamp
+    # orders this build after them only if it reads them itself
+    await load_adjustment_rules()
+    
+    if PRAYER_TIMES_SOURCE == 'local':
+        wanted = set(days)
+        entries = []
+        start = days[0]
+        while start <= days[-1]:
+            end = min(days[-1], start + timedelta(days=MAX_RANGE_DAYS - 1))
+            entries.extend(
+                entry for entry in await build_timetable_entries(start, end, location)
+                if datetime.strptime(entry[0]["date"], '%d-%b-%Y').date() in wanted
+            )
+            start = end + timedelta(days=1)
+    else:
+        # A window is hundreds of dates; all at once would be a burst the
+        # upstream breaker trips on
+        limit = asyncio.Semaphore(MATERIALIZE_CONCURRENCY)
         
-        response = requests.get(f"{url}/{api_date}", params=params)
+        async def build(day):
+            async with limit:
+                return await build_date_entry(day.strftime('%d-%b-%Y'), location)
         
-        if response.status_code == 200:
-            data = response.json()
-            timings = data['data']['timings']
-            hijri_data = data['data']['date']['hijri']
-            
-            # Extract 5 main prayers
-            prayer_times = {
-                'Fajr': timings['Fajr'],
-                'Dhuhr': timings['Dhuhr'], 
-                'Asr': timings['Asr'],
-                'Maghrib': timings['Maghrib'],
-                'Isha': timings['Isha']
-            }
-            
-            end_times = calculate_end_times(prayer_times)
-            
-            # Return prayer times and Hijri date from API
-            hijri_date_info = {
-                'day': hijri_data['day'],
-                'month': hijri_data['month']['en'],
-                'year': hijri_data['year']
-            }
-            
-            return prayer_times, end_times, hijri_date_info
-        else:
-            raise Exception(f"API error: {response.status_code}")
-            
+        entries = await asyncio.gather(*(build(day) for day in days))
+        # Leave degraded dates to be served live until Aladhan is back
+        entries = [entry for entry in entries if not entry[0]["degraded"]]
+    
+    return await timetable_store.put_many(
+        location.key,
+        [(iso_date_key(timings["date"]), dump_json(timings), adjusted) for timings, adjusted in entries],
+        stamp,
+        datetime.now(timezone.utc)
+    )
+
+async def rematerialize(dates, location=DEFAULT_LOCATION):
+    """Rebuild materialized dates after their adjustments changed; drop them if that fails"""
+    days = [datetime.strptime(date, '%d-%b-%Y').date() for date in dates]
+    try:
+        await materialize(days, location)
     except Exception as e:
-        # Fallback times if API fails
-        prayer_times = {
-            'Fajr': '05:30',
-            'Dhuhr': '12:30',
-            'Asr': '16:00',
-            'Maghrib': '18:30',
-            'Isha': '20:00'
-        }
-        end_times = calculate_end_times(prayer_times)
-        # Use manual calculation as fallback
-        hijri_date_info = get_hijri_date(date_str)
-        return prayer_times, end_times, hijri_date_info
+        logger.warning(f"Could not rematerialize {len(days)} dates of {location.key}, serving them unmaterialized: {e}")
+        await timetable_store.delete(location.key, [day.isoformat() for day in days])
+
+# Background rebuilds of bulk writes, kept so they are not collected before they finish
+rematerialize_tasks = set()
+
+def rematerialize_later(dates, location=DEFAULT_LOCATION):
+    """Run rematerialize after the response, for batches too large to rebuild while the client waits"""
+    task = asyncio.create_task(rematerialize(dates, location))
+    rematerialize_tasks.add(task)
+    task.add_done_callback(rematerialize_tasks.discard)
+
+async def materialize_window(location=DEFAULT_LOCATION):
+    """Materialize every date of a city's rolling window and drop the ones that left it"""
+    first, last = materialized_window(location)
+    written = await materialize((first + timedelta(days=i) for i in range((last - first).days + 1)), location)
+    pruned = await timetable_store.prune(location.key, first.isoformat())
+    return written, pruned
+
+async def rematerialize_window(location=DEFAULT_LOCATION):
+    """Rebuild a city's whole window after a rule change; drop it if that fails"""
+    try:
+        await materialize_window(location)
+    except Exception as e:
+        logger.warning(f"Could not rematerialize the {location.key} timetable, serving it unmaterialized: {e}")
+        await timetable_store.clear(location.key)
+
+async def run_materialization():
+    """
+    Materialize every city's window shortly after startup and then every
+    MATERIALIZE_INTERVAL, in whichever worker claims it first
+    """
+    await asyncio.sleep(MATERIALIZE_DELAY)
+    # Half the interval, so workers whose timers drift apart still take turns
+    # rather than each finding the window claimed by the other
+    claim_interval = timedelta(seconds=MATERIALIZE_INTERVAL / 2)
+    while True:
+        for location in CITIES.values():
+            try:
+                if not await timetable_store.claim_window(location.key, datetime.now(timezone.utc), claim_interval):
+                    continue
+                written, pruned = await materialize_window(location)
+                logger.info(f"Materialized {location.key} timetable: {written} dates written, {pruned} pruned")
+            except Exception as e:
+                logger.warning(f"Timetable materialization failed for {location.key}: {e}")
+        await asyncio.sleep(MATERIALIZE_INTERVAL)
+
+async def warm_up():
+    """Open the Mongo and upstream pools and fill the caches with the dates clients ask for first"""
+    started = time.perf_counter()
+    failed = 0
+    try:
+        await db.command('ping')
+    except Exception as e:
+        failed += 1
+        logger.warning(f"Warm-up could not reach MongoDB: {e}")
+    for location in CITIES.values():
+        today = local_today(location)
+        month_end = (today.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        # Concurrently, so several pooled connections are opened
+        results = await asyncio.gather(
+            *(load_prayer_timings((today + timedelta(days=i)).strftime('%d-%b-%Y'), location)
+              for i in range(-WARMUP_DAYS, WARMUP_DAYS + 1)),
+            build_timetable(today.replace(day=1), month_end, location),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            failed += len(errors)
+            logger.warning(f"Warm-up of {location.key} failed for {len(errors)} requests: {errors[0]}")
+    elapsed = time.perf_counter() - started
+    WARMUP_SECONDS.set(elapsed)
+    logger.info(f"Warmed up {len(CITIES)} cities in {elapsed:.2f}s ({failed} failed)")
 
 # Add your routes to the router
 @api_router.get("/")
 async def root():
     return {"message": "Namaz Timing App API"}
 
+def get_location(
+    city: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    tz: Optional[str] = None,
+    method: Optional[int] = None,
+    school: Optional[int] = None
+):
+    """
+    Location from the query: a city id, or lat/lng/tz (a time zone name or a
+    UTC offset in hours) with optional method/school; Hyderabad by default
+    """
+    if lat is None and lng is None:
+        if tz is not None or method is not None or school is not None:
+            raise HTTPException(status_code=400, detail="tz, method and school are only used with lat and lng")
+        city = city or DEFAULT_CITY
+        if city not in CITIES:
+            raise HTTPException(status_code=404, detail=f"Unknown city: {city}")
+        return CITIES[city]
+    if city is not None:
+        raise HTTPException(status_code=400, detail="Give either city or lat/lng, not both")
+    if lat is None or lng is None or tz is None:
+        raise HTTPException(status_code=400, detail="lat, lng and tz are all required")
+    try:
+        return coordinate_location(
+            lat, lng, parse_tz(tz),
+            DEFAULT_LOCATION.method if method is None else method,
+            DEFAULT_LOCATION.school if school is None else school
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_city(location: Location = Depends(get_location)):
+    """Location of a request that needs a configured city (adjustments, streams)"""
+    if location.key not in CITIES:
+        raise HTTPException(status_code=400, detail="Only configured cities have adjustments; pass city instead of coordinates")
+    return location
+
+def canonical_date(date: str):
+    """
+    A date path parameter as adjustments are stored and cached (01-Oct-2026),
+    so 1-oct-2026 finds and writes the same document
+    """
+    try:
+        return format_date(datetime.strptime(date, '%d-%b-%Y'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {date}, expected DD-MMM-YYYY")
+
+@api_router.get("/ready")
+async def readiness():
+    """200 once the startup warm-up is done, 503 until then"""
+    if warmup_task is not None and not warmup_task.done():
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True}
+
+@api_router.get("/cities")
+async def list_cities():
+    """Configured cities that can be requested by id"""
+    return [location.as_dict() for location in CITIES.values()]
+
+@api_router.get("/prayer-times/range", response_model=List[PrayerTimings])
+async def get_prayer_times_range(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    at: Optional[datetime] = None,
+    location: Location = Depends(get_location)
+):
+    """
+    Get prayer times for every date in an inclusive range (DD-MMM-YYYY
+    format); with `at` (ISO 8601, UTC unless it has an offset), as they were
+    shown at that moment
+    """
+    try:
+        start = datetime.strptime(from_date, '%d-%b-%Y').date()
+        end = datetime.strptime(to_date, '%d-%b-%Y').date()
+        if at is not None and at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        # Serialized here; response_model only documents the schema
+        return Response(content=dump_json(await build_timetable(start, end, location, at)), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/prayer-times/export")
+async def export_prayer_times(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    since: Optional[int] = None,
+    location: Location = Depends(get_location)
+):
+    """Packed timetable of an inclusive date range for clients that look dates up offline; `since` asks for a delta"""
+    try:
+        start = datetime.strptime(from_date, '%d-%b-%Y').date()
+        end = datetime.strptime(to_date, '%d-%b-%Y').date()
+        body = await build_timetable_export(start, end, location, since)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type=TIMETABLE_PACK_CONTENT_TYPE, headers={"Cache-Control": "no-cache"})
+
+@api_router.get("/prayer-times/month/{year}/{month}", response_model=List[PrayerTimings])
+async def get_prayer_times_month(year: int, month: int, location: Location = Depends(get_location)):
+    """Get prayer times for every date of a Gregorian month"""
+    try:
+        start = datetime(year, month, 1).date()
+        end = (datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).date()
+        return Response(content=dump_json(await build_timetable(start, end, location)), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def cache_key(date, location):
+    """Key of a date at a location in the response cache and the invalidation log"""
+    return f"{location.key}/{date}"
+
+async def load_prayer_timings(date, location=DEFAULT_LOCATION):
+    """
+    (adjustment version, serialized PrayerTimings, whether adjustments apply)
+    for a date; the version is None for a degraded result, which must not be cached
+    """
+    key = cache_key(date, location)
+    # Read the version first so a concurrent write can only make it too old
+    version = invalidation_log.version_of(key)
+    cached = response_cache.get(key)
+    if cached is not None and cached[0] == version:
+        TIMINGS_SOURCE.inc('response_cache')
+        return cached
+    
+    stored = None
+    if location.key in CITIES:
+        with STAGES['mongo_timetable'].time():
+            stored = await timetable_store.get(location.key, iso_date_key(date))
+    if stored is not None:
+        TIMINGS_SOURCE.inc('timetable')
+        entry = (version, *stored)
+    else:
+        # Outside the materialized window, or arbitrary coordinates
+        timings, adjusted = await build_date_entry(date, location)
+        with STAGES['serialization'].time():
+            body = dump_json(timings)
+        if timings["degraded"]:
+            TIMINGS_SOURCE.inc('degraded')
+            return None, body, adjusted
+        TIMINGS_SOURCE.inc('computed')
+        entry = (version, body, adjusted)
+    response_cache.put(key, entry)
+    return entry
+
+async def load_prayer_timings_body(date, location=DEFAULT_LOCATION):
+    """Serialized PrayerTimings for a date, from the response cache when possible"""
+    _, body, _ = await load_prayer_timings(date, location)
+    return body
+
+def caching_headers(date, location, version, adjusted):
+    """ETag and Cache-Control for a per-date response"""
+    if version is None:
+        return {"Cache-Control": "no-store"}
+    day = datetime.strptime(date, '%d-%b-%Y').date()
+    return {
+        "ETag": make_etag(day.isoformat(), version, adjusted),
+        "Cache-Control": cache_control(day, local_today(location), adjusted, PAST_DATE_MAX_AGE, FUTURE_DATE_MAX_AGE)
+    }
+
+def not_modified(request, date, location):
+    """A 304 if the client already has the current representation of `date`, else None"""
+    version = invalidation_log.version_of(cache_key(date, location))
+    adjusted = match_etag(request.headers.get("if-none-match"), iso_date_key(date), version)
+    if adjusted is None:
+        return None
+    return Response(status_code=304, headers=caching_headers(date, location, version, adjusted))
+
+async def load_stream_day(date, location=DEFAULT_LOCATION):
+    """Serialized timings of a date and each prayer's adjusted start minute, for its stream"""
+    body, (day_timeline, hijri, _), (adjustments, hijri_day_adjustment) = await asyncio.gather(
+        load_prayer_timings_body(date, location),
+        get_prayer_times_from_api(date, location),
+        load_adjustments(date, location)
+    )
+    _, _, minutes = adjust_times(date, day_timeline, adjustments, adjust_hijri(hijri, hijri_day_adjustment), location)
+    return body, {name: start for name, (start, _) in zip(PRAYER_NAMES, minutes)}
+
+# Push each city's timings and current / next prayer to connected clients
+prayer_streams = {
+    key: PrayerStream(partial(load_stream_day, location=location), location.tzinfo, STREAM_HEARTBEAT_INTERVAL)
+    for key, location in CITIES.items()
+}
+
+def notify_streams(key=None):
+    """Wake the stream a changed cache key belongs to; None wakes every stream"""
+    if key is None:
+        for stream in prayer_streams.values():
+            stream.notify()
+        return
+    location_key, _, date = key.rpartition('/')
+    stream = prayer_streams.get(location_key)
+    if stream is not None:
+        stream.notify(date)
+
+@api_router.get("/prayer-times/stream")
+async def stream_prayer_times(location: Location = Depends(get_city)):
+    """Server-sent events: today's `timings`, then `timings` / `prayer` events as they change"""
+    return StreamingResponse(
+        prayer_streams[location.key].broadcaster.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/prayer-times/{date}", response_model=PrayerTimings)
-async def get_prayer_times(date: str):
+async def get_prayer_times(
+    request: Request,
+    date: str = Depends(canonical_date), location: Location = Depends(get_location)
+):
     """Get prayer times for a specific date (DD-MMM-YYYY format)"""
     try:
-        # Get prayer times and Hijri date from API
-        prayer_times, end_times, hijri = await get_prayer_times_from_api(date)
-        
-        # Get stored prayer time adjustments
-        stored_adjustments = await db.adjustments.find_one({"date": date})
-        adjustments = stored_adjustments.get("adjustments", []) if stored_adjustments else []
-        
-        # Get Hijri date adjustment
-        hijri_adjustment_doc = await db.hijri_adjustments.find_one({"date": date})
-        hijri_day_adjustment = hijri_adjustment_doc.get("day_adjustment", 0) if hijri_adjustment_doc else 0
-        
-        # Apply Hijri date adjustment
-        hijri_months = [
-            'Muharram', 'Safar', 'Rabi al-awwal', 'Rabi al-thani',
-            'Jumada al-awwal', 'Jumada al-thani', 'Rajab', 'Sha\'ban',
-            'Ramadan', 'Shawwal', 'Dhu al-Qi\'dah', 'Dhu al-Hijjah'
-        ]
-        
-        # Map API month names to our month list
-        month_name_map = {
-            'Muḥarram': 'Muharram',
-            'Ṣafar': 'Safar',
-            'Rabīʿ al-awwal': 'Rabi al-awwal',
-            'Rabīʿ al-thānī': 'Rabi al-thani',
-            'Jumādá al-ūlá': 'Jumada al-awwal',
-            'Jumādá al-ākhirah': 'Jumada al-thani',
-            'Rajab': 'Rajab',
-            'Shaʿbān': 'Sha\'ban',
-            'Ramaḍān': 'Ramadan',
-            'Shawwāl': 'Shawwal',
-            'Dhū al-Qaʿdah': 'Dhu al-Qi\'dah',
-            'Dhū al-Ḥijjah': 'Dhu al-Hijjah'
-        }
-        
-        # Normalize the month name
-        normalized_month = month_name_map.get(hijri['month'], hijri['month'])
-        if normalized_month is None:
-            normalized_month = 'Muharram'  # Fallback
-        
-        # Find current month index
-        try:
-            current_month_index = hijri_months.index(normalized_month)
-        except ValueError:
-            # Fallback: try to find partial match
-            current_month_index = 0
-            for idx, month in enumerate(hijri_months):
-                if month.lower() in normalized_month.lower() or normalized_month.lower() in month.lower():
-                    current_month_index = idx
-                    break
-        
-        adjusted_hijri_day = int(hijri['day']) + hijri_day_adjustment
-        adjusted_hijri_month_index = current_month_index
-        adjusted_hijri_year = int(hijri['year'])
-        
-        # Handle day overflow/underflow with proper month transitions
-        while adjusted_hijri_day < 1:
-            # Go to previous month
-            adjusted_hijri_month_index -= 1
-            if adjusted_hijri_month_index < 0:
-                adjusted_hijri_month_index = 11
-                adjusted_hijri_year -= 1
-            adjusted_hijri_day += 30  # Approximate month length
-        
-        while adjusted_hijri_day > 30:
-            # Go to next month
-            adjusted_hijri_day -= 30
-            adjusted_hijri_month_index += 1
-            if adjusted_hijri_month_index > 11:
-                adjusted_hijri_month_index = 0
-                adjusted_hijri_year += 1
-        
-        adjusted_hijri_month = hijri_months[adjusted_hijri_month_index]
-        
-        # Create prayer objects with adjustments
-        prayers = []
-        for prayer_name, start_time in prayer_times.items():
-            # Find adjustments for this prayer
-            start_adjustment = 0
-            end_adjustment = 0
-            for adj in adjustments:
-                if adj["prayer_name"] == prayer_name:
-                    # Support both old and new format
-                    start_adjustment = adj.get("start_adjustment", adj.get("adjustment", 0))
-                    end_adjustment = adj.get("end_adjustment", 0)
-                    break
-            
-            # Apply start time adjustment
-            start_time_obj = datetime.strptime(start_time, '%H:%M')
-            start_total_minutes = start_time_obj.hour * 60 + start_time_obj.minute + start_adjustment
-            
-            # Handle overflow/underflow
-            start_total_minutes = max(0, min(start_total_minutes, 24 * 60 - 1))
-            
-            adjusted_start_hour = start_total_minutes // 60
-            adjusted_start_minute = start_total_minutes % 60
-            adjusted_start_str = f"{adjusted_start_hour:02d}:{adjusted_start_minute:02d}"
-            
-            # Apply end time adjustment
-            end_time_obj = datetime.strptime(end_times[prayer_name], '%H:%M')
-            end_total_minutes = end_time_obj.hour * 60 + end_time_obj.minute + end_adjustment
-            
-            # Handle overflow/underflow
-            end_total_minutes = max(0, min(end_total_minutes, 24 * 60 - 1))
-            
-            adjusted_end_hour = end_total_minutes // 60
-            adjusted_end_minute = end_total_minutes % 60
-            adjusted_end_str = f"{adjusted_end_hour:02d}:{adjusted_end_minute:02d}"
-            
-            # Format to 12h no AM/PM
-            formatted_start = format_time_12h_no_ampm(adjusted_start_str)
-            formatted_end = format_time_12h_no_ampm(adjusted_end_str)
-            
-            prayers.append(PrayerTime(
-                name=prayer_name,
-                start_time=formatted_start,
-                end_time=formatted_end,
-                start_adjustment=start_adjustment,
-                end_adjustment=end_adjustment,
-                adjustment=start_adjustment  # For backward compatibility
-            ))
-        
-        return PrayerTimings(
-            date=date,
-            hijri_date=f"{adjusted_hijri_day}",
-            hijri_month=adjusted_hijri_month,
-            hijri_year=str(adjusted_hijri_year),
-            prayers=prayers
+        cached = not_modified(request, date, location)
+        if cached is not None:
+            return cached
+        version, body, adjusted = await load_prayer_timings(date, location)
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=caching_headers(date, location, version, adjusted)
         )
-        
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@api_router.post("/adjust-prayers/{date}")
-async def adjust_prayer_times(date: str, adjustments: ManualAdjustments):
-    """Save manual adjustments for prayer times"""
-    try:
-        adjustment_data = {
+@api_router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters of the caches in this worker"""
+    return {
+        "timings_cache": timings_cache.stats,
+        "response_cache": {**response_cache.stats, "size": len(response_cache)}
+    }
+
+@api_router.get("/upstream-status")
+async def get_upstream_status():
+    """Configured prayer times source and the state of the Aladhan circuit breaker"""
+    return {"source": PRAYER_TIMES_SOURCE, "aladhan": upstream_breaker.snapshot()}
+
+async def invalidate_date(date, location=DEFAULT_LOCATION):
+    """Drop cached responses for a date here and, via the log, in other workers"""
+    key = cache_key(date, location)
+    response_cache.invalidate(key)
+    notify_streams(key)
+    await invalidation_log.publish(key)
+
+def adjustment_update(field, value, date, location=DEFAULT_LOCATION):
+    """Update that sets one field of a date's stored adjustments and bumps their version"""
+    return {
+        "$set": {
+            "location": location.key,
             "date": date,
-            "adjustments": [adj.dict() for adj in adjustments.adjustments],
+            "day": iso_date_key(date),
+            field: value,
             "updated_at": datetime.now(timezone.utc)
-        }
-        
-        # Update or insert adjustments
-        await db.adjustments.update_one(
-            {"date": date},
-            {"$set": adjustment_data},
-            upsert=True
+        },
+        "$inc": {"version": 1}
+    }
+
+def merge_prayers_update(changes, date, location=DEFAULT_LOCATION):
+    """
+    Pipeline update that sets only the given fields of the given prayers'
+    stored adjustments and bumps their version. MongoDB evaluates it against
+    the document as it is at that moment, so concurrent changes to other
+    prayers or fields are kept rather than overwritten.
+    """
+    stored = {"$ifNull": ["$adjustments", []]}
+    merged = []
+    for change in changes:
+        fields = {}
+        if change.start_adjustment is not None:
+            fields["start_adjustment"] = fields["adjustment"] = change.start_adjustment
+        if change.end_adjustment is not None:
+            fields["end_adjustment"] = change.end_adjustment
+        # Entries saved before start_adjustment existed only have adjustment
+        start = {"$ifNull": ["$$entry.start_adjustment", {"$ifNull": ["$$entry.adjustment", 0]}]}
+        merged.append({"$let": {
+            # The prayer's stored entry (the first, as index_adjustments reads it), if any
+            "vars": {"entry": {"$ifNull": [
+                {"$arrayElemAt": [
+                    {"$filter": {"input": stored, "cond": {"$eq": ["$$this.prayer_name", change.prayer_name]}}}, 0
+                ]},
+                {}
+            ]}},
+            "in": {"$mergeObjects": [
+                "$$entry",
+                {
+                    "prayer_name": change.prayer_name,
+                    "start_adjustment": start,
+                    "end_adjustment": {"$ifNull": ["$$entry.end_adjustment", 0]},
+                    "adjustment": start
+                },
+                {"$literal": fields}
+            ]}
+        }})
+    names = [change.prayer_name for change in changes]
+    return [{"$set": {
+        "location": location.key,
+        "date": date,
+        "day": iso_date_key(date),
+        "adjustments": {"$concatArrays": [
+            {"$filter": {"input": stored, "cond": {"$not": [{"$in": ["$$this.prayer_name", names]}]}}},
+            merged
+        ]},
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        "updated_at": datetime.now(timezone.utc)
+    }}]
+
+async def save_adjustment(collection, date, update, location=DEFAULT_LOCATION, versions=None):
+    """
+    Apply `update` to a date's stored adjustments in one operation and
+    return the document after it; None if the If-Match `versions` (see
+    listed_versions) do not include the document's version
+    """
+    from pymongo import ReturnDocument
+    from pymongo.errors import DuplicateKeyError
+    query = {"location": location.key, "date": date}
+    # Only a write without a precondition, or one that expects version 0, may create the document
+    upsert = versions is None or (versions is not ANY and 0 in versions)
+    if versions is not None and versions is not ANY:
+        listed = {"version": {"$in": sorted(versions)}}
+        # Documents saved before versions existed are at version 0
+        query["$or"] = [listed, {"version": {"$exists": False}}] if 0 in versions else [listed]
+    try:
+        return await collection.find_one_and_update(query, update, upsert=upsert, return_document=ReturnDocument.AFTER)
+    except DuplicateKeyError:
+        if versions is None:
+            raise
+        # The upsert found the document at a version the precondition does not list
+        return None
+
+async def log_changes(location_key, events):
+    """Append to the adjustment history; an append that fails is made up at the next startup"""
+    try:
+        await adjustment_history.record(location_key, events)
+    except Exception as e:
+        logger.warning(f"Could not log {len(events)} adjustment changes of {location_key}: {e}")
+        try:
+            await adjustment_history.request_backfill()
+        except Exception as e:
+            logger.warning(f"Could not schedule an adjustment history backfill: {e}")
+
+async def write_adjustment(collection, field, date, make_update, request, response, location=DEFAULT_LOCATION):
+    """
+    Save a date's adjustment, conditional on the request's If-Match, then
+    log, rematerialize and invalidate it; returns the new version.
+    `make_update(date, location)` builds the update.
+    """
+    try:
+        versions = listed_versions(request.headers.get("if-match"), iso_date_key(date))
+        saved = await save_adjustment(collection, date, make_update(date, location), location, versions)
+        if saved is not None:
+            await log_changes(location.key, [state_event(field, saved)])
+            await rematerialize([date], location)
+            await invalidate_date(date, location)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if saved is None:
+        current = await collection.find_one({"location": location.key, "date": date}, {"_id": 0, "version": 1})
+        raise HTTPException(
+            status_code=412,
+            detail=f"The adjustments of {date} have changed since they were read; reload them and retry",
+            headers={"ETag": version_etag(iso_date_key(date), current.get("version", 0) if current else 0)}
         )
-        
-        return {"message": "Adjustments saved successfully"}
-        
+    response.headers["ETag"] = version_etag(saved["day"], saved["version"])
+    return saved["version"]
+
+def versioned_response(request, response, date, doc, body):
+    """`body` of a stored adjustment document with its version ETag, or a 304 if If-None-Match has it"""
+    day = iso_date_key(date)
+    version = doc.get("version", 0) if doc else 0
+    headers = {"ETag": version_etag(day, version), "Cache-Control": "no-cache"}
+    known = listed_versions(request.headers.get("if-none-match"), day, weak=True)
+    if known is ANY or (known and version in known):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return body
+
+@api_router.post("/adjust-prayers/{date}")
+async def adjust_prayer_times(
+    adjustments: ManualAdjustments, request: Request, response: Response,
+    date: str = Depends(canonical_date), location: Location = Depends(get_city)
+):
+    """Save manual adjustments for prayer times, replacing the date's list; If-Match makes it conditional"""
+    version = await write_adjustment(
+        db.adjustments, PRAYERS, date,
+        partial(adjustment_update, PRAYERS, [adj.model_dump() for adj in adjustments.adjustments]),
+        request, response, location
+    )
+    return {"message": "Adjustments saved successfully", "version": version}
+
+@api_router.patch("/adjustments/{date}")
+async def change_adjustments(
+    changes: AdjustmentChanges, request: Request, response: Response,
+    date: str = Depends(canonical_date), location: Location = Depends(get_city)
+):
+    """
+    Change only the given fields of the given prayers' adjustments for a
+    date, keeping the rest as stored; If-Match makes it conditional
+    """
+    names = [change.prayer_name for change in changes.adjustments]
+    unknown = [name for name in names if name not in PRAYER_NAMES]
+    if unknown or len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail=f"Give each prayer at most once, out of {', '.join(PRAYER_NAMES)}")
+    if not names or any(change.start_adjustment is None and change.end_adjustment is None for change in changes.adjustments):
+        raise HTTPException(status_code=400, detail="Nothing to change: give start_adjustment and/or end_adjustment")
+    version = await write_adjustment(
+        db.adjustments, PRAYERS, date, partial(merge_prayers_update, changes.adjustments), request, response, location
+    )
+    return {"message": "Adjustments saved successfully", "version": version}
+
+@api_router.get("/adjustments")
+async def list_adjustments(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    location: Location = Depends(get_city)
+):
+    """List saved prayer and Hijri adjustments in an inclusive date range (DD-MMM-YYYY format)"""
+    try:
+        start = datetime.strptime(from_date, '%d-%b-%Y').date()
+        end = datetime.strptime(to_date, '%d-%b-%Y').date()
+        if start > end:
+            raise ValueError("'from' must not be after 'to'")
+        # The lookup lists every date of the range for documents without a day key
+        if (end - start).days + 1 > MAX_RANGE_DAYS:
+            raise ValueError(f"Range is limited to {MAX_RANGE_DAYS} days")
+        adjustments_by_date, hijri_adjustments_by_date = await load_adjustments_for_range(start, end, location)
+        dates = sorted(
+            set(adjustments_by_date) | set(hijri_adjustments_by_date),
+            key=iso_date_key
+        )
+        return [
+            {
+                "date": date,
+                "adjustments": adjustments_by_date.get(date, []),
+                "day_adjustment": hijri_adjustments_by_date.get(date, 0)
+            }
+            for date in dates
+        ]
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.get("/adjustments/changes")
+async def get_adjustment_changes(since: int = Query(0, ge=0), location: Location = Depends(get_city)):
+    """
+    Latest adjustments of every date changed after history number `since`,
+    and the rules created or deleted since; pass the returned `version` as
+    the next `since`
+    """
+    try:
+        version, changes = await adjustment_history.changes(location.key, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"version": version, "changes": changes}
+
+@api_router.get("/adjustments/{date}/history")
+async def get_adjustment_history(date: str = Depends(canonical_date), location: Location = Depends(get_city)):
+    """Every saved prayer and Hijri adjustment of a date, oldest first"""
+    return await adjustment_history.for_date(location.key, date)
+
 @api_router.get("/adjustments/{date}")
-async def get_adjustments(date: str):
-    """Get saved adjustments for a date"""
+async def get_adjustments(
+    request: Request, response: Response,
+    date: str = Depends(canonical_date), location: Location = Depends(get_city)
+):
+    """Get saved adjustments for a date; its ETag is what If-Match takes to change them"""
     try:
-        adjustments = await db.adjustments.find_one({"date": date})
-        return adjustments.get("adjustments", []) if adjustments else []
+        doc = await db.adjustments.find_one({"location": location.key, "date": date}, {"_id": 0, "adjustments": 1, "version": 1})
+        return versioned_response(request, response, date, doc, doc.get("adjustments", []) if doc else [])
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.post("/adjust-hijri/{date}")
-async def adjust_hijri_date(date: str, hijri_adjustment: HijriAdjustment):
-    """Save Hijri date adjustment for a specific date"""
-    try:
-        adjustment_data = {
-            "date": date,
-            "day_adjustment": hijri_adjustment.day_adjustment,
-            "updated_at": datetime.now(timezone.utc)
+async def adjust_hijri_date(
+    hijri_adjustment: HijriAdjustment, request: Request, response: Response,
+    date: str = Depends(canonical_date), location: Location = Depends(get_city)
+):
+    """Save Hijri date adjustment for a specific date; If-Match makes it conditional"""
+    version = await write_adjustment(
+        db.hijri_adjustments, HIJRI, date, partial(adjustment_update, HIJRI, hijri_adjustment.day_adjustment),
+        request, response, location
+    )
+    return {"message": "Hijri adjustment saved successfully", "version": version}
+
+def validate_bulk_adjustments(items):
+    """
+    Per-item validation errors of a bulk adjustment payload, keyed by index;
+    dates are canonicalized in place like date path parameters
+    """
+    errors = {}
+    seen = set()
+    for i, item in enumerate(items):
+        try:
+            item.date = format_date(datetime.strptime(item.date, '%d-%b-%Y'))
+        except ValueError:
+            errors[i] = f"Invalid date: {item.date}"
+            continue
+        if item.date in seen:
+            errors[i] = f"Duplicate date: {item.date}"
+        elif item.adjustments is None and item.day_adjustment is None:
+            errors[i] = "Nothing to adjust: give adjustments and/or day_adjustment"
+        elif item.adjustments is not None:
+            unknown = [adj.prayer_name for adj in item.adjustments if adj.prayer_name not in PRAYER_NAMES]
+            if unknown:
+                errors[i] = f"Unknown prayer: {', '.join(unknown)}"
+        seen.add(item.date)
+    return errors
+
+async def apply_bulk_adjustments(items, location=DEFAULT_LOCATION):
+    """
+    Upsert prayer and Hijri adjustments for many dates with one bulk_write
+    per collection. Each update is conditional on the version read just
+    before, so the history gets each date's exact new version; a date
+    another write changed in between is written again on its own.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+    now = datetime.now(timezone.utc)
+    results = [{"date": item.date} for item in items]
+    writes = {PRAYERS: [], HIJRI: []}
+    for i, item in enumerate(items):
+        if item.adjustments is not None:
+            writes[PRAYERS].append((i, [adj.model_dump() for adj in item.adjustments]))
+        if item.day_adjustment is not None:
+            writes[HIJRI].append((i, item.day_adjustment))
+    events = []
+    
+    async def write(field, collection):
+        pending = writes[field]
+        if not pending:
+            return
+        versions = {
+            doc["date"]: doc.get("version", 0)
+            async for doc in collection.find(
+                {"location": location.key, "date": {"$in": [items[i].date for i, _ in pending]}},
+                {"_id": 0, "date": 1, "version": 1}
+            )
         }
+        saved = [
+            {
+                "location": location.key,
+                "date": items[i].date,
+                "day": iso_date_key(items[i].date),
+                field: value,
+                "version": versions.get(items[i].date, 0) + 1,
+                "updated_at": now
+            }
+            for i, value in pending
+        ]
+        operations = [
+            UpdateOne(
+                # Documents saved before versions existed have none
+                {"location": location.key, "date": doc["date"], "version": doc["version"] - 1 or {"$exists": False}},
+                {"$set": doc},
+                upsert=True
+            )
+            for doc in saved
+        ]
+        try:
+            result = (await collection.bulk_write(operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+        upserted = {entry["index"] for entry in result.get("upserted", [])}
+        failed = {entry["index"]: entry for entry in result.get("writeErrors", [])}
+        for position, ((i, value), doc) in enumerate(zip(pending, saved)):
+            error = failed.get(position)
+            if error is None:
+                results[i][field] = "created" if position in upserted else "updated"
+            elif error["code"] == DUPLICATE_KEY:
+                # Its version moved since it was read
+                doc = await save_adjustment(
+                    collection, items[i].date, adjustment_update(field, value, items[i].date, location), location
+                )
+                results[i][field] = "updated"
+            else:
+                results[i][field] = f"error: {error['errmsg']}"
+                continue
+            events.append(state_event(field, doc))
+    
+    await asyncio.gather(
+        write(PRAYERS, db.adjustments),
+        write(HIJRI, db.hijri_adjustments)
+    )
+    await log_changes(location.key, events)
+    
+    # One rebuild and one invalidation for the whole batch. A batch can be a
+    # year of dates, which under the aladhan source are upstream requests,
+    # so the rebuild runs after the response and the dates are served live
+    # until it is done
+    changed = [item.date for item in items]
+    await timetable_store.invalidate(
+        location.key, [iso_date_key(date) for date in changed], await timetable_store.next_stamp()
+    )
+    keys = [cache_key(date, location) for date in changed]
+    for key in keys:
+        response_cache.invalidate(key)
+        notify_streams(key)
+    await invalidation_log.publish_dates(keys)
+    rematerialize_later(changed, location)
+    return results
+
+@api_router.post("/adjustments/bulk")
+async def adjust_bulk(payload: BulkAdjustments, location: Location = Depends(get_city)):
+    """Save prayer and/or Hijri adjustments for many dates at once"""
+    if len(payload.items) > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RANGE_DAYS} dates per request")
+    # Validate everything before writing anything
+    errors = validate_bulk_adjustments(payload.items)
+    if errors:
+        raise HTTPException(status_code=400, detail=[
+            {"index": i, "date": payload.items[i].date, "error": error} for i, error in sorted(errors.items())
+        ])
+    try:
+        results = await apply_bulk_adjustments(payload.items, location)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results}
+
+@api_router.post("/adjustment-rules")
+async def create_adjustment_rule(rule: AdjustmentRule):
+    """Save an adjustment rule for a date range or a Hijri month"""
+    try:
+        if rule.location not in CITIES:
+            raise ValueError(f"Unknown city: {rule.location}")
+        if rule.hijri_month:
+            if rule.start_date or rule.end_date:
+                raise ValueError("A rule is scoped by a date range or a Hijri month, not both")
+            if rule.hijri_month not in HIJRI_MONTHS:
+                raise ValueError(f"Unknown Hijri month: {rule.hijri_month}")
+        else:
+            if not (rule.start_date and rule.end_date):
+                raise ValueError("A rule needs start_date and end_date, or hijri_month")
+            if iso_date_key(rule.start_date) > iso_date_key(rule.end_date):
+                raise ValueError("start_date must not be after end_date")
         
-        await db.hijri_adjustments.update_one(
-            {"date": date},
-            {"$set": adjustment_data},
-            upsert=True
-        )
+        saved = {**rule.model_dump(), "created_at": datetime.now(timezone.utc)}
+        # A copy, as insert_one adds the _id to the document it is given
+        await db.adjustment_rules.insert_one(dict(saved))
+        await log_changes(rule.location, [rule_event(rule.id, saved, saved["created_at"])])
+        await load_adjustment_rules()
+        await rematerialize_window(CITIES[rule.location])
+        response_cache.clear()
+        notify_streams()
+        await invalidation_log.publish()
         
-        return {"message": "Hijri adjustment saved successfully"}
+        return {"message": "Adjustment rule saved successfully", "id": rule.id}
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@api_router.get("/adjustment-rules")
+async def get_adjustment_rules():
+    """List adjustment rules in the order they apply (later rules win)"""
+    try:
+        return await db.adjustment_rules.find({}, {"_id": 0}).sort("created_at", 1).to_list(length=None)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.delete("/adjustment-rules/{rule_id}")
+async def delete_adjustment_rule(rule_id: str):
+    """Delete an adjustment rule"""
+    rule = await db.adjustment_rules.find_one_and_delete({"id": rule_id}, {"location": 1})
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Adjustment rule not found")
+    location_key = rule.get("location", DEFAULT_CITY)
+    await log_changes(location_key, [rule_event(rule_id, None, datetime.now(timezone.utc))])
+    await load_adjustment_rules()
+    location = CITIES.get(location_key)
+    if location is not None:
+        await rematerialize_window(location)
+    response_cache.clear()
+    notify_streams()
+    await invalidation_log.publish()
+    return {"message": "Adjustment rule deleted successfully"}
+
 @api_router.get("/hijri-adjustment/{date}")
-async def get_hijri_adjustment(date: str):
-    """Get saved Hijri date adjustment"""
+async def get_hijri_adjustment(
+    request: Request, response: Response,
+    date: str = Depends(canonical_date), location: Location = Depends(get_city)
+):
+    """Get saved Hijri date adjustment; its ETag is what If-Match takes to change it"""
     try:
-        adjustment = await db.hijri_adjustments.find_one({"date": date})
-        if adjustment:
-            return {"day_adjustment": adjustment.get("day_adjustment", 0)}
-        return {"day_adjustment": 0}
+        doc = await db.hijri_adjustments.find_one({"location": location.key, "date": date}, {"_id": 0, "day_adjustment": 1, "version": 1})
+        return versioned_response(request, response, date, doc, {"day_adjustment": doc.get("day_adjustment", 0) if doc else 0})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-# Include the router in the main app
-app.include_router(api_router)
+def collect_component_stats():
+    """Copy the counters caches and the breaker keep themselves into the registry"""
+    for event, value in response_cache.stats.items():
+        RESPONSE_CACHE_EVENTS.set(value, event)
+    RESPONSE_CACHE_ENTRIES.set(len(response_cache))
+    for event, value in timings_cache.stats.items():
+        TIMINGS_CACHE_EVENTS.set(value, event)
+    snapshot = upstream_breaker.snapshot()
+    for event in ('calls', 'failures', 'short_circuited', 'opened'):
+        BREAKER_EVENTS.set(snapshot[event], event)
+    for state in (CLOSED, OPEN, HALF_OPEN):
+        BREAKER_STATE.set(int(snapshot['state'] == state), state)
+
+metrics.add_collector(collect_component_stats)
+
+async def run_metrics_flush():
+    """Write this worker's metrics to METRICS_DIR every METRICS_FLUSH_INTERVAL"""
+    while True:
+        try:
+            metrics.write(METRICS_DIR)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {METRICS_DIR}: {e}")
+        await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics of every worker"""
+    return PlainTextResponse(
+        metrics.render(METRICS_DIR, stale_after=METRICS_FLUSH_INTERVAL * 3),
+        media_type=METRICS_CONTENT_TYPE
+    )
+
+# Add the router's routes to the main app. include_router would build every
+# route a second time, which is a large part of importing this module
+app.router.routes.extend(api_router.routes)
+
+app.add_middleware(MetricsMiddleware, requests=HTTP_REQUESTS, latency=HTTP_LATENCY)
 
 app.add_middleware(
     CORSMiddleware,
@@ -395,6 +1698,8 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin editors read it to send If-Match back
+    expose_headers=["ETag"],
 )
 
 # Configure logging
@@ -402,8 +1707,4 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+logger = logging.getLogger(__name__)
\ No newline at end of file
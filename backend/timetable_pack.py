@@ -0,0 +1,107 @@
+"""
+Compact binary timetable for clients that answer date lookups offline.
+
+Little-endian throughout. A header:
+
+    magic     4s   b'NMZT'
+    format    B    FORMAT_VERSION
+    kind      B    FULL or DELTA
+    version   I    adjustment history number the days were built at
+    first     i    first date, in days since 1970-01-01
+    days      H    number of dates covered from `first`
+    key_len   B    then the location key, UTF-8
+
+A FULL body is one record per date from `first`. A DELTA body is a record
+count (H) and that many records, each preceded by its date's offset from
+`first` (H); it replaces those dates in a FULL timetable the client already
+has, after which the client holds `version`.
+
+A record is 24 bytes: adjusted start and end per prayer in PRAYER_NAMES
+order as signed minutes from the date's midnight (10 h; adjusted times may
+roll over midnight, and Isha may end the next morning), then the adjusted
+Hijri day (B), month number 1-12 (B) and year (H).
+"""
+
+import struct
+from datetime import date, timedelta
+
+MAGIC = b'NMZT'
+FORMAT_VERSION = 1
+
+FULL = 0
+DELTA = 1
+
+CONTENT_TYPE = 'application/octet-stream'
+
+EPOCH = date(1970, 1, 1)
+
+HEADER = struct.Struct('<4sBBIiHB')
+RECORD = struct.Struct('<10h2BH')
+OFFSET = struct.Struct('<H')
+COUNT = struct.Struct('<H')
+
+
+def _header(kind, location_key, version, first, days):
+    key = location_key.encode()
+    return HEADER.pack(MAGIC, FORMAT_VERSION, kind, version, (first - EPOCH).days, days, len(key)) + key
+
+
+def _record(minutes, hijri):
+    year, month, day = hijri
+    return RECORD.pack(*(m for pair in minutes for m in pair), day, month, year)
+
+
+def pack_full(location_key, version, first, days):
+    """
+    Timetable of consecutive dates from `first`; `days` holds the adjusted
+    (start, end) minutes per prayer and Hijri (year, month, day) of each
+    """
+    parts = [_header(FULL, location_key, version, first, len(days))]
+    parts.extend(_record(minutes, hijri) for minutes, hijri in days)
+    return b''.join(parts)
+
+
+def pack_delta(location_key, version, first, span, days):
+    """Changed dates of the `span` dates from `first`, as (date, minutes, hijri)"""
+    parts = [_header(DELTA, location_key, version, first, span), COUNT.pack(len(days))]
+    for day, minutes, hijri in days:
+        parts.append(OFFSET.pack((day - first).days))
+        parts.append(_record(minutes, hijri))
+    return b''.join(parts)
+
+
+def unpack(data):
+    """Header fields and {date: (minutes, hijri)} of a FULL or DELTA timetable"""
+    magic, format_version, kind, version, first, span, key_len = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a packed timetable")
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported timetable format {format_version}")
+    offset = HEADER.size
+    location_key = data[offset:offset + key_len].decode()
+    offset += key_len
+    first = EPOCH + timedelta(days=first)
+
+    if kind == FULL:
+        positions = [(i, offset + i * RECORD.size) for i in range(span)]
+    else:
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        step = OFFSET.size + RECORD.size
+        positions = [
+            (OFFSET.unpack_from(data, offset + i * step)[0], offset + i * step + OFFSET.size)
+            for i in range(count)
+        ]
+    records = {}
+    for day_offset, position in positions:
+        values = RECORD.unpack_from(data, position)
+        minutes = list(zip(values[0:10:2], values[1:10:2]))
+        records[first + timedelta(days=day_offset)] = (minutes, (values[12], values[11], values[10]))
+    return {
+        'kind': kind,
+        'version': version,
+        'location': location_key,
+        'first': first,
+        'days': span,
+        'records': records
+    }
@@ -0,0 +1,127 @@
+"""
+Materialized timetable: the final, adjusted PrayerTimings per date.
+
+Documents are keyed by location and ISO date ("hyderabad/2025-03-01") and
+hold the serialized response, so serving a materialized date is one keyed
+read. Every build takes a stamp from a
+shared counter before it reads its inputs and only replaces a document built
+from an older stamp, so a slow window rebuild cannot overwrite the result of
+an adjustment written after it started. The periodic rebuild of a
+location's whole window is claimed through the same counters collection,
+so that one worker does it per interval rather than every worker.
+
+Each document also records the fingerprint of the configuration it was
+built under (see TimetableStore.fingerprint); a document with another one
+is a miss, so a deploy that changes the response format or the settings
+the timings depend on never serves bodies built before it.
+"""
+
+import logging
+
+from mongo import pymongo_module
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class TimetableStore:
+    COUNTER_ID = 'timetable'
+    WINDOW_PREFIX = 'timetable_window/'
+
+    def __init__(self, collection, counters, fingerprint):
+        self.collection = collection
+        self.counters = counters
+        # location -> string identifying everything but the adjustments a body depends on
+        self.fingerprint = fingerprint
+
+    async def next_stamp(self):
+        """Take a stamp before reading the inputs of a build"""
+        doc = await self.counters.find_one_and_update(
+            {'_id': self.COUNTER_ID},
+            {'$inc': {'version': 1}},
+            upsert=True,
+            return_document=pymongo_module().ReturnDocument.AFTER
+        )
+        return doc['version']
+
+    async def claim_window(self, location, now, interval):
+        """
+        Whether to rebuild a location's window now: true for the first worker
+        to ask once `interval` (a timedelta) has passed since the last claim
+        """
+        pymongo = pymongo_module()
+        try:
+            await self.counters.update_one(
+                {'_id': self.WINDOW_PREFIX + location, 'claimed_at': {'$lte': now - interval}},
+                {'$set': {'claimed_at': now}},
+                upsert=True
+            )
+        except pymongo.errors.DuplicateKeyError:
+            # Claimed more recently by another worker
+            return False
+        return True
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([('location', 1), ('day', 1)])
+
+    async def get(self, location, day):
+        """(body, adjusted) for an ISO date, or None if it is not materialized"""
+        doc = await self.collection.find_one(
+            {'_id': f'{location}/{day}', 'fingerprint': self.fingerprint(location), 'body': {'$exists': True}},
+            {'_id': 0, 'body': 1, 'adjusted': 1}
+        )
+        return (doc['body'], doc['adjusted']) if doc else None
+
+    async def put_many(self, location, entries, stamp, materialized_at):
+        """Store (day, body, adjusted) entries built from `stamp`; returns how many were written"""
+        pymongo = pymongo_module()
+        fingerprint = self.fingerprint(location)
+        operations = [
+            pymongo.UpdateOne(
+                {'_id': f'{location}/{day}', 'stamp': {'$lt': stamp}},
+                {'$set': {
+                    'location': location, 'day': day, 'body': body, 'adjusted': adjusted,
+                    'fingerprint': fingerprint, 'stamp': stamp, 'materialized_at': materialized_at
+                }},
+                upsert=True
+            )
+            for day, body, adjusted in entries
+        ]
+        if not operations:
+            return 0
+        try:
+            result = (await self.collection.bulk_write(operations, ordered=False)).bulk_api_result
+        except pymongo.errors.BulkWriteError as e:
+            result = e.details
+            # A duplicate key means a newer build already stored that date
+            errors = [error for error in result['writeErrors'] if error['code'] != DUPLICATE_KEY]
+            if errors:
+                raise
+        return result['nModified'] + result['nUpserted']
+
+    async def invalidate(self, location, days, stamp):
+        """
+        Stop serving the given ISO dates until a build from after `stamp`
+        stores them again; unlike delete, builds from before it still
+        cannot write their older inputs back
+        """
+        await self.collection.update_many(
+            {'_id': {'$in': [f'{location}/{day}' for day in days]}, 'stamp': {'$lt': stamp}},
+            {'$set': {'stamp': stamp}, '$unset': {'body': '', 'adjusted': ''}}
+        )
+
+    async def delete(self, location, days):
+        await self.collection.delete_many({'_id': {'$in': [f'{location}/{day}' for day in days]}})
+
+    async def clear(self, location):
+        await self.collection.delete_many({'location': location})
+
+    async def prune(self, location, before):
+        """Drop a location's dates before the ISO date `before`"""
+        result = await self.collection.delete_many({'location': location, 'day': {'$lt': before}})
+        return result.deleted_count
+
+    async def drop_unscoped(self):
+        """Drop documents materialized before timetables were kept per location"""
+        await self.collection.delete_many({'location': {'$exists': False}})
@@ -0,0 +1,96 @@
+"""
+Mongo-backed cache of upstream prayer timings.
+
+Documents are keyed by the upstream request parameters (date, lat, lng,
+tz, method, school). Each entry is fresh for `fresh_ttl` seconds, may then be
+served stale while it is revalidated in the background, and is removed by a
+TTL index once `stale_ttl` has passed. Concurrent misses for the same key
+share a single upstream fetch.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from circuit_breaker import CircuitOpenError
+from mongo import as_utc, pymongo_module
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ('date', 'lat', 'lng', 'tz', 'method', 'school')
+# Unique key index from before the time zone was part of the key
+LEGACY_KEY_INDEX = 'date_1_lat_1_lng_1_method_1_school_1'
+
+
+class TimingsCache:
+    def __init__(self, collection, fetch, fresh_ttl, stale_ttl):
+        self.collection = collection
+        self.fetch = fetch
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'upstream_fetches': 0, 'errors': 0, 'short_circuited': 0}
+        self._inflight = {}
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([(field, 1) for field in KEY_FIELDS], unique=True)
+        await self.collection.create_index('expires_at', expireAfterSeconds=0)
+        # Would keep one entry per date and coordinates across time zones;
+        # its entries are not looked up any more and expire on their own
+        try:
+            await self.collection.drop_index(LEGACY_KEY_INDEX)
+        except pymongo_module().errors.OperationFailure:
+            pass
+
+    async def get(self, key):
+        """Return the cached payload for `key`, fetching it upstream on a miss"""
+        doc = await self.collection.find_one(key, {'_id': 0, 'payload': 1, 'fresh_until': 1})
+        if doc is not None:
+            if as_utc(doc['fresh_until']) > datetime.now(timezone.utc):
+                self.stats['hits'] += 1
+                return doc['payload']
+            # Serve the stale entry now and refresh it in the background
+            self.stats['stale'] += 1
+            self._refresh(key)
+            return doc['payload']
+
+        self.stats['misses'] += 1
+        return await asyncio.shield(self._refresh(key))
+
+    def _refresh(self, key):
+        """Start (or join) the single in-flight upstream fetch for `key`"""
+        cache_key = tuple(key[field] for field in KEY_FIELDS)
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish(cache_key, done))
+        return task
+
+    def _finish(self, cache_key, task):
+        self._inflight.pop(cache_key, None)
+        # Background revalidations have no awaiter; consume their errors here
+        if task.cancelled() or task.exception() is None:
+            return
+        if isinstance(task.exception(), CircuitOpenError):
+            # Upstream is known to be down; the stale entry stays in use
+            self.stats['short_circuited'] += 1
+        else:
+            self.stats['errors'] += 1
+            logger.warning(f"Upstream refresh failed for {cache_key}: {task.exception()}")
+
+    async def _fetch_and_store(self, key):
+        payload = await self.fetch(key)
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            key,
+            {'$set': {
+                **key,
+                'payload': payload,
+                'fetched_at': now,
+                'fresh_until': now + timedelta(seconds=self.fresh_ttl),
+                'expires_at': now + timedelta(seconds=self.stale_ttl)
+            }},
+            upsert=True
+        )
+        self.stats['upstream_fetches'] += 1
+        return payload
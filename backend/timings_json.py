@@ -0,0 +1,45 @@
+"""
+Prayer timings responses as plain dicts, serialized once.
+
+build_prayer_timings assembles the PrayerTimings shape as a dict rather than
+as models: no validation of values it computed itself, and one encoding
+straight to the bytes that are cached, materialized and sent. Ids are
+derived from the location and date instead of drawn at random, so the same
+date gets the same ids in every worker and every rebuild. The output is
+byte-for-byte what model_dump_json gives for the same values.
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:  # Same bytes from the standard library, only slower
+    orjson = None
+
+
+@lru_cache(maxsize=4096)
+def timings_ids(location_key, date, count):
+    """
+    UUID-formatted ids (RFC 9562 version 8) of a date's timings and of its
+    `count` prayers, from one hash of the location and date; kept for the
+    dates asked for most, since every range request would hash them again
+    """
+    digest = hashlib.shake_128(f"{location_key}/{date}".encode()).hexdigest(16 * (count + 1))
+    return tuple(
+        f"{h[0:8]}-{h[8:12]}-8{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:32]}"
+        for h in (digest[i:i + 32] for i in range(0, len(digest), 32))
+    )
+
+
+def timestamp(moment):
+    """An aware UTC datetime as pydantic writes it"""
+    return moment.isoformat().replace('+00:00', 'Z')
+
+
+def dump_json(value):
+    """Compact UTF-8 JSON, as model_dump_json writes it"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
@@ -0,0 +1,114 @@
+"""
+Microbenchmark of applying adjustments to one day's prayer times.
+
+Times the per-prayer stage of build_prayer_timings: end times, stored and
+rule adjustments, clamping and 12h formatting. `string path` is the previous
+implementation (strptime per time, HH:MM rebuilt and reparsed, a linear scan
+of the adjustments per prayer), kept here as the baseline; `minutes path` is
+day_times on integer minutes. Model construction is the same for both and
+is left out. The string path ended Isha at 23:59 and clamped to the day;
+the minutes path ends it at the next Fajr, so Isha's end is not compared.
+
+Usage:
+    python benchmarks/adjustment_path.py [--days 10000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from day_times import apply_adjustments, format_12h, index_adjustments, timeline
+from prayer_calc import PRAYER_NAMES, compute_prayer_minutes_range, format_minutes
+
+
+def calculate_end_times(prayer_times):
+    end_times = {}
+    for i, prayer in enumerate(PRAYER_NAMES):
+        end_times[prayer] = prayer_times[PRAYER_NAMES[i + 1]] if i < len(PRAYER_NAMES) - 1 else "23:59"
+    return end_times
+
+
+def format_time_12h_no_ampm(time_24h):
+    hour, minute = map(int, time_24h.split(':'))
+    if hour == 0:
+        return f"12:{minute:02d}"
+    elif hour <= 12:
+        return f"{hour}:{minute:02d}"
+    return f"{hour-12}:{minute:02d}"
+
+
+def string_path(prayer_times, adjustments, rule_adjustments):
+    end_times = calculate_end_times(prayer_times)
+    prayers = []
+    for prayer_name, start_time in prayer_times.items():
+        start_adjustment, end_adjustment = rule_adjustments.get(prayer_name, (0, 0))
+        for adj in adjustments:
+            if adj["prayer_name"] == prayer_name:
+                start_adjustment = adj.get("start_adjustment", adj.get("adjustment", 0))
+                end_adjustment = adj.get("end_adjustment", 0)
+                break
+        start_time_obj = datetime.strptime(start_time, '%H:%M')
+        start_total = max(0, min(start_time_obj.hour * 60 + start_time_obj.minute + start_adjustment, 1439))
+        end_time_obj = datetime.strptime(end_times[prayer_name], '%H:%M')
+        end_total = max(0, min(end_time_obj.hour * 60 + end_time_obj.minute + end_adjustment, 1439))
+        prayers.append((
+            format_time_12h_no_ampm(f"{start_total // 60:02d}:{start_total % 60:02d}"),
+            format_time_12h_no_ampm(f"{end_total // 60:02d}:{end_total % 60:02d}"),
+            start_adjustment,
+            end_adjustment
+        ))
+    return prayers
+
+
+def minutes_path(day_timeline, adjustments, rule_adjustments):
+    slots = index_adjustments(adjustments, rule_adjustments)
+    return [
+        (format_12h(start), format_12h(end), start_adjustment, end_adjustment)
+        for (start, end), (start_adjustment, end_adjustment) in zip(apply_adjustments(day_timeline, slots), slots)
+    ]
+
+
+def make_days(count):
+    rows = compute_prayer_minutes_range(date(2025, 1, 1), count + 1, 17.3850, 78.4867, 5.5).tolist()
+    days = []
+    for starts, next_starts in zip(rows, rows[1:]):
+        adjustments = [
+            {'prayer_name': name, 'start_adjustment': random.randint(-5, 5), 'end_adjustment': random.randint(-5, 5)}
+            for name in random.sample(PRAYER_NAMES, random.randint(0, 5))
+        ]
+        rule_adjustments = {'Isha': (2, 0)} if random.random() < 0.3 else {}
+        days.append((timeline(starts, next_starts), {name: format_minutes(m) for name, m in zip(PRAYER_NAMES, starts)}, adjustments, rule_adjustments))
+    return days
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    return label, (time.perf_counter() - start), result
+
+
+def main(args):
+    random.seed(0)
+    days = make_days(args.days)
+    runs = [
+        timed("string path", lambda: [string_path(times, adj, rules) for _, times, adj, rules in days]),
+        timed("minutes path", lambda: [minutes_path(starts, adj, rules) for starts, _, adj, rules in days]),
+    ]
+    for old, new in zip(runs[0][2], runs[1][2]):
+        assert old[:-1] == new[:-1] and old[-1][0] == new[-1][0], "paths disagree"
+    baseline = runs[0][1]
+    print(f"{'':<16} {'us/day':>9} {'speedup':>9}")
+    for label, elapsed, _ in runs:
+        print(f"{label:<16} {elapsed / len(days) * 1e6:>9.2f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=10000)
+    main(parser.parse_args())
@@ -0,0 +1,236 @@
+"""
+Concurrency stress test of adjustment writes to a single date.
+
+Fires hundreds of parallel writers at one date through the app in-process
+(httpx's ASGI transport), against a local mongod (--mongo URL) or an
+in-memory stand-in (--mongo memory, needs `pip install mongomock-motor`),
+and checks what a race must not do:
+
+- if-match: --writers writers read the date's ETag, then all save at once
+  with If-Match; exactly one wins and the rest get 412
+- increments: --increments writers each add 1 to Isha's end adjustment,
+  reading and saving with If-Match and retrying on 412; none is lost
+- merge: --writers writers each PATCH one field of one prayer without a
+  precondition; every field ends with its last write and none is reset.
+  Needs a real MongoDB: the in-memory stand-in cannot run pipeline updates
+
+After each phase the stored adjustments, their history and the timings
+served for the date must agree. Exits with status 1 if any check fails.
+
+Usage:
+    python benchmarks/adjustment_races.py --mongo memory --writers 200
+    python benchmarks/adjustment_races.py --mongo mongodb://localhost:27017 --writers 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+PRAYERS = ('Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+FIELDS = ('start_adjustment', 'end_adjustment')
+
+
+class Checks:
+    def __init__(self):
+        self.failed = []
+
+    def expect(self, ok, message):
+        print(f"  {'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            self.failed.append(message)
+
+
+def slots(adjustments):
+    """{prayer: {field: value}} of a stored list; the first entry for a prayer wins"""
+    result = {}
+    for adj in adjustments:
+        result.setdefault(adj["prayer_name"], {
+            "start_adjustment": adj.get("start_adjustment", adj.get("adjustment", 0)),
+            "end_adjustment": adj.get("end_adjustment", 0),
+        })
+    return result
+
+
+async def stored(client, date):
+    """(ETag, adjustments) of the date"""
+    response = await client.get(f"/api/adjustments/{date}")
+    response.raise_for_status()
+    return response.headers["etag"], response.json()
+
+
+async def version(client, date):
+    etag, _ = await stored(client, date)
+    return int(etag.strip('"').rpartition('.v')[2])
+
+
+async def check_consistent(client, date, checks, versions_before):
+    """The history has each new version once, and the served timings match the stored adjustments"""
+    current = await version(client, date)
+    response = await client.get(f"/api/adjustments/{date}/history")
+    logged = sorted(event["version"] for event in response.json() if event["field"] == "adjustments")
+    new = [v for v in logged if v > versions_before]
+    checks.expect(new == list(range(versions_before + 1, current + 1)),
+                  f"history has versions {versions_before + 1}..{current} once each ({len(new)} events)")
+
+    _, adjustments = await stored(client, date)
+    response = await client.get(f"/api/prayer-times/{date}")
+    served = {p["name"]: {"start_adjustment": p["start_adjustment"], "end_adjustment": p["end_adjustment"]}
+              for p in response.json()["prayers"] if p["name"] in slots(adjustments)}
+    checks.expect(served == slots(adjustments), "served timings match the stored adjustments")
+
+
+async def if_match_phase(client, date, args, checks):
+    before = await version(client, date)
+    etag, _ = await stored(client, date)
+
+    async def save(i):
+        return await client.post(
+            f"/api/adjust-prayers/{date}",
+            json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": i}]},
+            headers={"If-Match": etag}
+        )
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(save(i) for i in range(1, args.writers + 1)))
+    elapsed = time.perf_counter() - started
+    statuses = Counter(response.status_code for response in responses)
+    winners = [i for i, response in enumerate(responses, 1) if response.status_code == 200]
+    print(f"if-match: {args.writers} writers on version {before} in {elapsed:.2f}s, statuses {dict(statuses)}")
+    checks.expect(len(winners) == 1 and statuses[412] == args.writers - 1, "exactly one write wins, the rest get 412")
+    _, adjustments = await stored(client, date)
+    checks.expect(winners and slots(adjustments)["Isha"]["start_adjustment"] == winners[0], "the winner's value is stored")
+    await check_consistent(client, date, checks, before)
+
+
+async def increments_phase(client, date, args, checks):
+    before = await version(client, date)
+    _, adjustments = await stored(client, date)
+    initial = slots(adjustments).get("Isha", {}).get("end_adjustment", 0)
+    attempts = Counter()
+
+    async def increment(rng):
+        while True:
+            etag, adjustments = await stored(client, date)
+            current = slots(adjustments).get("Isha", {"start_adjustment": 0, "end_adjustment": 0})
+            body = [adj for adj in adjustments if adj["prayer_name"] != "Isha"]
+            body.append({"prayer_name": "Isha", **current, "end_adjustment": current["end_adjustment"] + 1})
+            response = await client.post(
+                f"/api/adjust-prayers/{date}", json={"adjustments": body}, headers={"If-Match": etag}
+            )
+            attempts[response.status_code] += 1
+            if response.status_code != 412:
+                return response.status_code
+            await asyncio.sleep(rng.random() * 0.005)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(increment(random.Random(args.seed + i)) for i in range(args.increments)))
+    elapsed = time.perf_counter() - started
+    print(f"increments: {args.increments} writers in {elapsed:.2f}s, attempts {dict(attempts)}")
+    checks.expect(all(status == 200 for status in results), "every writer succeeds after retrying")
+    _, adjustments = await stored(client, date)
+    final = slots(adjustments)["Isha"]["end_adjustment"]
+    checks.expect(final == initial + args.increments, f"no increment is lost ({initial} + {args.increments} = {final})")
+    checks.expect(await version(client, date) == before + args.increments, "one version per increment")
+    await check_consistent(client, date, checks, before)
+
+
+async def merge_phase(client, date, args, checks):
+    before = await version(client, date)
+    targets = [(prayer, field) for prayer in PRAYERS for field in FIELDS]
+
+    async def change(i):
+        prayer, field = targets[i % len(targets)]
+        response = await client.patch(
+            f"/api/adjustments/{date}", json={"adjustments": [{"prayer_name": prayer, field: i}]}
+        )
+        return (prayer, field), i, response
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(change(i) for i in range(1, args.writers + 1)))
+    elapsed = time.perf_counter() - started
+    statuses = Counter(response.status_code for _, _, response in results)
+    print(f"merge: {args.writers} writers on {len(targets)} fields in {elapsed:.2f}s, statuses {dict(statuses)}")
+    checks.expect(statuses[200] == args.writers, "every field-level write succeeds")
+    # The last write of each field is the one that got the highest version
+    last = {}
+    for target, i, response in results:
+        saved = response.json().get("version", 0)
+        if saved > last.get(target, (0, None))[0]:
+            last[target] = (saved, i)
+    _, adjustments = await stored(client, date)
+    final = slots(adjustments)
+    checks.expect(
+        all(final.get(prayer, {}).get(field) == i for (prayer, field), (_, i) in last.items()),
+        "every field holds its last write; none was reset by another"
+    )
+    checks.expect(await version(client, date) == before + args.writers, "one version per write")
+    await check_consistent(client, date, checks, before)
+
+
+async def run(args):
+    import httpx
+    import server
+
+    checks = Checks()
+    async with server.lifespan(server.app):
+        # Inside the materialized window, so the timetable store is in the race too
+        date = (server.local_today(server.DEFAULT_LOCATION) + timedelta(days=5)).strftime('%d-%b-%Y')
+        await server.materialize_window(server.DEFAULT_LOCATION)
+        limits = httpx.Limits(max_connections=None)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://race", limits=limits) as client:
+            await if_match_phase(client, date, args, checks)
+            await increments_phase(client, date, args, checks)
+            if args.mongo == "memory":
+                print("merge: skipped, the in-memory stand-in cannot run pipeline updates; pass --mongo <url>")
+            else:
+                await merge_phase(client, date, args, checks)
+        if not args.keep and args.mongo != "memory":
+            await server.mongo.client.drop_database(server.db.name)
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="memory", help="'memory' or a MongoDB URL")
+    parser.add_argument("--writers", type=int, default=200, help="parallel writers of the if-match and merge phases")
+    parser.add_argument("--increments", type=int, default=50,
+                        help="writers of the increments phase; retries grow with its square")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark database")
+    args = parser.parse_args()
+
+    if args.mongo == "memory":
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--mongo memory needs mongomock-motor: pip install mongomock-motor")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+        os.environ["MONGO_URL"] = "mongodb://memory"
+    else:
+        os.environ["MONGO_URL"] = args.mongo
+    os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "namaz_bench_races")
+    os.environ["PRAYER_TIMES_SOURCE"] = "local"
+    os.environ["WARMUP"] = "off"
+    # Only the writes under test rebuild the timetable
+    os.environ["MATERIALIZE_DELAY"] = "3600"
+    os.environ["MATERIALIZE_DAYS_AFTER"] = "30"
+
+    checks = asyncio.run(run(args))
+    if checks.failed:
+        print(f"{len(checks.failed)} checks failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
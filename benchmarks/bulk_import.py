@@ -0,0 +1,118 @@
+"""
+Benchmark of importing a year of adjustments against a local mongod.
+
+Times the per-date write path (an upsert and a history append per date and
+collection, as POST /adjust-prayers and /adjust-hijri do) against
+apply_bulk_adjustments, which writes the same year with one unordered
+bulk_write per collection and one append for the batch. The dates are in
+the materialized window and the prayer times source is the configured
+one (aladhan by default), as in production; the window rebuild after a
+batch runs after it returns and is timed separately.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bulk_import.py
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "namaz_bench")
+import server
+from server import db
+
+PRAYERS = ('Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+
+
+def make_items(days):
+    start = server.local_today(server.DEFAULT_LOCATION)
+    return [
+        server.BulkAdjustmentItem(
+            date=(start + timedelta(days=i)).strftime('%d-%b-%Y'),
+            adjustments=[
+                server.PrayerAdjustment(prayer_name=p, start_adjustment=random.randint(-3, 3))
+                for p in PRAYERS
+            ],
+            day_adjustment=random.choice((-1, 0, 1))
+        )
+        for i in range(days)
+    ]
+
+
+async def per_date_writes(items):
+    location = server.DEFAULT_LOCATION
+    for item in items:
+        for collection, field, value in (
+            (db.adjustments, server.PRAYERS, [adj.model_dump() for adj in item.adjustments]),
+            (db.hijri_adjustments, server.HIJRI, item.day_adjustment),
+        ):
+            saved = await server.save_adjustment(
+                collection, item.date, server.adjustment_update(field, value, item.date, location), location
+            )
+            await server.log_changes(location.key, [server.state_event(field, saved)])
+        await server.invalidate_date(item.date)
+
+
+async def bulk_writes(items):
+    server.validate_bulk_adjustments(items)
+    await server.apply_bulk_adjustments(items)
+
+
+async def rebuild(items):
+    await asyncio.gather(*server.rematerialize_tasks)
+
+
+async def timed(label, fn, items, repeat, then=None):
+    samples = []
+    for _ in range(repeat):
+        await db.adjustments.delete_many({})
+        await db.hijri_adjustments.delete_many({})
+        start = time.perf_counter()
+        await fn(items)
+        samples.append((time.perf_counter() - start) * 1000)
+        if then is not None:
+            await then(items)
+    print(f"{label:<44} {statistics.mean(samples):>9.1f} {max(samples):>9.1f}")
+
+
+async def bulk_writes_and_rebuild(items):
+    await bulk_writes(items)
+    await rebuild(items)
+
+
+async def main(args):
+    if server.PRAYER_TIMES_SOURCE == 'aladhan':
+        server.http_session = server.create_http_session()
+    try:
+        await server.ensure_indexes()
+        await server.invalidation_log.start()
+        items = make_items(args.days)
+        print(f"source: {server.PRAYER_TIMES_SOURCE}")
+        print(f"{'':<44} {'mean ms':>9} {'max ms':>9}")
+        await timed(f"{args.days} days, update_one per date", per_date_writes, items, args.repeat)
+        await timed(f"{args.days} days, apply_bulk_adjustments", bulk_writes, items, args.repeat, then=rebuild)
+        await timed(f"{args.days} days, bulk and the window rebuild", bulk_writes_and_rebuild, items, args.repeat)
+
+        if not args.keep:
+            await server.mongo.client.drop_database(db.name)
+    finally:
+        if server.http_session is not None:
+            await server.http_session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark database")
+    asyncio.run(main(parser.parse_args()))
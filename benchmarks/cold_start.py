@@ -0,0 +1,135 @@
+"""
+Cold start to first byte, with and without the startup warm-up.
+
+Starts the app in a fresh uvicorn process per run for each WARMUP mode and
+measures, from process start: when the first request for today gets its
+response, how long that request itself took, when /api/ready first answers
+200, and the median of the next requests for the days around today. The
+upstream is the stub Aladhan server with --handshake-ms added to the first
+request of each connection, standing in for TCP and TLS setup to the real
+host. Mongo is in-memory (--mongo memory, needs `pip install
+mongomock-motor`) or a real server; a remote one also shows the cold
+connection pool.
+
+Usage:
+    python benchmarks/cold_start.py --source aladhan --runs 5
+    python benchmarks/cold_start.py --mongo mongodb://localhost:27017
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from locations import HYDERABAD
+from stub_upstream import run_stub_upstream
+
+# Runs the app in the child process, on Mongo in memory if asked
+LAUNCHER = """
+import os, sys
+if os.environ['MONGO_URL'] == 'mongodb://memory':
+    import mongomock_motor, motor.motor_asyncio
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+import uvicorn
+uvicorn.run('server:app', host='127.0.0.1', port=int(sys.argv[1]), log_level='warning')
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def dates_around_today(days):
+    today = datetime.now(HYDERABAD.tzinfo).date()
+    return [(today + timedelta(days=i)).strftime('%d-%b-%Y') for i in range(-days, days + 1)]
+
+
+def one_run(mode, env, args):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}/api"
+    dates = dates_around_today(3)
+    today = dates[3]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", LAUNCHER, str(port)],
+        cwd=ROOT / "backend", env={**env, "WARMUP": mode},
+        stderr=None if args.verbose else subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=60) as client:
+            # Retry until the socket accepts; uvicorn only listens once startup is done
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with {process.returncode}")
+                sent = time.perf_counter()
+                try:
+                    response = client.get(f"{base}/prayer-times/{today}")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.002)
+            first_byte = time.perf_counter()
+            response.raise_for_status()
+
+            while client.get(f"{base}/ready").status_code != 200:
+                time.sleep(0.005)
+            ready = time.perf_counter()
+
+            latencies = []
+            for date in dates:
+                start = time.perf_counter()
+                client.get(f"{base}/prayer-times/{date}").raise_for_status()
+                latencies.append(time.perf_counter() - start)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {
+        "first_byte": first_byte - started,
+        "first_request": first_byte - sent,
+        "ready": ready - started,
+        "next_p50": statistics.median(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="memory", help="'memory' or a MongoDB URL")
+    parser.add_argument("--source", choices=("local", "aladhan"), default="aladhan",
+                        help="PRAYER_TIMES_SOURCE; 'aladhan' goes to the stub upstream")
+    parser.add_argument("--delay-ms", type=int, default=50, help="stub upstream latency per request")
+    parser.add_argument("--handshake-ms", type=int, default=150, help="extra latency of a new upstream connection")
+    parser.add_argument("--modes", default="off,background,block", help="WARMUP modes to compare")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="show the server's log")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "MONGO_URL": "mongodb://memory" if args.mongo == "memory" else args.mongo,
+        "DB_NAME": os.environ.get("BENCH_DB_NAME", "namaz_bench_cold"),
+        "PRAYER_TIMES_SOURCE": args.source,
+    }
+    with run_stub_upstream(args.delay_ms, args.handshake_ms) as upstream_url:
+        env["ALADHAN_API_URL"] = upstream_url
+        print(f"{'WARMUP':<12} {'first byte':>11} {'first req':>10} {'ready':>9} {'next p50':>9}   (ms, median of {args.runs})")
+        for mode in args.modes.split(","):
+            runs = [one_run(mode, env, args) for _ in range(args.runs)]
+            median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            print(f"{mode:<12} {median['first_byte']:>11.0f} {median['first_request']:>10.1f} "
+                  f"{median['ready']:>9.0f} {median['next_p50']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Reproducible load test of the API, in-process.
+
+Boots the app with its lifespan against a stub Aladhan server
+(stub_upstream) and either a local mongod (--mongo URL) or an in-memory
+stand-in (--mongo memory, needs `pip install mongomock-motor`), drives it
+through httpx's ASGI transport with a realistic mix of requests, and
+reports throughput and p50/p95/p99 per endpoint:
+
+- readers, --concurrency of them: mostly today, nearby days, month
+  timetables, ETag revalidations and dates far outside the timetable
+- one admin writer sending bursts of --write-burst adjustments every
+  --write-every seconds, which invalidate what the readers are reading
+
+Requests are chosen by a seeded RNG so runs are repeatable. Results are
+written as JSON (to benchmarks/results/ by default) together with the
+commit and settings; --compare prints the change from an earlier result.
+
+Usage:
+    python benchmarks/load_suite.py --mongo memory --duration 20 --concurrency 32
+    python benchmarks/load_suite.py --mongo mongodb://localhost:27017 --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from stub_upstream import run_stub_upstream
+
+# Reader mix: (endpoint label, weight)
+READ_MIX = (
+    ("GET /prayer-times/{date} today", 55),
+    ("GET /prayer-times/{date} nearby", 15),
+    ("GET /prayer-times/{date} revalidate", 10),
+    ("GET /prayer-times/month/{year}/{month}", 8),
+    ("GET /prayer-times/{date} far", 7),
+    ("GET /adjustments/{date}", 5),
+)
+
+PRAYERS = ('Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, elapsed, ok):
+        self.latencies.setdefault(endpoint, []).append(elapsed * 1000)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, duration):
+        def stats(samples, errors):
+            return {
+                "requests": len(samples),
+                "errors": errors,
+                "throughput_rps": round(len(samples) / duration, 1),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+                "max_ms": round(max(samples), 3),
+            }
+
+        endpoints = {
+            endpoint: stats(samples, self.errors.get(endpoint, 0))
+            for endpoint, samples in sorted(self.latencies.items())
+        }
+        every = [value for samples in self.latencies.values() for value in samples]
+        return {"overall": stats(every, sum(self.errors.values())), "endpoints": endpoints}
+
+
+def fmt(day):
+    return day.strftime('%d-%b-%Y')
+
+
+async def reader(client, rng, today, deadline, recorder, etags):
+    endpoints, weights = zip(*READ_MIX)
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        headers = {}
+        if endpoint.endswith("today"):
+            url = f"/api/prayer-times/{fmt(today)}"
+        elif endpoint.endswith("nearby"):
+            url = f"/api/prayer-times/{fmt(today + timedelta(days=rng.randint(-7, 7)))}"
+        elif endpoint.endswith("revalidate"):
+            url = f"/api/prayer-times/{fmt(today + timedelta(days=rng.randint(-3, 3)))}"
+            if url in etags:
+                headers["If-None-Match"] = etags[url]
+        elif endpoint.endswith("far"):
+            # Outside the materialized window: computed (or fetched upstream) per request
+            url = f"/api/prayer-times/{fmt(today + timedelta(days=rng.randint(500, 3000)))}"
+        elif "month" in endpoint:
+            month = (today.month + rng.randint(-1, 2) - 1) % 12 + 1
+            url = f"/api/prayer-times/month/{today.year}/{month}"
+        else:
+            url = f"/api/adjustments/{fmt(today + timedelta(days=rng.randint(0, 30)))}"
+
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        recorder.record(endpoint, time.perf_counter() - start, response.status_code in (200, 304))
+        if "etag" in response.headers:
+            etags[url] = response.headers["etag"]
+
+
+async def writer(client, rng, today, deadline, recorder, args):
+    endpoint = "POST /adjust-prayers/{date}"
+
+    async def one(day):
+        body = {"adjustments": [
+            {"prayer_name": name, "start_adjustment": rng.randint(-3, 3)} for name in rng.sample(PRAYERS, 2)
+        ]}
+        start = time.perf_counter()
+        response = await client.post(f"/api/adjust-prayers/{fmt(day)}", json=body)
+        recorder.record(endpoint, time.perf_counter() - start, response.status_code == 200)
+
+    while time.perf_counter() + args.write_every < deadline:
+        await asyncio.sleep(args.write_every)
+        # Mostly the days readers are looking at
+        await asyncio.gather(*(one(today + timedelta(days=rng.randint(-2, 10))) for _ in range(args.write_burst)))
+
+
+async def run(args):
+    import httpx
+    import server
+
+    async with server.lifespan(server.app):
+        # Build the timetable up front so every run starts from the same state
+        for location in server.CITIES.values():
+            await server.materialize_window(location)
+        today = server.local_today(server.DEFAULT_LOCATION)
+        recorder = Recorder()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Warm up caches and connection pools without recording
+            warmup = Recorder()
+            await reader(client, random.Random(args.seed - 1), today, time.perf_counter() + args.warmup, warmup, {})
+
+            started = time.perf_counter()
+            deadline = started + args.duration
+            tasks = [
+                reader(client, random.Random(args.seed + i), today, deadline, recorder, {})
+                for i in range(args.concurrency)
+            ]
+            if args.write_burst:
+                tasks.append(writer(client, random.Random(args.seed + args.concurrency), today, deadline, recorder, args))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        if not args.keep and args.mongo != "memory":
+            await server.mongo.client.drop_database(server.db.name)
+    return recorder.summary(elapsed)
+
+
+def print_summary(summary, baseline=None):
+    print(f"{'endpoint':<42} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    rows = [("overall", summary["overall"]), *summary["endpoints"].items()]
+    for endpoint, stats in rows:
+        line = (f"{endpoint:<42} {stats['throughput_rps']:>9.1f} {stats['p50_ms']:>8.2f} "
+                f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['errors']:>7}")
+        before = None
+        if baseline is not None:
+            before = baseline["overall"] if endpoint == "overall" else baseline["endpoints"].get(endpoint)
+        if before:
+            line += (f"   req/s {stats['throughput_rps'] / before['throughput_rps'] - 1:+.0%}"
+                     f"  p99 {stats['p99_ms'] / before['p99_ms'] - 1:+.0%}")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="memory", help="'memory' or a MongoDB URL")
+    parser.add_argument("--source", choices=("local", "aladhan"), default="local",
+                        help="PRAYER_TIMES_SOURCE; 'aladhan' goes to the stub upstream")
+    parser.add_argument("--delay-ms", type=int, default=50, help="stub upstream latency")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds")
+    parser.add_argument("--write-every", type=float, default=2.0, help="seconds between admin write bursts")
+    parser.add_argument("--write-burst", type=int, default=5, help="writes per burst; 0 disables writes")
+    parser.add_argument("--days-after", type=int, default=60, help="MATERIALIZE_DAYS_AFTER for the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result file (default benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark database")
+    args = parser.parse_args()
+
+    if args.mongo == "memory":
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--mongo memory needs mongomock-motor: pip install mongomock-motor")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+        os.environ["MONGO_URL"] = "mongodb://memory"
+    else:
+        os.environ["MONGO_URL"] = args.mongo
+    os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "namaz_bench")
+    os.environ["PRAYER_TIMES_SOURCE"] = args.source
+    os.environ["MATERIALIZE_DAYS_AFTER"] = str(args.days_after)
+
+    with run_stub_upstream(args.delay_ms) as upstream_url:
+        os.environ["ALADHAN_API_URL"] = upstream_url
+        summary = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_summary(summary, baseline)
+
+    commit = git_commit()
+    output = Path(args.output) if args.output else (
+        ROOT / "benchmarks" / "results" / f"load-{commit}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": settings,
+            "results": summary,
+        }, f, indent=2)
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Microbenchmark of the metrics recorded for one /prayer-times/{date} request.
+
+A request served from the response cache records a route count and
+latency and a source count; one that computes its timings also records up
+to eight stage timings. This times exactly those sequences of calls
+against the Registry used by the app, with no request around them, and
+prints the best of several runs. The cost of an empty `with` block on the
+same machine is printed for scale.
+
+Usage:
+    python benchmarks/metrics_overhead.py [--requests 200000] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from metrics import Registry
+
+
+class NoOp:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+STAGES = (
+    'timings_cache', 'local_compute', 'mongo_adjustments', 'mongo_hijri_adjustments',
+    'mongo_timetable', 'hijri_adjustment', 'prayer_assembly', 'serialization'
+)
+
+
+def main(args):
+    registry = Registry()
+    requests = registry.counter('http_requests_total', '', ('method', 'route', 'status'))
+    latency = registry.histogram('http_request_duration_seconds', '', ('route',))
+    histogram = registry.histogram('stage_duration_seconds', '', ('stage',))
+    stages = {stage: histogram.labels(stage) for stage in STAGES}
+    source = registry.counter('prayer_timings_source_total', '', ('source',))
+    route = '/api/prayer-times/{date}'
+
+    def served(stages):
+        def run():
+            for _ in range(args.requests):
+                request_start = time.perf_counter()
+                for stage in stages:
+                    with stages[stage].time():
+                        pass
+                source.inc('computed')
+                latency.observe(time.perf_counter() - request_start, route)
+                requests.inc('GET', route, '200')
+        return run
+
+    noop = NoOp()
+
+    def empty_with():
+        for _ in range(args.requests):
+            with noop:
+                pass
+
+    def best(run):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+        return min(samples) / args.requests * 1e6
+
+    cached, computed, baseline = best(served({})), best(served(stages)), best(empty_with)
+    start = time.perf_counter()
+    registry.render()
+    render = time.perf_counter() - start
+    print(f"cached request:   {cached:.2f} us")
+    print(f"computed request: {computed:.2f} us ({len(STAGES)} stages)")
+    print(f"empty with:       {baseline:.2f} us")
+    print(f"render:           {render * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
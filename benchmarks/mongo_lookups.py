@@ -0,0 +1,105 @@
+"""
+Benchmark of the per-date adjustment lookups against a local mongod.
+
+Seeds 10 years of adjustments and Hijri adjustments into a scratch database,
+then times the old access pattern (two sequential find_one calls per date,
+no indexes) against load_adjustments / load_adjustments_for_range with the
+indexes from ensure_indexes, for single dates and for a one-year range.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/mongo_lookups.py
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "namaz_bench")
+
+import server
+from server import db
+
+PRAYERS = ('Fajr', 'Dhuhr', 'Asr', 'Maghrib', 'Isha')
+
+
+def date_keys(start, days):
+    return [start + timedelta(days=i) for i in range(days)]
+
+
+def legacy_key(day):
+    return day.strftime('%d-%b-%Y')
+
+
+async def seed(dates):
+    await db.adjustments.drop()
+    await db.hijri_adjustments.drop()
+    await db.adjustments.insert_many([
+        {"location": "hyderabad", "date": legacy_key(d), "day": d.isoformat(), "adjustments": [
+            {"prayer_name": p, "start_adjustment": random.randint(-3, 3), "end_adjustment": 0, "adjustment": 0}
+            for p in PRAYERS
+        ]}
+        for d in dates
+    ])
+    await db.hijri_adjustments.insert_many([
+        {"location": "hyderabad", "date": legacy_key(d), "day": d.isoformat(), "day_adjustment": random.choice((-1, 0, 1))}
+        for d in dates
+    ])
+
+
+async def sequential_lookup(date_key):
+    stored = await db.adjustments.find_one({"location": "hyderabad", "date": date_key})
+    hijri = await db.hijri_adjustments.find_one({"location": "hyderabad", "date": date_key})
+    return stored, hijri
+
+
+async def timed(label, fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        await fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<44} {statistics.mean(samples):>9.3f} {p99:>9.3f}")
+
+
+async def main(args):
+    dates = date_keys(date(2016, 1, 1), 3653)
+    await seed(dates)
+    sample = [(legacy_key(random.choice(dates)),) for _ in range(args.lookups)]
+    year = [legacy_key(d) for d in dates[-365:]]
+    year_args = [(year,)] * args.ranges
+    range_args = [(dates[-365], dates[-1])] * args.ranges
+
+    async def point_reads(keys):
+        for key in keys:
+            await sequential_lookup(key)
+
+    print(f"{'':<44} {'mean ms':>9} {'p99 ms':>9}")
+    await timed("single date, 2x sequential find_one, no index", sequential_lookup, sample)
+    await timed("one year, 730 find_one, no index", point_reads, year_args)
+
+    await server.ensure_indexes()
+    await timed("single date, load_adjustments, indexed", server.load_adjustments, sample)
+    await timed("one year, load_adjustments_for_range, indexed", server.load_adjustments_for_range, range_args)
+
+    if not args.keep:
+        await db.client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--ranges", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,144 @@
+"""
+Microbenchmark of per-response CPU for assembling and serializing timings.
+
+Both paths start from the same adjusted minutes and Hijri date, so only the
+assembly and encoding differ:
+
+- `models`: the previous path, five PrayerTime and one PrayerTimings model
+  with uuid4 ids and datetime.now, then model_dump_json; for a month, the
+  list of models through FastAPI's response_model validation and JSONResponse
+- `dicts`: build_prayer_timings now, a dict with ids derived from the date,
+  encoded once with orjson (`dicts, stdlib json` without it)
+
+Usage:
+    python benchmarks/response_serialization.py [--days 2000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import timings_json
+from day_times import format_12h, timeline
+from prayer_calc import PRAYER_NAMES, compute_prayer_minutes_range
+from server import PrayerTime, PrayerTimings
+from timings_json import dump_json, timestamp, timings_ids
+
+
+def make_days(count):
+    """(date, adjusted minutes, slots, Hijri) of `count` days, as build_prayer_timings has them"""
+    rows = compute_prayer_minutes_range(date(2026, 1, 1), count + 1, 17.3850, 78.4867, 5.5).tolist()
+    slots = [(0, 0), (0, 0), (0, 0), (0, 0), (2, 0)]
+    days = []
+    for i in range(count):
+        day = timeline(rows[i], rows[i + 1])
+        minutes = [(start + s, end + e) for start, end, (s, e) in zip(day, day[1:], slots)]
+        days.append(((date(2026, 1, 1) + timedelta(days=i)).strftime('%d-%b-%Y'), minutes, slots, (1447, 7, 12)))
+    return days
+
+
+def as_models(date_str, minutes, slots, hijri):
+    prayers = [
+        PrayerTime(
+            name=name, start_time=format_12h(start), end_time=format_12h(end),
+            start_adjustment=s, end_adjustment=e, adjustment=s, adjustment_source='date' if s or e else None
+        )
+        for name, (start, end), (s, e) in zip(PRAYER_NAMES, minutes, slots)
+    ]
+    return PrayerTimings(
+        date=date_str, location='hyderabad', hijri_date=str(hijri[2]), hijri_month='Rajab',
+        hijri_year=str(hijri[0]), prayers=prayers
+    )
+
+
+def as_dict(date_str, minutes, slots, hijri):
+    timings_id, *prayer_ids = timings_ids('hyderabad', date_str, len(PRAYER_NAMES))
+    return {
+        "id": timings_id,
+        "date": date_str,
+        "location": 'hyderabad',
+        "hijri_date": f"{hijri[2]}",
+        "hijri_month": 'Rajab',
+        "hijri_year": str(hijri[0]),
+        "prayers": [
+            {
+                "id": prayer_id, "name": name, "start_time": format_12h(start), "end_time": format_12h(end),
+                "start_adjustment": s, "end_adjustment": e, "adjustment": s,
+                "adjustment_source": 'date' if s or e else None
+            }
+            for prayer_id, name, (start, end), (s, e) in zip(prayer_ids, PRAYER_NAMES, minutes, slots)
+        ],
+        "degraded": False,
+        "created_at": timestamp(datetime.now(timezone.utc))
+    }
+
+
+def per_day(label, fn, days):
+    start = time.perf_counter()
+    for day in days:
+        fn(*day)
+    return label, (time.perf_counter() - start) / len(days)
+
+
+def per_month(label, fn, months):
+    start = time.perf_counter()
+    for month in months:
+        fn(month)
+    return label, (time.perf_counter() - start) / len(months)
+
+
+def main(args):
+    days = make_days(args.days)
+    # Same values either way, apart from the ids and created_at
+    model = as_models(*days[0]).model_dump(mode='json')
+    built = as_dict(*days[0])
+    for timings in (model, built):
+        timings.pop('id'), timings.pop('created_at')
+        for prayer in timings['prayers']:
+            prayer.pop('id')
+    assert model == built, "paths disagree"
+    built = as_dict(*days[0])
+    assert PrayerTimings.model_validate(built).model_dump_json().encode() == dump_json(built), "bytes differ"
+
+    orjson = timings_json.orjson
+    single = [per_day("models", lambda *day: as_models(*day).model_dump_json().encode(), days)]
+    single.append(per_day("dicts", lambda *day: dump_json(as_dict(*day)), days))
+    timings_json.orjson = None
+    single.append(per_day("dicts, stdlib json", lambda *day: dump_json(as_dict(*day)), days))
+    timings_json.orjson = orjson
+
+    field = create_response_field(name="Response_month", type_=List[PrayerTimings])
+    loop = asyncio.new_event_loop()
+
+    def fastapi_month(month):
+        content = loop.run_until_complete(serialize_response(field=field, response_content=[as_models(*d) for d in month]))
+        return JSONResponse(content).body
+
+    months = [days[i:i + 30] for i in range(0, len(days) - 29, 30)]
+    monthly = [
+        per_month("models", fastapi_month, months),
+        per_month("dicts", lambda month: dump_json([as_dict(*d) for d in month]), months),
+    ]
+
+    for title, runs in (("one date", single), ("30-day month", monthly)):
+        baseline = runs[0][1]
+        print(f"{title:<20} {'us/response':>12} {'speedup':>9}")
+        for label, elapsed in runs:
+            print(f"  {label:<18} {elapsed * 1e6:>12.1f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2000)
+    main(parser.parse_args())
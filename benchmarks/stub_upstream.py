@@ -0,0 +1,95 @@
+"""
+Local stand-in for the Aladhan timings API used by the benchmarks.
+
+A minimal keep-alive HTTP/1.1 server on raw asyncio streams that answers
+every GET with the same Aladhan-shaped payload after a fixed artificial
+latency. It is kept deliberately cheap so that the client side, not the
+stub, dominates CPU time in a benchmark.
+"""
+
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+PAYLOAD = json.dumps({
+    "code": 200,
+    "status": "OK",
+    "data": {
+        "timings": {
+            "Fajr": "05:24",
+            "Dhuhr": "12:22",
+            "Asr": "16:23",
+            "Maghrib": "18:07",
+            "Isha": "19:21"
+        },
+        "date": {
+            "hijri": {
+                "day": "15",
+                "month": {"number": 7, "en": "Rajab"},
+                "year": "1446"
+            }
+        }
+    }
+}).encode()
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(PAYLOAD)).encode() + b"\r\n"
+    b"Connection: keep-alive\r\n\r\n" + PAYLOAD
+)
+
+
+def make_handler(delay_ms, handshake_ms=0):
+    async def handle(reader, writer):
+        # The first request of a connection also pays for its setup
+        # (TCP and TLS handshakes to a remote host)
+        extra = handshake_ms / 1000
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                await asyncio.sleep(delay_ms / 1000 + extra)
+                extra = 0
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+@contextmanager
+def run_stub_upstream(delay_ms=50, handshake_ms=0):
+    """Run the stub on its own event loop thread and yield its base URL"""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    async def serve():
+        server = await asyncio.start_server(make_handler(delay_ms, handshake_ms), "127.0.0.1", 0,
+                                            backlog=4096)
+        state["server"] = server
+        state["port"] = server.sockets[0].getsockname()[1]
+        started.set()
+        async with server:
+            await server.serve_forever()
+
+    def run():
+        try:
+            loop.run_until_complete(serve())
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+    try:
+        yield f"http://127.0.0.1:{state['port']}/v1"
+    finally:
+        loop.call_soon_threadsafe(state["server"].close)
+        thread.join(timeout=5)
@@ -0,0 +1,74 @@
+"""
+Load benchmark for the upstream Aladhan fetch (fetch_prayer_times_from_aladhan).
+
+Fires batches of concurrent fetches at a local stub upstream with a fixed
+latency and reports p50/p99 per concurrency level. With a non-blocking
+pooled client p99 should stay close to the stub latency as concurrency
+rises; a blocking client grows linearly with concurrency instead.
+
+Usage:
+    python benchmarks/upstream_load.py [--delay-ms 50] [--levels 1,8,32,64]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from stub_upstream import run_stub_upstream
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(server, concurrency, rounds):
+    latencies = []
+
+    async def one(i):
+        start = time.perf_counter()
+        await server.fetch_prayer_times_from_aladhan(f"{(i % 28) + 1:02d}-Jan-2025")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    for _ in range(rounds):
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+    return latencies
+
+
+async def main(args):
+    import server
+
+    # Only the upstream session, not the app lifespan, which needs MongoDB
+    server.http_session = server.create_http_session()
+    try:
+        await run_level(server, 4, 1)  # warm the connection pool
+        print(f"{'concurrency':>11} {'p50 ms':>8} {'p99 ms':>8}")
+        for level in args.levels:
+            latencies = await run_level(server, level, args.rounds)
+            print(f"{level:>11} {statistics.median(latencies):>8.1f} "
+                  f"{percentile(latencies, 99):>8.1f}")
+    finally:
+        await server.http_session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay-ms", type=int, default=50)
+    parser.add_argument("--levels", default="1,8,32,64",
+                        type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    with run_stub_upstream(args.delay_ms) as upstream_url:
+        os.environ["ALADHAN_API_URL"] = upstream_url
+        os.environ["PRAYER_TIMES_SOURCE"] = "aladhan"
+        asyncio.run(main(args))
@@ -146,11 +146,32 @@ function App() {
     }
   }, [currentDate]);
 
-  const fetchPrayerTimes = async (date) => {
+  // While today is shown, take timing changes pushed by the server instead of refetching
+  useEffect(() => {
+    if (!currentDate || currentDate !== formatDate(new Date()) || !('EventSource' in window)) {
+      return;
+    }
+    const source = new EventSource(`${API}/prayer-times/stream`);
+    source.addEventListener('timings', (event) => {
+      const timings = JSON.parse(event.data);
+      if (timings.date !== currentDate) {
+        // Midnight rollover: move to the new day
+        setCurrentDate(timings.date);
+        return;
+      }
+      setPrayerTimes(timings);
+    });
+    return () => source.close();
+  }, [currentDate]);
+
+  const fetchPrayerTimes = async (date, revalidate = false) => {
     setLoading(true);
+    // Past dates may be cached for a long time; after saving, ask for the current version
+    const headers = revalidate ? { 'Cache-Control': 'no-cache' } : undefined;
     try { // Set a longer timeout for Render free tier cold starts (60 seconds)
       const response = await axios.get(`${API}/prayer-times/${date}`, {
-        timeout: 60000 // 60 seconds
+        timeout: 60000, // 60 seconds
+        headers
       });
       setPrayerTimes(response.data);
       
@@ -166,7 +187,8 @@ function App() {
       
       // Fetch Hijri adjustment
       const hijriResponse = await axios.get(`${API}/hijri-adjustment/${date}`, {
-        timeout: 60000
+        timeout: 60000,
+        headers
       });
       setHijriAdjustment(hijriResponse.data.day_adjustment || 0);
     } catch (error) {
@@ -178,19 +200,28 @@ function App() {
 
   const saveAdjustments = async () => {
     try {
-      const adjustmentList = Object.keys(adjustments).map(prayerName => ({
-        prayer_name: prayerName,
-        start_adjustment: adjustments[prayerName].start || 0,
-        end_adjustment: adjustments[prayerName].end || 0,
-        adjustment: adjustments[prayerName].start || 0 // For backward compatibility
-      }));
-
-      await axios.post(`${API}/adjust-prayers/${currentDate}`, {
-        adjustments: adjustmentList
-      });
+      // Only the prayers edited here; the others keep following their rules
+      // instead of being saved for this date with the values shown
+      const changed = prayerTimes.prayers
+        .filter(prayer => {
+          const edited = adjustments[prayer.name] || {};
+          return (edited.start || 0) !== (prayer.start_adjustment || 0) ||
+            (edited.end || 0) !== (prayer.end_adjustment || 0);
+        })
+        .map(prayer => ({
+          prayer_name: prayer.name,
+          start_adjustment: adjustments[prayer.name].start || 0,
+          end_adjustment: adjustments[prayer.name].end || 0
+        }));
+
+      if (changed.length > 0) {
+        await axios.patch(`${API}/adjustments/${currentDate}`, {
+          adjustments: changed
+        });
+      }
 
       // Refresh prayer times
-      await fetchPrayerTimes(currentDate);
+      await fetchPrayerTimes(currentDate, true);
       setIsAdjustmentOpen(false);
     } catch (error) {
       console.error('Error saving adjustments:', error);
@@ -204,7 +235,7 @@ function App() {
       });
 
       // Refresh prayer times to show updated Hijri date
-      await fetchPrayerTimes(currentDate);
+      await fetchPrayerTimes(currentDate, true);
       setIsHijriAdjustmentOpen(false);
     } catch (error) {
       console.error('Error saving Hijri adjustment:', error);
@@ -835,7 +866,12 @@ function App() {
               <div className="space-y-4">
                 {prayerTimes?.prayers.map(prayer => (
                   <div key={prayer.name} className="border border-emerald-200 rounded-lg p-4">
-                    <label className="text-emerald-900 font-semibold text-lg mb-3 block">{prayer.name}</label>
+                    <label className="text-emerald-900 font-semibold text-lg mb-3 block">
+                      {prayer.name}
+                      {prayer.adjustment_source === 'rule' && (
+                        <span className="ml-2 text-xs font-normal text-emerald-600">from a rule</span>
+                      )}
+                    </label>
                     <div className="grid grid-cols-2 gap-4">
                       {/* Start Time Adjustment */}
                       <div className="space-y-2">
@@ -0,0 +1,72 @@
+// Decoder for the packed timetable served by /api/prayer-times/export
+// (layout documented in backend/timetable_pack.py).
+
+const HEADER_SIZE = 17;
+const RECORD_SIZE = 24;
+const FORMAT_VERSION = 1;
+const DELTA = 1;
+const DAY_MS = 24 * 3600 * 1000;
+
+export const PRAYER_NAMES = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"];
+
+const readRecord = (view, offset) => {
+  const prayers = PRAYER_NAMES.map((name, i) => ({
+    name,
+    start: view.getInt16(offset + i * 4, true),
+    end: view.getInt16(offset + i * 4 + 2, true),
+  }));
+  return {
+    prayers,
+    hijriDay: view.getUint8(offset + 20),
+    hijriMonth: view.getUint8(offset + 21),
+    hijriYear: view.getUint16(offset + 22, true),
+  };
+};
+
+// ISO date (YYYY-MM-DD) `days` after 1970-01-01
+const isoDay = (days) => new Date(days * DAY_MS).toISOString().slice(0, 10);
+
+export function decodeTimetable(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "NMZT" || view.getUint8(4) !== FORMAT_VERSION) {
+    throw new Error("Unsupported timetable");
+  }
+  const kind = view.getUint8(5);
+  const version = view.getUint32(6, true);
+  const first = view.getInt32(10, true);
+  const days = view.getUint16(14, true);
+  const keyLength = view.getUint8(16);
+  const location = new TextDecoder().decode(new Uint8Array(buffer, HEADER_SIZE, keyLength));
+
+  let offset = HEADER_SIZE + keyLength;
+  const records = {};
+  if (kind === DELTA) {
+    const count = view.getUint16(offset, true);
+    offset += 2;
+    for (let i = 0; i < count; i++) {
+      const dayOffset = view.getUint16(offset, true);
+      records[isoDay(first + dayOffset)] = readRecord(view, offset + 2);
+      offset += 2 + RECORD_SIZE;
+    }
+  } else {
+    for (let i = 0; i < days; i++) {
+      records[isoDay(first + i)] = readRecord(view, offset + i * RECORD_SIZE);
+    }
+  }
+  return { kind, version, location, first: isoDay(first), days, records };
+}
+
+// Timetable after applying a delta (or replacing it with a full export)
+export function applyTimetable(timetable, update) {
+  if (update.kind !== DELTA || !timetable) {
+    return update;
+  }
+  return { ...timetable, version: update.version, records: { ...timetable.records, ...update.records } };
+}
+
+// Minutes from midnight as a 12h clock time without AM/PM, wrapping past midnight
+export function formatMinutes(minutes) {
+  const m = ((minutes % 1440) + 1440) % 1440;
+  return `${((Math.floor(m / 60) + 11) % 12) + 1}:${String(m % 60).padStart(2, "0")}`;
+}
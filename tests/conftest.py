@@ -0,0 +1,59 @@
+import sys
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+# The backend is run from its own directory (uvicorn server:app), so its
+# modules import each other as top-level modules.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Read when server is first imported: local prayer times, no background work
+SERVER_ENV = {
+    "MONGO_URL": "mongodb://memory",
+    "DB_NAME": "namaz_test",
+    "PRAYER_TIMES_SOURCE": "local",
+    "WARMUP": "off",
+    "MATERIALIZE_DELAY": "3600",
+    "CACHE_INVALIDATION_POLL_INTERVAL": "3600",
+}
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    The app module on an in-memory database (mongomock-motor); `serve`
+    runs it. Route tests are skipped where mongomock-motor or httpx is
+    not installed.
+    """
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    pytest.importorskip("httpx")
+    import motor.motor_asyncio
+    monkeypatch.setattr(motor.motor_asyncio, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    for name, value in SERVER_ENV.items():
+        monkeypatch.setenv(name, value)
+    import server
+    return server
+
+
+@asynccontextmanager
+async def _serve(server, seed=None):
+    import httpx
+    await server.mongo.client.drop_database(server.db.name)
+    server.response_cache.clear()
+    if seed is not None:
+        await seed(server.db)
+    async with server.lifespan(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+@pytest.fixture
+def serve(server):
+    """
+    `async with serve() as client:` starts the app on an empty database
+    (after `await seed(db)`, if given) and yields an HTTP client for it
+    """
+    return partial(_serve, server)
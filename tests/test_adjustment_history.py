@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from adjustment_history import HIJRI, PRAYERS, AdjustmentHistory, rule_event, state_event
+
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+class MemoryCounters:
+    def __init__(self):
+        self.versions = {}
+
+    async def find_one(self, query):
+        version = self.versions.get(query['_id'])
+        return {'version': version} if version is not None else None
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.versions[query['_id']] = self.versions.get(query['_id'], 0) + update['$inc']['version']
+        return {'version': self.versions[query['_id']]}
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, bound in condition.items():
+            if value is None or not {'$gt': value > bound, '$gte': value >= bound, '$lte': value <= bound}[op]:
+                return False
+    return True
+
+
+class MemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key])
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class MemoryEvents:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_many(self, docs):
+        self.docs.extend(docs)
+
+    def find(self, query, projection=None):
+        return MemoryCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+
+def saved(date, field, value, version, minutes):
+    return state_event(field, {
+        'date': date, 'day': datetime.strptime(date, '%d-%b-%Y').date().isoformat(),
+        field: value, 'version': version, 'updated_at': T0 + timedelta(minutes=minutes)
+    })
+
+
+def test_changes_keep_the_latest_version_and_wait_for_missing_numbers():
+    async def run():
+        events = MemoryEvents()
+        history = AdjustmentHistory(events, MemoryCounters())
+        await history.record('hyderabad', [saved('10-Mar-2026', PRAYERS, [{'prayer_name': 'Isha'}], 1, 0)])
+        await history.record('hyderabad', [
+            saved('10-Mar-2026', HIJRI, 1, 1, 1),
+            # Logged out of order by racing writers; the version decides
+            saved('10-Mar-2026', PRAYERS, [], 3, 2),
+            saved('10-Mar-2026', PRAYERS, [{'prayer_name': 'Fajr'}], 2, 1),
+        ])
+        await history.record('makkah', [saved('10-Mar-2026', HIJRI, -1, 1, 0)])
+
+        seq, changes = await history.changes('hyderabad', 1)
+        assert seq == 4
+        assert [(event['field'], event['version'], event['value']) for event in changes] == [
+            (HIJRI, 1, 1), (PRAYERS, 3, [])
+        ]
+
+        # Number 5 taken but not appended yet: stop before it
+        await history.record('hyderabad', [saved('11-Mar-2026', HIJRI, 2, 1, 3), saved('12-Mar-2026', HIJRI, 2, 1, 3)])
+        in_flight = events.docs.pop(-2)
+        assert (await history.changes('hyderabad', 4))[0] == 4
+        # ... unless its writer is long gone
+        for event in events.docs:
+            event['logged_at'] -= timedelta(minutes=5)
+        seq, changes = await history.changes('hyderabad', 4)
+        assert (seq, [event['date'] for event in changes]) == (6, ['12-Mar-2026'])
+        events.docs.append(in_flight)
+        assert (await history.changes('hyderabad', 6)) == (6, [])
+
+    asyncio.run(run())
+
+
+def test_values_and_rules_at_a_past_moment():
+    async def run():
+        history = AdjustmentHistory(MemoryEvents(), MemoryCounters())
+        rule = {'id': 'r1', 'created_at': T0, 'start_date': '01-Mar-2026', 'end_date': '31-Mar-2026', 'adjustments': []}
+        await history.record('hyderabad', [
+            saved('10-Mar-2026', PRAYERS, [{'prayer_name': 'Isha', 'start_adjustment': 5}], 1, 0),
+            rule_event('r1', rule, T0),
+            saved('10-Mar-2026', PRAYERS, [{'prayer_name': 'Isha', 'start_adjustment': 7}], 2, 10),
+            saved('11-Mar-2026', HIJRI, 1, 1, 10),
+            rule_event('r1', None, T0 + timedelta(minutes=20)),
+        ])
+
+        at = T0 + timedelta(minutes=5)
+        assert await history.state_at('hyderabad', '2026-03-10', '2026-03-11', at) == (
+            {'10-Mar-2026': [{'prayer_name': 'Isha', 'start_adjustment': 5}]}, {}
+        )
+        assert await history.rules_at('hyderabad', at) == [rule]
+
+        later = T0 + timedelta(minutes=30)
+        assert await history.state_at('hyderabad', '2026-03-10', '2026-03-11', later) == (
+            {'10-Mar-2026': [{'prayer_name': 'Isha', 'start_adjustment': 7}]}, {'11-Mar-2026': 1}
+        )
+        assert await history.rules_at('hyderabad', later) == []
+        assert await history.state_at('hyderabad', '2026-03-10', '2026-03-11', T0 - timedelta(days=1)) == ({}, {})
+
+    asyncio.run(run())
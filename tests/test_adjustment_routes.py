@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+
+def test_listing_is_limited_to_max_range_days(server, serve):
+    async def run():
+        async with serve() as client:
+            await client.post("/api/adjust-hijri/31-Dec-2027", json={"day_adjustment": 1})
+            response = await client.get("/api/adjustments", params={"from": "01-Jan-2026", "to": "02-Jan-2028"})
+            assert response.status_code == 200
+            assert [doc["date"] for doc in response.json()] == ["31-Dec-2027"]
+            response = await client.get("/api/adjustments", params={"from": "01-Jan-2026", "to": "03-Jan-2028"})
+            assert response.status_code == 400
+            assert response.json()["detail"] == f"Range is limited to {server.MAX_RANGE_DAYS} days"
+            response = await client.get("/api/adjustments", params={"from": "01-Jan-1900", "to": "01-Jan-2100"})
+            assert response.status_code == 400
+
+    asyncio.run(run())
+
+
+def test_served_prayers_say_where_their_adjustments_come_from(server, serve):
+    async def run():
+        async with serve() as client:
+            await client.post("/api/adjustment-rules", json={
+                "start_date": "01-Mar-2026", "end_date": "31-Mar-2026",
+                "adjustments": [{"prayer_name": "Fajr", "start_adjustment": 2}, {"prayer_name": "Isha", "end_adjustment": 3}]
+            })
+            await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 5}]})
+            prayers = (await client.get("/api/prayer-times/10-Mar-2026")).json()["prayers"]
+            assert [(p["adjustment_source"], p["start_adjustment"], p["end_adjustment"]) for p in prayers] == [
+                ("rule", 2, 0), (None, 0, 0), (None, 0, 0), (None, 0, 0), ("date", 5, 0)
+            ]
+            # Only the date's own values are saved for it
+            assert (await client.get("/api/adjustments/10-Mar-2026")).json() == [
+                {"prayer_name": "Isha", "start_adjustment": 5, "end_adjustment": 0, "adjustment": 0}
+            ]
+
+    asyncio.run(run())
+
+
+def test_stream_starts_come_from_the_adjusted_timeline(server, serve):
+    async def run():
+        async with serve() as client:
+            await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [{"prayer_name": "Fajr", "start_adjustment": -400}]})
+            body, starts = await server.load_stream_day("10-Mar-2026")
+            # Fajr moved into the evening before, shown on a 12h clock
+            assert starts["Fajr"] < 0 < starts["Dhuhr"] < starts["Asr"] < starts["Maghrib"] < starts["Isha"]
+            assert json.loads(body)["prayers"][0]["start_time"] == server.format_12h(starts["Fajr"])
+
+    asyncio.run(run())
+
+
+def test_date_paths_are_canonicalized(server, serve):
+    async def run():
+        async with serve() as client:
+            response = await client.post("/api/adjust-prayers/1-Oct-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 5}]})
+            assert (response.status_code, response.json()["version"]) == (200, 1)
+            # The same document, not a second one for the same day
+            response = await client.post("/api/adjust-prayers/01-oct-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 6}]})
+            assert (response.status_code, response.json()["version"]) == (200, 2)
+            assert (await client.get("/api/adjustments/01-OCT-2026")).json()[0]["start_adjustment"] == 6
+            prayers = (await client.get("/api/prayer-times/1-oct-2026")).json()["prayers"]
+            assert (prayers[4]["adjustment_source"], prayers[4]["start_adjustment"]) == ("date", 6)
+            assert [doc["date"] async for doc in server.db.adjustments.find({})] == ["01-Oct-2026"]
+
+            response = await client.get("/api/prayer-times/31-Feb-2026")
+            assert (response.status_code, response.json()["detail"]) == (400, "Invalid date: 31-Feb-2026, expected DD-MMM-YYYY")
+
+    asyncio.run(run())
+
+
+def test_changes_take_a_known_history_number(server, serve):
+    async def run():
+        async with serve() as client:
+            await client.post("/api/adjust-hijri/10-Mar-2026", json={"day_adjustment": 1})
+            response = await client.get("/api/adjustments/changes", params={"since": 0})
+            assert (response.status_code, response.json()["version"]) == (200, 1)
+            assert (await client.get("/api/adjustments/changes", params={"since": -1})).status_code == 422
+            assert (await client.get("/api/adjustments/changes", params={"since": 2})).status_code == 400
+
+    asyncio.run(run())
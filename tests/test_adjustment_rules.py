@@ -0,0 +1,47 @@
+from datetime import date
+
+from adjustment_rules import RuleIndex
+
+
+def rule(adjustments, **scope):
+    return {
+        **scope,
+        'adjustments': [
+            {'prayer_name': name, 'start_adjustment': start, 'end_adjustment': end}
+            for name, (start, end) in adjustments.items()
+        ]
+    }
+
+
+def day(year, month, d):
+    return date(year, month, d).toordinal()
+
+
+def test_date_range_rule_applies_inclusively():
+    index = RuleIndex([rule({'Maghrib': (2, 0)}, start_date='01-Mar-2025', end_date='30-Mar-2025')])
+    assert index.resolve(day(2025, 2, 28)) == {}
+    assert index.resolve(day(2025, 3, 1)) == {'Maghrib': (2, 0)}
+    assert index.resolve(day(2025, 3, 30)) == {'Maghrib': (2, 0)}
+    assert index.resolve(day(2025, 3, 31)) == {}
+
+
+def test_later_rule_wins_per_prayer_where_rules_overlap():
+    index = RuleIndex([
+        rule({'Maghrib': (2, 0), 'Isha': (1, 0)}, start_date='01-Mar-2025', end_date='30-Mar-2025'),
+        rule({'Maghrib': (5, 1)}, start_date='10-Mar-2025', end_date='12-Mar-2025'),
+    ])
+    assert index.resolve(day(2025, 3, 11)) == {'Maghrib': (5, 1), 'Isha': (1, 0)}
+    assert index.resolve(day(2025, 3, 13)) == {'Maghrib': (2, 0), 'Isha': (1, 0)}
+
+
+def test_hijri_month_rules_by_year_and_every_year():
+    index = RuleIndex([
+        rule({'Maghrib': (2, 0)}, hijri_month='Ramadan'),
+        rule({'Isha': (10, 0)}, hijri_month='Ramadan', hijri_year=1446),
+        rule({'Fajr': (-3, 0)}, start_date='01-Mar-2025', end_date='05-Mar-2025'),
+    ])
+    assert index.resolve(day(2025, 3, 3), 'Ramadan', '1446') == {
+        'Maghrib': (2, 0), 'Isha': (10, 0), 'Fajr': (-3, 0)
+    }
+    assert index.resolve(day(2026, 2, 20), 'Ramadan', '1447') == {'Maghrib': (2, 0)}
+    assert index.resolve(day(2026, 4, 20), 'Shawwal', '1447') == {}
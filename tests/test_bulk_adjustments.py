@@ -0,0 +1,149 @@
+import asyncio
+import json
+from datetime import timedelta
+
+
+def isha(prayers):
+    return next((p["start_adjustment"], p["end_adjustment"]) for p in prayers if p["name"] == "Isha")
+
+
+def item(date, start, day_adjustment=None):
+    return {"date": date, "adjustments": [{"prayer_name": "Isha", "start_adjustment": start}], "day_adjustment": day_adjustment}
+
+
+def test_invalid_payloads_write_nothing(server, serve):
+    async def run():
+        async with serve() as client:
+            response = await client.post("/api/adjustments/bulk", json={"items": [
+                item("10-Mar-2026", 1),
+                {"date": "11-Mar-2026", "adjustments": [{"prayer_name": "Zuhr", "start_adjustment": 1}]},
+                item("31-Feb-2026", 1),
+                item("10-mar-2026", 2),
+                {"date": "12-Mar-2026"},
+            ]})
+            assert response.status_code == 400
+            assert [(error["index"], error["error"]) for error in response.json()["detail"]] == [
+                (1, "Unknown prayer: Zuhr"),
+                (2, "Invalid date: 31-Feb-2026"),
+                (3, "Duplicate date: 10-Mar-2026"),
+                (4, "Nothing to adjust: give adjustments and/or day_adjustment"),
+            ]
+            assert await server.db.adjustments.count_documents({}) == 0
+
+            too_many = [{"date": f"{day:02d}-Jan-2026", "day_adjustment": 1} for day in range(1, 32)] * 24
+            assert len(too_many) > server.MAX_RANGE_DAYS
+            response = await client.post("/api/adjustments/bulk", json={"items": too_many})
+            assert response.status_code == 400
+            assert response.json()["detail"] == f"At most {server.MAX_RANGE_DAYS} dates per request"
+
+    asyncio.run(run())
+
+
+def test_failed_dates_are_reported_and_the_rest_are_saved(server, serve, monkeypatch):
+    from mongomock.collection import Collection
+    from pymongo.errors import BulkWriteError
+
+    bulk_write = Collection.bulk_write
+
+    def failing_bulk_write(self, operations, ordered=True, **kwargs):
+        """Fails the prayer adjustments of the first date as a version conflict and of the third as invalid"""
+        if self.name != "adjustments" or len(operations) != 3:
+            return bulk_write(self, operations, ordered=ordered, **kwargs)
+        kept = [1]
+        result = bulk_write(self, [operations[i] for i in kept], ordered=ordered, **kwargs).bulk_api_result
+        raise BulkWriteError({
+            **result,
+            "upserted": [{**entry, "index": kept[entry["index"]]} for entry in result["upserted"]],
+            "writeErrors": [
+                {"index": 0, "code": server.DUPLICATE_KEY, "errmsg": "E11000 duplicate key"},
+                {"index": 2, "code": 121, "errmsg": "Document failed validation"},
+            ],
+        })
+
+    monkeypatch.setattr(Collection, "bulk_write", failing_bulk_write)
+
+    async def run():
+        async with serve() as client:
+            await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 9}]})
+            response = await client.post("/api/adjustments/bulk", json={"items": [
+                item("10-Mar-2026", 1), item("11-Mar-2026", 2, day_adjustment=1), item("12-Mar-2026", 3, day_adjustment=-1)
+            ]})
+            assert response.status_code == 200
+            assert response.json()["results"] == [
+                # Written again on its own after the conflict
+                {"date": "10-Mar-2026", "adjustments": "updated"},
+                {"date": "11-Mar-2026", "adjustments": "created", "day_adjustment": "created"},
+                {"date": "12-Mar-2026", "adjustments": "error: Document failed validation", "day_adjustment": "created"},
+            ]
+            stored = {doc["date"]: (doc["adjustments"][0]["start_adjustment"], doc["version"])
+                      async for doc in server.db.adjustments.find({})}
+            assert stored == {"10-Mar-2026": (1, 2), "11-Mar-2026": (2, 1)}
+            logged = {(event["date"], event["field"], event["version"]) async for event in server.db.adjustment_events.find({})}
+            assert logged == {
+                ("10-Mar-2026", "adjustments", 1), ("10-Mar-2026", "adjustments", 2), ("11-Mar-2026", "adjustments", 1),
+                ("11-Mar-2026", "day_adjustment", 1), ("12-Mar-2026", "day_adjustment", 1),
+            }
+
+    asyncio.run(run())
+
+
+def test_a_batch_rebuilds_and_invalidates_its_dates_once(server, serve):
+    async def run():
+        async with serve() as client:
+            today = server.local_today(server.DEFAULT_LOCATION)
+            # Inside the materialized window, and outside it
+            inside, outside = today + timedelta(days=3), today + timedelta(days=server.MATERIALIZE_DAYS_AFTER + 3)
+            dates = [day.strftime('%d-%b-%Y') for day in (inside, outside)]
+            for date in dates:
+                assert isha((await client.get(f"/api/prayer-times/{date}")).json()["prayers"]) == (0, 0)
+            version = await server.invalidation_log.current_version()
+
+            response = await client.post("/api/adjustments/bulk", json={"items": [item(date, 4) for date in dates]})
+            assert response.status_code == 200
+
+            # One log entry for the batch, naming both dates
+            assert await server.invalidation_log.current_version() == version + 1
+            entry = await server.db.cache_invalidations.find_one({"version": version + 1})
+            assert entry["dates"] == [f"hyderabad/{date}" for date in dates]
+            # Both are served with the new values, not from the response cache
+            # or the timetable while it is rebuilt
+            for date in dates:
+                assert isha((await client.get(f"/api/prayer-times/{date}")).json()["prayers"]) == (4, 0)
+            # After the response, the date in the window is rebuilt and the other is not materialized
+            await asyncio.gather(*server.rematerialize_tasks)
+            body, adjusted = await server.timetable_store.get("hyderabad", inside.isoformat())
+            assert adjusted and isha(json.loads(body)["prayers"]) == (4, 0)
+            assert await server.timetable_store.get("hyderabad", outside.isoformat()) is None
+
+    asyncio.run(run())
+
+
+def test_bulk_writes_bump_each_dates_version(server, serve):
+    async def seed(db):
+        # Saved before versions existed
+        await db.adjustments.insert_one({
+            "location": "hyderabad", "date": "10-Mar-2026", "day": "2026-03-10",
+            "adjustments": [{"prayer_name": "Isha", "start_adjustment": 1}]
+        })
+
+    async def run():
+        async with serve(seed) as client:
+            # The new date first: mongomock numbers upserts among themselves, not by operation
+            for start in (2, 3):
+                response = await client.post("/api/adjustments/bulk", json={"items": [item("11-Mar-2026", start), item("10-Mar-2026", start)]})
+                assert [result["adjustments"] for result in response.json()["results"]] == (
+                    ["created", "updated"] if start == 2 else ["updated", "updated"]
+                )
+            versions = {doc["date"]: doc["version"] async for doc in server.db.adjustments.find({})}
+            assert versions == {"10-Mar-2026": 2, "11-Mar-2026": 2}
+            assert (await client.get("/api/adjustments/10-Mar-2026")).headers["etag"] == '"2026-03-10.v2"'
+            logged = sorted([(event["date"], event["version"]) async for event in server.db.adjustment_events.find({"field": "adjustments"})])
+            # The backfilled unversioned value, then both bulk writes
+            assert logged == [("10-Mar-2026", 0), ("10-Mar-2026", 1), ("10-Mar-2026", 2), ("11-Mar-2026", 1), ("11-Mar-2026", 2)]
+
+            # A conditional write after them needs the version they left
+            response = await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 4}]},
+                                         headers={"If-Match": '"2026-03-10.v1"'})
+            assert response.status_code == 412
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok():
+    return 'ok'
+
+
+async def down():
+    raise ConnectionError("upstream down")
+
+
+def make_breaker():
+    clock = Clock()
+    return CircuitBreaker('test', failure_threshold=2, reset_timeout=10, max_reset_timeout=25, clock=clock), clock
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    async def run():
+        breaker, _ = make_breaker()
+        with pytest.raises(ConnectionError):
+            await breaker.call(down)
+        assert await breaker.call(ok) == 'ok'  # a success resets the count
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await breaker.call(down)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        return breaker.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot['short_circuited'] == 1
+    assert snapshot['retry_in'] == 10
+
+
+def test_half_open_admits_one_trial_and_backs_off_on_failure():
+    async def run():
+        breaker, clock = make_breaker()
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await breaker.call(down)
+
+        clock.now = 10
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+            raise ConnectionError("still down")
+
+        trial = asyncio.ensure_future(breaker.call(slow))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        gate.set()
+        with pytest.raises(ConnectionError):
+            await trial
+        assert (breaker.state, breaker.reset_timeout) == (OPEN, 20)
+
+        clock.now = 29
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        clock.now = 30
+        assert await breaker.call(ok) == 'ok'
+        assert (breaker.state, breaker.reset_timeout) == (CLOSED, 10)
+
+    asyncio.run(run())
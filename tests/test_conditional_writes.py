@@ -0,0 +1,238 @@
+import asyncio
+import copy
+import os
+
+import pytest
+
+# A real server to check the pipeline evaluation below against, e.g.
+# mongodb://localhost:27017; mongomock cannot run pipeline updates
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+MISSING = object()
+
+
+def merge_objects(*values):
+    merged = {}
+    for value in values:
+        if value not in (None, MISSING):
+            merged.update(value)
+    return merged
+
+
+# Exactly the aggregation operators merge_prayers_update uses, as MongoDB
+# evaluates them; test_merge_uses_only_the_interpreted_operators keeps the
+# two in step. $let, $filter and $literal bind or defer their arguments, so
+# `evaluate` handles them itself.
+OPERATORS = {
+    "$ifNull": lambda value, default: default if value in (None, MISSING) else value,
+    "$arrayElemAt": lambda items, index: items[index] if index < len(items) else MISSING,
+    "$eq": lambda a, b: a == b,
+    "$in": lambda value, items: value in items,
+    "$not": lambda value: not value,
+    "$add": lambda *values: sum(values),
+    "$concatArrays": lambda *arrays: [item for items in arrays for item in items],
+    "$mergeObjects": merge_objects,
+}
+SPECIAL_FORMS = ("$let", "$filter", "$literal")
+
+
+def evaluate(expression, doc, variables):
+    if isinstance(expression, str):
+        if expression.startswith("$"):
+            name, _, path = expression.lstrip("$").partition(".")
+            value = variables[name] if expression.startswith("$$") else doc.get(name, MISSING)
+            for part in path.split(".") if path else ():
+                value = value.get(part, MISSING) if isinstance(value, dict) else MISSING
+            return value
+        return expression
+    if isinstance(expression, list):
+        return [evaluate(item, doc, variables) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) != 1 or not next(iter(expression)).startswith("$"):
+        return {key: evaluate(value, doc, variables) for key, value in expression.items()}
+    (op, args), = expression.items()
+    if op == "$literal":
+        return args
+    if op == "$let":
+        bound = {name: evaluate(value, doc, variables) for name, value in args["vars"].items()}
+        return evaluate(args["in"], doc, {**variables, **bound})
+    if op == "$filter":
+        items = evaluate(args["input"], doc, variables)
+        return [item for item in items if evaluate(args["cond"], doc, {**variables, "this": item})]
+    return OPERATORS[op](*evaluate(args, doc, variables))
+
+
+def operators_in(expression):
+    """Every $operator an aggregation expression uses"""
+    if isinstance(expression, list):
+        return set().union(*map(operators_in, expression))
+    if not isinstance(expression, dict):
+        return set()
+    found = {key for key in expression if key.startswith("$")}
+    if "$literal" in expression:
+        return found
+    return found.union(*map(operators_in, expression.values()))
+
+
+def apply_pipeline(pipeline, doc):
+    doc = copy.deepcopy(doc)
+    for stage in pipeline:
+        (op, fields), = stage.items()
+        assert op == "$set"
+        doc.update({name: evaluate(value, doc, {}) for name, value in fields.items()})
+    return doc
+
+
+def merge_pipeline(server):
+    change = server.PrayerAdjustmentChange
+    return server.merge_prayers_update([
+        change(prayer_name="Isha", end_adjustment=9),
+        change(prayer_name="Fajr", end_adjustment=1),
+        change(prayer_name="Asr", start_adjustment=5),
+    ], "10-Mar-2026")
+
+
+def test_merge_uses_only_the_interpreted_operators(server):
+    pipeline = merge_pipeline(server)
+    # One $set stage of the fields a full write sets, so an upsert creates the same document
+    assert [list(stage) for stage in pipeline] == [["$set"]]
+    assert set(pipeline[0]["$set"]) == {"location", "date", "day", "adjustments", "version", "updated_at"}
+    assert operators_in(pipeline[0]["$set"]) == set(OPERATORS) | set(SPECIAL_FORMS)
+
+
+@pytest.fixture
+def evaluated_pipelines(monkeypatch):
+    """Lets mongomock run pipeline updates of find_one_and_update with `evaluate`"""
+    from mongomock.collection import Collection
+
+    find_one_and_update = Collection.find_one_and_update
+
+    def evaluating(self, filter, update, *args, upsert=False, **kwargs):
+        if not isinstance(update, list):
+            return find_one_and_update(self, filter, update, *args, upsert=upsert, **kwargs)
+        doc = self.find_one(filter) or {key: value for key, value in filter.items() if not key.startswith("$")}
+        fields = {key: value for key, value in apply_pipeline(update, doc).items() if key != "_id"}
+        return find_one_and_update(self, filter, {"$set": fields}, *args, upsert=upsert, **kwargs)
+
+    monkeypatch.setattr(Collection, "find_one_and_update", evaluating)
+
+
+def run_on_mongod(pipeline, doc):
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=2000)
+    collection = client.namaz_test.pipeline_updates
+    try:
+        collection.drop()
+        collection.insert_one(copy.deepcopy(doc))
+        return collection.find_one_and_update(
+            {"date": doc["date"]}, pipeline, projection={"_id": 0}, return_document=pymongo.ReturnDocument.AFTER
+        )
+    finally:
+        collection.drop()
+        client.close()
+
+
+@pytest.mark.parametrize("apply", [
+    apply_pipeline,
+    pytest.param(run_on_mongod, marks=pytest.mark.skipif(not MONGO_TEST_URL, reason="MONGO_TEST_URL is not set")),
+])
+def test_merge_keeps_the_other_prayers_and_fields(server, apply):
+    stored = {"location": "hyderabad", "date": "10-Mar-2026", "adjustments": [
+        # Saved before start_adjustment existed
+        {"prayer_name": "Fajr", "adjustment": 2},
+        {"prayer_name": "Dhuhr", "start_adjustment": 1, "end_adjustment": 0, "adjustment": 1},
+        {"prayer_name": "Isha", "start_adjustment": 3, "end_adjustment": 4, "adjustment": 3},
+        # Shadowed by the first Isha entry, as index_adjustments reads them
+        {"prayer_name": "Isha", "start_adjustment": 99, "end_adjustment": 99, "adjustment": 99},
+    ]}
+    pipeline = merge_pipeline(server)
+
+    merged = apply(pipeline, stored)
+    assert merged["adjustments"] == [
+        {"prayer_name": "Dhuhr", "start_adjustment": 1, "end_adjustment": 0, "adjustment": 1},
+        {"prayer_name": "Isha", "start_adjustment": 3, "end_adjustment": 9, "adjustment": 3},
+        {"prayer_name": "Fajr", "adjustment": 2, "start_adjustment": 2, "end_adjustment": 1},
+        {"prayer_name": "Asr", "start_adjustment": 5, "end_adjustment": 0, "adjustment": 5},
+    ]
+    assert (merged["day"], merged["version"]) == ("2026-03-10", 1)
+    assert apply(pipeline, {**stored, "version": 4})["version"] == 5
+
+
+def isha(adjustments):
+    return next((a["start_adjustment"], a["end_adjustment"]) for a in adjustments if a["prayer_name"] == "Isha")
+
+
+def test_if_match_makes_writes_conditional(serve):
+    async def run():
+        async with serve() as client:
+            url = "/api/adjust-prayers/10-Mar-2026"
+            response = await client.post(url, json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 1}]})
+            assert (response.json()["version"], response.headers["etag"]) == (1, '"2026-03-10.v1"')
+            assert (await client.get("/api/adjustments/10-Mar-2026")).headers["etag"] == '"2026-03-10.v1"'
+
+            # Written after the version the client read
+            response = await client.post(url, json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 2}]},
+                                         headers={"If-Match": '"2026-03-10.v0"'})
+            assert (response.status_code, response.headers["etag"]) == (412, '"2026-03-10.v1"')
+            # If-Match compares strongly
+            response = await client.post(url, json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 2}]},
+                                         headers={"If-Match": 'W/"2026-03-10.v1"'})
+            assert response.status_code == 412
+            assert isha((await client.get("/api/adjustments/10-Mar-2026")).json()) == (1, 0)
+
+            response = await client.post(url, json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 2}]},
+                                         headers={"If-Match": '"2026-03-09.v1", "2026-03-10.v1"'})
+            assert (response.status_code, response.json()["version"], response.headers["etag"]) == (200, 2, '"2026-03-10.v2"')
+            response = await client.post(url, json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 3}]},
+                                         headers={"If-Match": "*"})
+            assert response.json()["version"] == 3
+
+            # Version 0 is a date nothing was saved for yet
+            response = await client.post("/api/adjust-hijri/11-Mar-2026", json={"day_adjustment": 1},
+                                         headers={"If-Match": '"2026-03-11.v0"'})
+            assert (response.status_code, response.json()["version"]) == (200, 1)
+            response = await client.post("/api/adjust-hijri/11-Mar-2026", json={"day_adjustment": -1},
+                                         headers={"If-Match": '"2026-03-11.v0"'})
+            assert (response.status_code, response.headers["etag"]) == (412, '"2026-03-11.v1"')
+            assert (await client.get("/api/hijri-adjustment/11-Mar-2026")).json()["day_adjustment"] == 1
+
+    asyncio.run(run())
+
+
+def test_patch_merges_into_the_stored_adjustments(server, serve, evaluated_pipelines):
+    async def run():
+        async with serve() as client:
+            url = "/api/adjustments/10-Mar-2026"
+            await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [
+                {"prayer_name": "Isha", "start_adjustment": 5, "end_adjustment": 2}
+            ]})
+            response = await client.patch(url, json={"adjustments": [
+                {"prayer_name": "Isha", "end_adjustment": 7}, {"prayer_name": "Fajr", "start_adjustment": 1}
+            ]}, headers={"If-Match": '"2026-03-10.v1"'})
+            assert (response.status_code, response.json()["version"], response.headers["etag"]) == (200, 2, '"2026-03-10.v2"')
+            adjustments = (await client.get(url)).json()
+            assert isha(adjustments) == (5, 7)
+            assert next(a["start_adjustment"] for a in adjustments if a["prayer_name"] == "Fajr") == 1
+
+            # A stale version changes nothing, and is told the current one
+            response = await client.patch(url, json={"adjustments": [{"prayer_name": "Isha", "end_adjustment": 0}]},
+                                          headers={"If-Match": '"2026-03-10.v1"'})
+            assert (response.status_code, response.headers["etag"]) == (412, '"2026-03-10.v2"')
+            response = await client.patch(url, json={"adjustments": [{"prayer_name": "Isha", "end_adjustment": 0}]},
+                                          headers={"If-Match": '"2026-03-10.v0"'})
+            assert response.status_code == 412
+            assert isha((await client.get(url)).json()) == (5, 7)
+
+            # Creates a date nothing was saved for
+            response = await client.patch("/api/adjustments/12-Mar-2026", json={"adjustments": [
+                {"prayer_name": "Asr", "end_adjustment": 4}
+            ]}, headers={"If-Match": '"2026-03-12.v0"'})
+            assert (response.status_code, response.json()["version"]) == (200, 1)
+            assert (await client.get("/api/adjustments/12-Mar-2026")).json() == [
+                {"prayer_name": "Asr", "start_adjustment": 0, "end_adjustment": 4, "adjustment": 0}
+            ]
+            versions = [event["version"] async for event in server.db.adjustment_events.find({"date": "10-Mar-2026"})]
+            assert sorted(versions) == [1, 2]
+
+    asyncio.run(run())
@@ -0,0 +1,37 @@
+from day_times import adjustment_sources, apply_adjustments, end_minutes, format_12h, index_adjustments, parse_minutes, timeline
+
+STARTS = [5 * 60 + 12, 12 * 60 + 20, 16 * 60 + 45, 18 * 60 + 30, 19 * 60 + 45]
+TIMELINE = timeline(STARTS, [5 * 60 + 13])
+
+
+def test_formatting_round_trip():
+    assert parse_minutes('05:12') == 312
+    assert [format_12h(m) for m in (0, 59, 312, 720, 779, 1439, 1440 + 313, -10)] == [
+        '12:00', '12:59', '5:12', '12:00', '12:59', '11:59', '5:13', '11:50'
+    ]
+
+
+def test_stored_adjustments_win_over_rules_and_first_entry_wins():
+    slots = index_adjustments(
+        [{'prayer_name': 'Isha', 'start_adjustment': 5}, {'prayer_name': 'Isha', 'start_adjustment': 9},
+         {'prayer_name': 'Fajr', 'adjustment': -3}, {'prayer_name': 'Zuhr', 'start_adjustment': 1}],
+        {'Isha': (2, 0), 'Maghrib': (1, 4)}
+    )
+    assert slots == [(-3, 0), (0, 0), (0, 0), (1, 4), (5, 0)]
+    assert adjustment_sources(
+        [{'prayer_name': 'Isha', 'start_adjustment': 0}, {'prayer_name': 'Zuhr'}], {'Isha': (2, 0), 'Maghrib': (1, 4)}
+    ) == [None, None, None, 'rule', 'date']
+
+
+def test_isha_ends_at_the_next_fajr_or_islamic_midnight():
+    assert end_minutes(TIMELINE) == (*STARTS[1:], 1440 + 313)
+    # Halfway from Maghrib (18:30) to the next Fajr (05:13)
+    assert end_minutes(TIMELINE, 'midnight')[-1] == (18 * 60 + 30 + 1440 + 313) // 2
+
+
+def test_adjustments_roll_over_midnight():
+    adjusted = apply_adjustments(TIMELINE, [(-400, 0), (0, 5), (0, 0), (0, 0), (300, 30)])
+    assert adjusted[0] == (STARTS[0] - 400, STARTS[1])
+    assert adjusted[1] == (STARTS[1], STARTS[2] + 5)
+    assert adjusted[4] == (STARTS[4] + 300, 1440 + 313 + 30)
+    assert [format_12h(m) for m in adjusted[4]] == ['12:45', '5:43']
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import date
+
+from timetable_pack import DELTA, FULL, unpack
+
+EXPORT = "/api/prayer-times/export?from=01-Mar-2026&to=31-Mar-2026"
+
+
+def isha(record):
+    minutes, _ = record
+    return minutes[4]
+
+
+def test_deltas_follow_the_adjustment_history(server, serve):
+    async def run():
+        async with serve() as client:
+            full = unpack((await client.get(EXPORT)).content)
+            assert (full["kind"], full["version"], full["days"]) == (FULL, 0, 31)
+
+            await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 5}]})
+            await client.post("/api/adjust-hijri/12-Mar-2026", json={"day_adjustment": 1})
+            # Outside the exported range
+            await client.post("/api/adjust-prayers/10-Apr-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 5}]})
+            # The invalidation log only keeps a day; the history is kept for good
+            await server.db.cache_invalidations.delete_many({})
+
+            delta = unpack((await client.get(f"{EXPORT}&since={full['version']}")).content)
+            assert (delta["kind"], delta["version"]) == (DELTA, 3)
+            assert sorted(delta["records"]) == [date(2026, 3, 10), date(2026, 3, 12)]
+            march_10 = delta["records"][date(2026, 3, 10)]
+            assert isha(march_10)[0] == isha(full["records"][date(2026, 3, 10)])[0] + 5
+
+            # Nothing changed since the delta
+            latest = unpack((await client.get(f"{EXPORT}&since={delta['version']}")).content)
+            assert (latest["kind"], latest["version"], latest["records"]) == (DELTA, 3, {})
+            assert (await client.get(f"{EXPORT}&since=4")).status_code == 400
+
+    asyncio.run(run())
+
+
+def test_a_rule_change_sends_the_whole_range(server, serve):
+    async def run():
+        async with serve() as client:
+            version = unpack((await client.get(EXPORT)).content)["version"]
+            response = await client.post("/api/adjustment-rules", json={
+                "start_date": "01-Mar-2026", "end_date": "31-Mar-2026",
+                "adjustments": [{"prayer_name": "Fajr", "start_adjustment": 2}]
+            })
+            assert response.status_code == 200
+            timetable = unpack((await client.get(f"{EXPORT}&since={version}")).content)
+            assert (timetable["kind"], timetable["version"], len(timetable["records"])) == (FULL, version + 1, 31)
+
+    asyncio.run(run())
@@ -0,0 +1,47 @@
+import json
+from datetime import date
+from pathlib import Path
+
+from hijri_calendar import FIRST_YEAR, LAST_YEAR, month_length, to_day_number, to_hijri
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'ummalqura_1400_1500.json'
+
+
+def load_month_starts():
+    rows = json.loads(FIXTURE.read_text())['month_starts']
+    return [(year, month, date.fromisoformat(first_day).toordinal()) for year, month, first_day in rows]
+
+
+def test_month_starts_match_published_table():
+    for year, month, first_day in load_month_starts():
+        assert to_day_number(year, month, 1) == first_day
+        assert to_hijri(first_day) == (year, month, 1)
+        # The day before is the last day of the previous month
+        previous = to_hijri(first_day - 1)
+        assert previous[2] == month_length(*previous[:2]) and previous[2] in (29, 30)
+
+
+def test_every_day_round_trips():
+    start = to_day_number(FIRST_YEAR, 1, 1)
+    end = to_day_number(LAST_YEAR, 12, month_length(LAST_YEAR, 12))
+    for day_number in range(start, end + 1):
+        assert to_day_number(*to_hijri(day_number)) == day_number
+
+
+def test_offsets_cross_month_boundaries_exactly():
+    # Sha'ban 1446 has 29 days, so 29 Sha'ban + 1 is 1 Ramadan
+    assert month_length(1446, 8) == 29
+    assert to_hijri(to_day_number(1446, 8, 29) + 1) == (1446, 9, 1)
+    assert to_hijri(date(2025, 3, 1).toordinal()) == (1446, 9, 1)
+    assert to_hijri(to_day_number(1446, 9, 1) - 1) == (1446, 8, 29)
+    # Across the year boundary
+    assert to_hijri(to_day_number(1446, 1, 1) - 1) == (1445, 12, month_length(1445, 12))
+
+
+def test_tabular_fallback_joins_the_table_without_a_seam():
+    for year in (FIRST_YEAR - 1, LAST_YEAR):
+        assert month_length(year, 12) in (29, 30)
+    for day_number in range(to_day_number(FIRST_YEAR - 2, 1, 1), to_day_number(FIRST_YEAR + 1, 1, 1)):
+        assert to_day_number(*to_hijri(day_number)) == day_number
+    for day_number in range(to_day_number(LAST_YEAR - 1, 1, 1), to_day_number(LAST_YEAR + 2, 1, 1)):
+        assert to_day_number(*to_hijri(day_number)) == day_number
@@ -0,0 +1,30 @@
+from datetime import date
+
+from http_cache import ANY, cache_control, listed_versions, make_etag, match_etag, version_etag
+
+TODAY = date(2025, 6, 1)
+
+
+def test_etag_matches_only_the_current_version():
+    etag = make_etag('2025-01-15', 3, adjusted=False)
+    assert match_etag(etag, '2025-01-15', 3) is False
+    assert match_etag(f'"other", W/{etag}', '2025-01-15', 3) is False
+    assert match_etag(etag, '2025-01-15', 4) is None
+    assert match_etag(make_etag('2025-01-15', 3, adjusted=True), '2025-01-15', 3) is True
+    assert match_etag(None, '2025-01-15', 3) is None
+
+
+def test_cache_control_by_date_and_adjustments():
+    assert 'immutable' in cache_control(date(2025, 1, 15), TODAY, False, 100, 10)
+    assert cache_control(date(2025, 7, 1), TODAY, False, 100, 10) == 'public, max-age=10'
+    assert cache_control(TODAY, TODAY, False, 100, 10) == 'no-cache'
+    assert cache_control(date(2025, 1, 15), TODAY, True, 100, 10) == 'no-cache'
+
+
+def test_listed_versions_of_a_date():
+    assert version_etag('2025-01-15', 3) == '"2025-01-15.v3"'
+    header = f'{version_etag("2025-01-15", 3)}, W/{version_etag("2025-01-15", 4)}, "2025-01-16.v5", "junk"'
+    assert listed_versions(header, '2025-01-15') == {3}
+    assert listed_versions(header, '2025-01-15', weak=True) == {3, 4}
+    assert listed_versions('*', '2025-01-15') is ANY
+    assert listed_versions(None, '2025-01-15') is None
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+# Loaded on first use (database, 'aladhan' source, whole timetables), never by the import
+DEFERRED = ('motor', 'pymongo', 'dns', 'aiohttp', 'numpy')
+
+# Importing the app may take at most this many times as long as importing
+# fastapi (with pydantic and starlette) on its own. Relative, so it holds on
+# slow and fast machines alike; it was about 2.5x with the clients created at import.
+BUDGET = 1.6
+
+
+def import_times(module):
+    """{module: cumulative microseconds} from python -X importtime in a fresh interpreter"""
+    env = {key: value for key, value in os.environ.items() if key not in ('MONGO_URL', 'DB_NAME')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('package'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_server_imports_without_database_or_heavy_clients():
+    times = import_times('server')
+    assert 'server' in times
+    assert not [name for name in times if name.split('.')[0] in DEFERRED]
+
+
+def test_server_import_within_budget():
+    # Best of three, to ride out a busy machine
+    ratios = []
+    for _ in range(3):
+        times = import_times('server')
+        ratios.append(times['server'] / times['fastapi'])
+    assert min(ratios) < BUDGET, f"server imports in {min(ratios):.2f}x the time of fastapi"
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+LONDON = {"lat": 51.5074, "lng": -0.1278}
+
+
+@pytest.mark.parametrize("path", [
+    "/api/prayer-times/21-Jun-2026",
+    "/api/prayer-times/range?from=01-Jun-2026&to=30-Jun-2026",
+    "/api/prayer-times/month/2026/6",
+    "/api/prayer-times/export?from=01-Jun-2026&to=30-Jun-2026",
+])
+def test_polar_latitudes_are_rejected(serve, path):
+    async def run():
+        async with serve() as client:
+            response = await client.get(path, params={"lat": 70, "lng": 19, "tz": "Europe/Oslo"})
+            assert response.status_code == 400
+            assert response.json()["detail"] == "lat must be within [-65, 65] and lng within [-180, 180]"
+
+    asyncio.run(run())
+
+
+def test_time_zone_names_follow_daylight_saving_time(serve):
+    async def run():
+        async with serve() as client:
+            response = await client.get("/api/prayer-times/range", params={"from": "27-Mar-2026", "to": "30-Mar-2026", "tz": "Europe/London", **LONDON})
+            assert response.status_code == 200
+            days = response.json()
+            for day in days:
+                single = await client.get(f"/api/prayer-times/{day['date']}", params={"tz": "Europe/London", **LONDON})
+                assert single.json()["prayers"] == day["prayers"]
+
+            # An hour later on the clock once the clocks have gone forward
+            def dhuhr(day):
+                return next(p["start_time"] for p in day["prayers"] if p["name"] == "Dhuhr")
+            assert [dhuhr(day) for day in days] == ["12:06", "12:06", "1:05", "1:05"]
+
+            response = await client.get("/api/prayer-times/30-Mar-2026", params={"tz": "Europe/Atlantis", **LONDON})
+            assert (response.status_code, response.json()["detail"]) == (400, "Unknown time zone: Europe/Atlantis")
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import json
+from datetime import date
+
+import pytest
+
+from locations import DEFAULT_CITY, HYDERABAD, coordinate_location, load_cities, parse_tz
+
+
+def test_nearby_coordinates_share_a_location():
+    a = coordinate_location(21.42251, 39.82617, 3)
+    b = coordinate_location(21.4249, 39.8304, 3)
+    assert a == b
+    assert a.key == '21.42,39.83,3,2,1'
+    assert coordinate_location(21.42251, 39.82617, 3, method=4).key != a.key
+    assert coordinate_location(-0.001, 0.001, 0).key == '0.00,0.00,0,2,1'
+
+
+def test_time_zones_follow_daylight_saving_time():
+    london = coordinate_location(51.5074, -0.1278, parse_tz('Europe/London'))
+    assert london.key == '51.51,-0.13,Europe/London,2,1'
+    assert (london.utc_offset(date(2026, 1, 15)), london.utc_offset(date(2026, 7, 15))) == (0, 1)
+    # Clocks go forward at 01:00 on 29 March
+    assert (london.utc_offset(date(2026, 3, 28)), london.utc_offset(date(2026, 3, 29))) == (0, 1)
+    fixed = coordinate_location(51.5074, -0.1278, parse_tz('5.5'))
+    assert (fixed.key, fixed.utc_offset(date(2026, 7, 15))) == ('51.51,-0.13,5.5,2,1', 5.5)
+
+
+@pytest.mark.parametrize('args', [
+    (91, 0, 0), (0, 181, 0), (0, 0, 15), (0, 0, 'Europe/Nowhere'), (0, 0, 0, 99), (0, 0, 0, 2, 7),
+    # Polar day and night
+    (69.65, 18.96, 'Europe/Oslo'), (-70, 0, 0),
+])
+def test_invalid_coordinates_are_rejected(args):
+    with pytest.raises(ValueError):
+        coordinate_location(*args)
+
+
+def test_load_cities_adds_configured_cities(tmp_path):
+    path = tmp_path / 'cities.json'
+    path.write_text(json.dumps([{'id': 'makkah', 'lat': 21.4225, 'lng': 39.8262, 'tz_offset': 3, 'method': 4, 'school': 0}]))
+    cities = load_cities(str(path))
+    assert cities[DEFAULT_CITY] == HYDERABAD
+    assert (cities['makkah'].method, cities['makkah'].school, cities['makkah'].tz) == (4, 0, 3)
+    assert load_cities() == {DEFAULT_CITY: HYDERABAD}
+
+    path.write_text(json.dumps([{'id': 'london', 'lat': 51.5, 'lng': -0.13, 'tz': 'Europe/London'}]))
+    assert load_cities(str(path))['london'].tz == 'Europe/London'
+
+    path.write_text(json.dumps([{'id': 'a,b', 'lat': 0, 'lng': 0, 'tz_offset': 0}]))
+    with pytest.raises(ValueError):
+        load_cities(str(path))
@@ -0,0 +1,141 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+
+def isha(body):
+    return next(p["start_adjustment"] for p in json.loads(body)["prayers"] if p["name"] == "Isha")
+
+
+def test_window_extent_and_pruning(server, serve):
+    async def run():
+        async with serve():
+            first, last = server.materialized_window()
+            today = server.local_today(server.DEFAULT_LOCATION)
+            assert (today - first, last - today) == (
+                timedelta(days=server.MATERIALIZE_DAYS_BEFORE), timedelta(days=server.MATERIALIZE_DAYS_AFTER)
+            )
+            stale = (first - timedelta(days=1)).isoformat()
+            await server.db.timetable.insert_one({"_id": f"hyderabad/{stale}", "location": "hyderabad", "day": stale, "stamp": 0})
+
+            written, pruned = await server.materialize_window()
+            days = sorted([doc["day"] async for doc in server.db.timetable.find({"location": "hyderabad"})])
+            assert (written, pruned) == ((last - first).days + 1, 1)
+            assert (days[0], days[-1], len(days)) == (first.isoformat(), last.isoformat(), written)
+            # Dates outside the window are never materialized
+            assert await server.materialize([first - timedelta(days=2), last + timedelta(days=1)]) == 0
+
+    asyncio.run(run())
+
+
+def test_an_older_build_never_replaces_a_newer_one(server, serve):
+    async def run():
+        async with serve() as client:
+            day = server.local_today(server.DEFAULT_LOCATION) + timedelta(days=2)
+            date = day.strftime('%d-%b-%Y')
+            # A window rebuild takes its stamp, then an adjustment is saved and rebuilt before it writes
+            older = await server.timetable_store.next_stamp()
+            await client.post(f"/api/adjust-prayers/{date}", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 6}]})
+            newer = await server.db.timetable.find_one({"_id": f"hyderabad/{day.isoformat()}"})
+            assert newer["stamp"] > older and isha(newer["body"]) == 6
+
+            stale = (day.isoformat(), b'{"stale": true}', False)
+            assert await server.timetable_store.put_many("hyderabad", [stale], older, datetime.now(timezone.utc)) == 0
+            assert await server.timetable_store.get("hyderabad", day.isoformat()) == (newer["body"], True)
+
+    asyncio.run(run())
+
+
+def test_adjustment_writes_rematerialize_their_date(server, serve):
+    async def run():
+        async with serve() as client:
+            day = server.local_today(server.DEFAULT_LOCATION) + timedelta(days=1)
+            date = day.strftime('%d-%b-%Y')
+            await server.materialize_window()
+            body, adjusted = await server.timetable_store.get("hyderabad", day.isoformat())
+            assert (isha(body), adjusted) == (0, False)
+
+            await client.post(f"/api/adjust-prayers/{date}", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 3}]})
+            body, adjusted = await server.timetable_store.get("hyderabad", day.isoformat())
+            assert (isha(body), adjusted) == (3, True)
+            served = await client.get(f"/api/prayer-times/{date}")
+            assert served.content == body
+
+            await client.post(f"/api/adjust-hijri/{date}", json={"day_adjustment": 1})
+            body, _ = await server.timetable_store.get("hyderabad", day.isoformat())
+            assert isha(body) == 3 and json.loads(body)["hijri_date"] != json.loads(served.content)["hijri_date"]
+
+    asyncio.run(run())
+
+
+def test_upstream_builds_are_bounded_and_one_worker_claims_the_window(server, serve, monkeypatch):
+    in_flight = peak = 0
+    today = server.local_today(server.DEFAULT_LOCATION).strftime('%d-%b-%Y')
+    original = server.build_date_entry
+
+    async def build_date_entry(date, location):
+        nonlocal in_flight, peak
+        if date == today:
+            # The prayer stream builds today on its own
+            return await original(date, location)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return {"date": date, "degraded": False}, False
+
+    monkeypatch.setattr(server, "build_date_entry", build_date_entry)
+
+    async def run():
+        async with serve():
+            monkeypatch.setattr(server, "PRAYER_TIMES_SOURCE", "aladhan")
+            first, last = server.materialized_window()
+            written = await server.materialize([first + timedelta(days=i) for i in range((last - first).days + 1)])
+            assert written >= server.MATERIALIZE_DAYS_BEFORE + server.MATERIALIZE_DAYS_AFTER
+            assert peak == server.MATERIALIZE_CONCURRENCY
+
+            now, interval = datetime.now(timezone.utc), timedelta(hours=3)
+            claims = [await server.timetable_store.claim_window("hyderabad", now, interval) for _ in range(3)]
+            assert claims == [True, False, False]
+            assert await server.timetable_store.claim_window("hyderabad", now + interval, interval)
+
+    asyncio.run(run())
+
+
+def test_invalidated_dates_wait_for_a_newer_build(server, serve):
+    async def run():
+        async with serve():
+            store, now = server.timetable_store, datetime.now(timezone.utc)
+            await store.put_many("hyderabad", [("2026-03-10", "old", False)], 1, now)
+            await store.invalidate("hyderabad", ["2026-03-10"], 3)
+            assert await store.get("hyderabad", "2026-03-10") is None
+            # A build that read its inputs before the invalidation cannot store them
+            assert await store.put_many("hyderabad", [("2026-03-10", "stale", False)], 2, now) == 0
+            assert await store.get("hyderabad", "2026-03-10") is None
+            assert await store.put_many("hyderabad", [("2026-03-10", "new", True)], 4, now) == 1
+            assert await store.get("hyderabad", "2026-03-10") == ("new", True)
+
+    asyncio.run(run())
+
+
+def test_entries_built_under_other_settings_are_misses(server, serve, monkeypatch):
+    async def run():
+        async with serve() as client:
+            day = server.local_today(server.DEFAULT_LOCATION) + timedelta(days=1)
+            await server.materialize([day])
+            assert await server.timetable_store.get("hyderabad", day.isoformat()) is not None
+
+            # As after a restart with another ISHA_END
+            monkeypatch.setattr(server, "ISHA_END", "midnight")
+            server.timetable_fingerprint.cache_clear()
+            assert await server.timetable_store.get("hyderabad", day.isoformat()) is None
+            response = await client.get(f"/api/prayer-times/{day.strftime('%d-%b-%Y')}")
+            assert response.status_code == 200
+            assert await server.materialize([day]) == 1
+            assert await server.timetable_store.get("hyderabad", day.isoformat()) is not None
+
+    try:
+        asyncio.run(run())
+    finally:
+        # Computed again with the settings monkeypatch restores
+        server.timetable_fingerprint.cache_clear()
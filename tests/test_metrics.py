@@ -0,0 +1,51 @@
+import json
+import time
+
+from metrics import Registry
+
+
+def make_registry():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ('route',))
+    entries = registry.gauge('entries', 'Entries')
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    return registry, requests, entries, latency
+
+
+def test_render_counters_gauges_and_cumulative_histograms():
+    registry, requests, entries, latency = make_registry()
+    requests.inc('/a')
+    requests.inc('/a', amount=2)
+    entries.set(7)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, '/a')
+    text = registry.render(worker='1')
+
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'entries{worker="1"} 7' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+    assert '# TYPE latency_seconds histogram' in text
+
+
+def test_workers_are_merged_and_stale_gauges_dropped(tmp_path):
+    registry, requests, entries, latency = make_registry()
+    requests.inc('/a')
+    entries.set(1)
+    latency.observe(0.5, '/a')
+    registry.write(str(tmp_path), worker='2')
+    registry.write(str(tmp_path), worker='3')
+    # A worker that stopped writing a while ago
+    stale = json.loads((tmp_path / '3.json').read_text())
+    stale['written_at'] = time.time() - 600
+    (tmp_path / '3.json').write_text(json.dumps(stale))
+    (tmp_path / '4.json').write_text('{"trunc')
+
+    text = registry.render(str(tmp_path), worker='1')
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'entries{worker="1"} 1' in text
+    assert 'entries{worker="2"} 1' in text
+    assert 'worker="3"' not in text
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from prayer_calc import PRAYER_NAMES, format_minutes
+
+
+def test_single_dates_and_ranges_come_from_the_same_source(server, serve, monkeypatch):
+    fetched = []
+
+    async def fake_aladhan(date_str, location):
+        """Two minutes after the local engine, and the next day's Hijri date"""
+        fetched.append(date_str)
+        starts, _ = server.compute_day_locally(date_str, location)
+        hijri = server.get_hijri_date(datetime.strptime(date_str, '%d-%b-%Y') + timedelta(days=1))
+        return {name: format_minutes(start + 2) for name, start in zip(server.PRAYER_NAMES, starts)}, hijri
+
+    monkeypatch.setattr(server, "fetch_prayer_times_from_aladhan", fake_aladhan)
+
+    async def run():
+        async with serve() as client:
+            # The default source; the suite otherwise runs on 'local'
+            monkeypatch.setattr(server, "PRAYER_TIMES_SOURCE", "aladhan")
+            days = (await client.get("/api/prayer-times/range", params={"from": "01-Mar-2026", "to": "31-Mar-2026"})).json()
+            month = (await client.get("/api/prayer-times/month/2026/3")).json()
+            assert fetched
+            for i in (0, 14, 30):
+                single = (await client.get(f"/api/prayer-times/{days[i]['date']}")).json()
+                for fields in (days[i], month[i]):
+                    assert fields["prayers"] == single["prayers"]
+                    assert (fields["hijri_date"], fields["hijri_month"], fields["degraded"]) == (
+                        single["hijri_date"], single["hijri_month"], False
+                    )
+            local_fajr, _ = server.compute_day_locally("15-Mar-2026", server.DEFAULT_LOCATION)
+            assert days[14]["prayers"][0]["start_time"] == server.format_12h(local_fajr[0] + 2)
+
+    asyncio.run(run())
+
+
+class FakeAladhan:
+    """http_session answering /timings with 00:30 in the zone asked for, for every prayer"""
+
+    def __init__(self):
+        self.params = []
+
+    def get(self, url, params):
+        self.params.append(params)
+        return self
+
+    async def __aenter__(self):
+        self.status = 200
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        hijri = {"day": "1", "month": {"en": "Ramadan"}, "year": "1447"}
+        return {"data": {"timings": dict.fromkeys(PRAYER_NAMES, "00:30"), "date": {"hijri": hijri}}}
+
+
+def test_aladhan_is_asked_for_the_locations_time_zone(server, monkeypatch):
+    aladhan = FakeAladhan()
+    monkeypatch.setattr(server, "http_session", aladhan)
+
+    async def run():
+        named = server.coordinate_location(35.68, 139.69, "Asia/Tokyo")
+        offset = server.coordinate_location(35.68, 139.69, 5.5)
+        times, _ = await server.fetch_prayer_times_from_aladhan("01-Mar-2026", named)
+        assert (aladhan.params[-1]["timezonestring"], times["Fajr"]) == ("Asia/Tokyo", "00:30")
+        # A fixed offset is applied to Aladhan's UTC times
+        times, _ = await server.fetch_prayer_times_from_aladhan("01-Mar-2026", offset)
+        assert (aladhan.params[-1]["timezonestring"], times["Fajr"]) == ("UTC", "06:00")
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from prayer_stream import HEARTBEAT, Broadcaster, PrayerStream, current_and_next
+
+PRAYERS = [
+    {'name': 'Fajr', 'start_time': '4:58', 'end_time': '12:10'},
+    {'name': 'Dhuhr', 'start_time': '12:10', 'end_time': '3:31'},
+    {'name': 'Asr', 'start_time': '3:31', 'end_time': '5:52'},
+    {'name': 'Maghrib', 'start_time': '5:52', 'end_time': '7:04'},
+    {'name': 'Isha', 'start_time': '7:04', 'end_time': '11:59'},
+]
+STARTS = {'Fajr': 298, 'Dhuhr': 730, 'Asr': 931, 'Maghrib': 1072, 'Isha': 1144}
+
+
+def test_current_and_next_prayer():
+    assert current_and_next(STARTS, 200) == (None, 'Fajr')
+    assert current_and_next(STARTS, 730) == ('Dhuhr', 'Asr')
+    assert current_and_next(STARTS, 1200) == ('Isha', None)
+
+
+def test_subscribers_get_snapshot_then_changes_and_resync_when_lagging():
+    async def run():
+        broadcaster = Broadcaster(history=2)
+        broadcaster.publish('timings', 'T1')
+        broadcaster.publish('prayer', 'P1')
+        subscribers = [broadcaster.subscribe() for _ in range(100)]
+        first = await asyncio.gather(*(s.__anext__() for s in subscribers))
+        assert all(b'data: T1' in m and b'data: P1' in m for m in first)
+
+        pending = [asyncio.ensure_future(s.__anext__()) for s in subscribers]
+        await asyncio.sleep(0)
+        broadcaster.publish('prayer', 'P2')
+        assert all(m.endswith(b'data: P2\n\n') for m in await asyncio.gather(*pending))
+
+        pending = asyncio.ensure_future(subscribers[0].__anext__())
+        await asyncio.sleep(0)
+        broadcaster.wake()
+        assert await pending == HEARTBEAT
+
+        # Further behind than the history: the latest of each event instead
+        for i in range(3, 6):
+            broadcaster.publish('prayer', f'P{i}')
+        message = await subscribers[0].__anext__()
+        assert b'data: T1' in message and b'data: P5' in message and b'P4' not in message
+        for s in subscribers:
+            await s.aclose()
+
+    asyncio.run(run())
+
+
+def test_stream_publishes_only_on_change():
+    timings = {'date': '15-Jan-2025', 'hijri_date': '15', 'hijri_month': 'Rajab', 'hijri_year': '1446',
+               'prayers': PRAYERS}
+
+    async def load(date):
+        return json.dumps({**timings, 'id': str(len(date))}).encode(), STARTS
+
+    async def run():
+        stream = PrayerStream(load, timezone(timedelta(hours=5.5)))
+        delay = await stream.refresh(datetime(2025, 1, 15, 12, 0))
+        assert stream.broadcaster.version == 2
+        assert delay == 10 * 60
+        await stream.refresh(datetime(2025, 1, 15, 12, 5))
+        assert stream.broadcaster.version == 2
+        await stream.refresh(datetime(2025, 1, 15, 12, 10))
+        assert stream.broadcaster.version == 3
+        assert b'"current": "Dhuhr"' in stream.broadcaster.snapshot()
+
+    asyncio.run(run())
+
+
+def test_stream_follows_starts_adjusted_across_midnight():
+    # Fajr moved to 23:50 the evening before is shown as "11:50", Isha moved past midnight as "12:20"
+    prayers = [{**PRAYERS[0], 'start_time': '11:50'}, *PRAYERS[1:4], {**PRAYERS[4], 'start_time': '12:20'}]
+    timings = {'date': '15-Jan-2025', 'hijri_date': '15', 'hijri_month': 'Rajab', 'hijri_year': '1446', 'prayers': prayers}
+
+    async def load(date):
+        return json.dumps(timings).encode(), {**STARTS, 'Fajr': -10, 'Isha': 1460}
+
+    async def run():
+        stream = PrayerStream(load, timezone(timedelta(hours=5.5)))
+        await stream.refresh(datetime(2025, 1, 15, 0, 5))
+        assert b'"current": "Fajr", "next": "Dhuhr"' in stream.broadcaster.snapshot()
+        # Until Isha starts after midnight, Maghrib is current
+        delay = await stream.refresh(datetime(2025, 1, 15, 23, 50))
+        assert b'"current": "Maghrib", "next": "Isha"' in stream.broadcaster.snapshot()
+        assert delay == 30 * 60
+
+    asyncio.run(run())
@@ -0,0 +1,114 @@
+import asyncio
+
+from response_cache import InvalidationLog, ResponseCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put('01-Jan-2025', b'1')
+    cache.put('02-Jan-2025', b'2')
+    assert cache.get('01-Jan-2025') == b'1'
+    cache.put('03-Jan-2025', b'3')
+    assert cache.get('02-Jan-2025') is None
+    assert cache.get('01-Jan-2025') == b'1'
+    assert len(cache) == 2
+
+
+def test_invalidate_drops_only_that_date():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.put('01-Jan-2025', b'1')
+    cache.put('02-Jan-2025', b'2')
+    cache.invalidate('01-Jan-2025')
+    assert cache.get('01-Jan-2025') is None
+    assert cache.get('02-Jan-2025') == b'2'
+    assert cache.stats['invalidations'] == 1
+
+
+def test_expired_entries_are_misses():
+    cache = ResponseCache(max_entries=10, ttl=-1)
+    cache.put('01-Jan-2025', b'1')
+    assert cache.get('01-Jan-2025') is None
+
+
+class MemoryCounters:
+    def __init__(self):
+        self.version = 0
+
+    async def find_one(self, query):
+        return {'version': self.version}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.version += 1
+        return {'version': self.version}
+
+
+class MemoryLog:
+    def __init__(self):
+        self.entries = []
+
+    async def insert_one(self, doc):
+        self.entries.append(doc)
+
+    async def find(self, query):
+        for doc in self.entries:
+            if query['version']['$gt'] < doc['version'] <= query['version']['$lte']:
+                yield doc
+
+
+def test_date_versions_follow_changes_across_workers():
+    async def run():
+        counters, log = MemoryCounters(), MemoryLog()
+        writer = InvalidationLog(counters, log, ResponseCache(10, 60))
+        reader = InvalidationLog(counters, log, ResponseCache(10, 60))
+        await writer.start()
+        await reader.start()
+        assert reader.version_of('01-Jan-2025') == 0
+
+        await writer.publish('01-Jan-2025')
+        assert writer.version_of('01-Jan-2025') == 1
+        await reader.poll()
+        assert reader.version_of('01-Jan-2025') == 1
+        assert reader.version_of('02-Jan-2025') == 0
+
+        # A global change moves every date past it
+        await writer.publish()
+        await reader.poll()
+        assert reader.version_of('01-Jan-2025') == reader.version_of('02-Jan-2025') == 2
+
+    asyncio.run(run())
+
+
+def test_bulk_publish_is_one_entry_and_not_a_global_reset():
+    async def run():
+        counters, log = MemoryCounters(), MemoryLog()
+        writer = InvalidationLog(counters, log, ResponseCache(10, 60))
+        reader = InvalidationLog(counters, log, ResponseCache(10, 60))
+        await writer.start()
+        await reader.start()
+        reader.cache.put('03-Jan-2025', b'3')
+        await writer.publish_dates(['01-Jan-2025', '02-Jan-2025'])
+        assert len(log.entries) == 1
+        await reader.poll()
+        assert reader.version_of('01-Jan-2025') == reader.version_of('02-Jan-2025') == 1
+        assert reader.version_of('03-Jan-2025') == 0
+        assert reader.cache.get('03-Jan-2025') == b'3'
+
+    asyncio.run(run())
+
+
+def test_changes_since_a_version():
+    async def run():
+        counters, log = MemoryCounters(), MemoryLog()
+        writer = InvalidationLog(counters, log, ResponseCache(10, 60))
+        await writer.publish('01-Jan-2025')
+        await writer.publish_dates(['01-Jan-2025', '02-Jan-2025'])
+        assert await writer.changes(0, 2) == {'01-Jan-2025': 2, '02-Jan-2025': 2}
+        assert await writer.changes(2, 2) == {}
+
+        await writer.publish()
+        assert await writer.changes(1, 3) is None
+        # Expired entries are unknown changes too
+        log.entries.pop(0)
+        assert await writer.changes(0, 2) is None
+
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+
+async def seed_legacy(db):
+    # Saved before day keys and locations existed
+    await db.adjustments.insert_one({"date": "10-Mar-2026", "adjustments": [{"prayer_name": "Isha", "start_adjustment": 2}]})
+    await db.adjustment_rules.insert_one({
+        "id": "r1", "name": "", "start_date": "01-Mar-2026", "end_date": "31-Mar-2026",
+        "adjustments": [{"prayer_name": "Fajr", "start_adjustment": 1}], "created_at": datetime.now(timezone.utc)
+    })
+
+
+def test_a_failed_step_does_not_skip_the_others(server, serve, monkeypatch):
+    async def broken(states, rules):
+        raise RuntimeError("history unavailable")
+
+    async def run():
+        async with serve(seed_legacy):
+            assert server.rules_for(server.DEFAULT_LOCATION).size == 1
+            doc = await server.db.adjustments.find_one({"date": "10-Mar-2026"})
+            assert (doc["day"], doc["location"]) == ("2026-03-10", "hyderabad")
+
+    monkeypatch.setattr(server.adjustment_history, "backfill_once", broken)
+    asyncio.run(run())
+
+
+async def seed_legacy_indexes(db):
+    await seed_legacy(db)
+    await db.adjustments.create_index("date", unique=True)
+
+
+def test_legacy_indexes_are_replaced_before_they_are_dropped(server, serve):
+    async def run():
+        async with serve(seed_legacy_indexes):
+            indexes = await server.db.adjustments.index_information()
+            assert "date_1" not in indexes and "location_1_date_1" in indexes
+
+    asyncio.run(run())
+
+
+def test_startup_fails_without_the_indexes(server, serve, monkeypatch):
+    from mongomock.collection import Collection
+
+    create_index = Collection.create_index
+
+    def broken(self, keys, **kwargs):
+        if keys[0][0] == "location":
+            raise RuntimeError("index build failed")
+        return create_index(self, keys, **kwargs)
+
+    async def run():
+        async with serve(seed_legacy_indexes):
+            pass
+
+    monkeypatch.setattr(Collection, "create_index", broken)
+    with pytest.raises(RuntimeError, match="index build failed"):
+        asyncio.run(run())
+    # Dates stay unique on their own until the new indexes exist
+    assert "date_1" in asyncio.run(server.db.adjustments.index_information())
+
+
+def test_startup_fails_without_the_rules(server, serve, monkeypatch):
+    async def broken():
+        raise RuntimeError("rules unreadable")
+
+    async def run():
+        async with serve():
+            pass
+
+    monkeypatch.setattr(server, "load_adjustment_rules", broken)
+    with pytest.raises(RuntimeError, match="rules unreadable"):
+        asyncio.run(run())
+
+
+def test_the_history_backfill_runs_once(server, serve):
+    states = {server.PRAYERS: server.db.adjustments, server.HIJRI: server.db.hijri_adjustments}
+
+    async def run():
+        async with serve(seed_legacy):
+            assert await server.db.adjustment_events.count_documents({}) == 2
+            # Saved without its event: not looked for again at the next startup ...
+            await server.db.adjustments.insert_one({
+                "location": "hyderabad", "date": "11-Mar-2026", "day": "2026-03-11", "version": 1,
+                "adjustments": [{"prayer_name": "Isha", "start_adjustment": 3}]
+            })
+            assert await server.adjustment_history.backfill_once(states, server.db.adjustment_rules) == 0
+            # ... unless an append failed since
+            await server.adjustment_history.request_backfill()
+            assert await server.adjustment_history.backfill_once(states, server.db.adjustment_rules) == 1
+            assert await server.adjustment_history.backfill_once(states, server.db.adjustment_rules) == 0
+
+    asyncio.run(run())
+
+
+def test_a_failed_append_schedules_a_backfill(server, serve, monkeypatch):
+    async def broken(location, events):
+        raise RuntimeError("history unavailable")
+
+    async def run():
+        async with serve() as client:
+            monkeypatch.setattr(server.adjustment_history, "record", broken)
+            response = await client.post("/api/adjust-prayers/10-Mar-2026", json={"adjustments": [{"prayer_name": "Isha", "start_adjustment": 2}]})
+            assert response.status_code == 200
+            assert await server.db.cache_versions.find_one({"_id": server.adjustment_history.BACKFILLED}) is None
+
+    asyncio.run(run())
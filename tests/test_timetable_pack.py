@@ -0,0 +1,32 @@
+from datetime import date
+
+import pytest
+
+from timetable_pack import DELTA, FULL, HEADER, RECORD, pack_delta, pack_full, unpack
+
+MINUTES = [(329, 746), (746, 1005), (1005, 1105), (1105, 1164), (1169, 1765)]
+
+
+def test_full_timetable_round_trips():
+    days = [(MINUTES, (1447, 9, 21)), ([(-3, 740), *MINUTES[1:]], (1447, 9, 22))]
+    data = pack_full('hyderabad', 7, date(2026, 3, 10), days)
+    assert len(data) == HEADER.size + len('hyderabad') + 2 * RECORD.size
+    assert RECORD.size == 24
+
+    timetable = unpack(data)
+    assert (timetable['kind'], timetable['version'], timetable['location']) == (FULL, 7, 'hyderabad')
+    assert (timetable['first'], timetable['days']) == (date(2026, 3, 10), 2)
+    # Times that roll over midnight keep their sign
+    assert timetable['records'] == {date(2026, 3, 10): days[0], date(2026, 3, 11): days[1]}
+
+
+def test_delta_holds_only_changed_dates():
+    data = pack_delta('makkah', 9, date(2026, 1, 1), 365, [(date(2026, 12, 31), MINUTES, (1448, 7, 11))])
+    timetable = unpack(data)
+    assert (timetable['kind'], timetable['version'], timetable['days']) == (DELTA, 9, 365)
+    assert timetable['records'] == {date(2026, 12, 31): (MINUTES, (1448, 7, 11))}
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        unpack(b'{"date": "01-Jan-2026"}' + bytes(HEADER.size))
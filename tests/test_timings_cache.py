@@ -0,0 +1,86 @@
+import asyncio
+
+from timings_cache import TimingsCache
+
+KEY = {'date': '15-Jan-2025', 'lat': 17.385, 'lng': 78.4867, 'tz': 5.5, 'method': 2, 'school': 1}
+
+
+class MemoryCollection:
+    """Just enough of a Motor collection for TimingsCache"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, key, projection=None):
+        return self.docs.get(tuple(sorted(key.items())))
+
+    async def update_one(self, key, update, upsert=False):
+        self.docs[tuple(sorted(key.items()))] = dict(update['$set'])
+
+
+def make_cache(fresh_ttl=60, fail=False):
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("upstream down")
+        return {'prayer_times': {'Fajr': '05:46'}, 'fetch': len(calls)}
+
+    return TimingsCache(MemoryCollection(), fetch, fresh_ttl=fresh_ttl, stale_ttl=3600), calls
+
+
+def test_concurrent_misses_share_one_upstream_fetch():
+    async def run():
+        cache, calls = make_cache()
+        results = await asyncio.gather(*(cache.get(KEY) for _ in range(20)))
+        assert len(calls) == 1
+        assert all(result == results[0] for result in results)
+        await cache.get(KEY)
+        return cache.stats
+
+    stats = asyncio.run(run())
+    assert stats['misses'] == 20
+    assert stats['hits'] == 1
+    assert stats['upstream_fetches'] == 1
+
+
+def test_stale_entry_is_served_while_revalidating():
+    async def run():
+        cache, calls = make_cache(fresh_ttl=0)
+        first = await cache.get(KEY)
+        stale = await cache.get(KEY)
+        await asyncio.sleep(0.05)
+        refreshed = await cache.get(KEY)
+        return cache.stats, first, stale, refreshed
+
+    stats, first, stale, refreshed = asyncio.run(run())
+    assert stale == first
+    assert refreshed['fetch'] == 2
+    assert stats['stale'] == 2
+
+
+def test_stale_entry_is_served_when_upstream_is_down():
+    async def run():
+        cache, _ = make_cache(fresh_ttl=0)
+        first = await cache.get(KEY)
+        cache.fetch = make_cache(fail=True)[0].fetch
+        stale = await cache.get(KEY)
+        await asyncio.sleep(0.05)
+        return cache.stats, first, stale
+
+    stats, first, stale = asyncio.run(run())
+    assert stale == first
+    assert stats['errors'] == 1
+
+
+def test_time_zones_are_cached_apart():
+    async def run():
+        cache, calls = make_cache()
+        await cache.get(KEY)
+        await cache.get({**KEY, 'tz': 'Asia/Kolkata'})
+        await cache.get(KEY)
+        return calls
+
+    assert [call['tz'] for call in asyncio.run(run())] == [5.5, 'Asia/Kolkata']
@@ -0,0 +1,30 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import timings_json
+from timings_json import dump_json, timestamp, timings_ids
+
+
+def test_ids_are_stable_uuids_per_location_and_date():
+    ids = timings_ids('hyderabad', '10-Mar-2026', 5)
+    assert len(ids) == len(set(ids)) == 6
+    assert ids == timings_ids('hyderabad', '10-Mar-2026', 5)
+    for value in ids:
+        parsed = uuid.UUID(value)
+        assert str(parsed) == value
+        assert (parsed.version, parsed.variant) == (8, uuid.RFC_4122)
+    assert not set(ids) & set(timings_ids('hyderabad', '11-Mar-2026', 5))
+    assert not set(ids) & set(timings_ids('makkah', '10-Mar-2026', 5))
+
+
+def test_dump_matches_without_orjson(monkeypatch):
+    value = {"date": "10-Mar-2026", "hijri_month": "Ramaḍān", "prayers": [{"adjustment": -3}], "degraded": False}
+    encoded = dump_json(value)
+    monkeypatch.setattr(timings_json, 'orjson', None)
+    assert dump_json(value) == encoded
+    assert json.loads(encoded) == value
+
+
+def test_timestamp_as_pydantic_writes_it():
+    assert timestamp(datetime(2026, 3, 10, 5, 12, 0, 250, tzinfo=timezone.utc)) == '2026-03-10T05:12:00.000250Z'